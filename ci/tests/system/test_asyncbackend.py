@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "webapp"))
+
+from cardinal.system.asyncbackend import AsyncBackend
+from cardinal.system.executor import TaskEngine
+from cardinal.system.settings import cardinalSettings
+
+class TestAsyncBackend(unittest.TestCase):
+    '''
+    Object for testing per-host timeouts and concurrency
+    slots of AsyncBackend().
+    '''
+    def setUp(self):
+        '''
+        Run AsyncBackend() on two engine threads with a
+        short per-host timeout.
+        '''
+        self.tunings = dict(cardinalSettings.snapshot(), asyncConcurrency=2, asyncHostTimeout=0.5)
+        patcher = mock.patch.object(cardinalSettings, "snapshot", lambda: self.tunings)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.engine = TaskEngine("test", "asyncConcurrency")
+        self.backend = AsyncBackend(engine=self.engine)
+
+        # Stalled work is let go once the test is over
+        self.stalled = threading.Event()
+        self.addCleanup(self.stalled.set)
+
+    def work(self, apId):
+        '''
+        Stand-in for a scout call: access point 0 hangs (like
+        paramiko on a black-holed host), the others take 0.3s.
+        '''
+        if apId == 0:
+            self.stalled.wait(10)
+            return "stalled"
+
+        time.sleep(0.3)
+        return apId
+
+    def testResults(self):
+        '''
+        Test that every access point's result is returned
+        '''
+        outcomes = self.backend.run(lambda apId: apId * 2, [(apId,) for apId in range(10)])
+
+        self.assertEqual(sorted(result for index, args, result, error in outcomes), [apId * 2 for apId in range(10)])
+        self.assertTrue(all(error is None for index, args, result, error in outcomes))
+
+    def testStalledHost(self):
+        '''
+        Test that a host stuck past its timeout holds its slot,
+        so the timeout doesn't cascade onto healthy hosts
+        '''
+        completed = []
+        outcomes = self.backend.run(self.work, [(apId,) for apId in range(5)], \
+            onComplete=lambda index, args, result, error, duration: completed.append((args[0], duration)))
+
+        errors = {args[0]: error for index, args, result, error in outcomes if error is not None}
+        self.assertEqual(list(errors), [0])
+        self.assertIsInstance(errors[0], TimeoutError)
+
+        # Healthy hosts only ever waited on a free thread, never against their timeout
+        self.assertEqual(sorted(apId for apId, duration in completed), list(range(5)))
+        self.assertTrue(all(duration < 0.5 for apId, duration in completed if apId != 0))
+
+if __name__ == '__main__':
+    unittest.main()
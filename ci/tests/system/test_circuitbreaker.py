@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+import fakeredis
+import os
+import paramiko
+import sys
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "webapp"))
+
+from cardinal.system.accesspoints import AccessPoint
+from cardinal.system.accesspoints import runGroupTask
+from cardinal.system.circuitbreaker import CircuitBreaker
+from cardinal.system.circuitbreaker import CircuitOpen
+from cardinal.system.common import CardinalEnv
+from cardinal.system.common import JobCancelled
+from cardinal.system.groupjobs import GroupJob
+from cardinal.system.settings import cardinalSettings
+
+class TestCircuitBreaker(unittest.TestCase):
+    '''
+    Object for testing the closed, open and half-open
+    states of CircuitBreaker().
+    '''
+    def setUp(self):
+        '''
+        Point CardinalEnv() at an in-memory Redis and
+        fixed breaker tunings.
+        '''
+        self.redis = fakeredis.FakeRedis()
+        self.tunings = dict(cardinalSettings.snapshot(), breakerThreshold=3, breakerCooldown=300, sshTimeout=10)
+
+        for name, value in (("redis", lambda env: self.redis), ("releaseSql", lambda env: None), \
+            ("tunings", property(lambda env: self.tunings))):
+            patcher = mock.patch.object(CardinalEnv, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.breaker = CircuitBreaker()
+
+    def state(self, apId=1):
+        '''
+        Current state of an access point's breaker.
+        '''
+        return self.breaker.states([apId])[apId]["state"]
+
+    def cooledDown(self, apId=1):
+        '''
+        Move the opening of a breaker back past breakerCooldown.
+        '''
+        self.redis.set(self.breaker.key(apId, "opened"), time.time() - 301)
+
+    def testOpens(self):
+        '''
+        Test that the breaker opens after breakerThreshold
+        consecutive failures and then fails fast
+        '''
+        self.breaker.failed(1)
+        self.breaker.failed(1)
+        self.breaker.allow(1)
+        self.assertEqual(self.state(), "closed")
+
+        self.breaker.failed(1)
+        self.assertEqual(self.state(), "open")
+        self.assertRaises(CircuitOpen, self.breaker.allow, 1)
+        self.assertRaises(CircuitOpen, self.breaker.check, 1)
+        self.breaker.allow(2)
+
+    def testSuccessResets(self):
+        '''
+        Test that a success in between starts the count again
+        '''
+        self.breaker.failed(1)
+        self.breaker.failed(1)
+        self.breaker.succeeded(1)
+        self.breaker.failed(1)
+        self.assertEqual(self.state(), "closed")
+
+    def testHalfOpenProbe(self):
+        '''
+        Test that once cooled down a single probe is let through,
+        and that its success closes the breaker
+        '''
+        for i in range(3):
+            self.breaker.failed(1)
+        self.cooledDown()
+        self.assertEqual(self.state(), "half_open")
+
+        # Checking doesn't claim the probe
+        self.assertTrue(self.breaker.check(1))
+        self.assertTrue(self.breaker.check(1))
+
+        self.breaker.allow(1)
+        self.assertEqual(self.state(), "open")
+        with self.assertRaisesRegex(CircuitOpen, "probe"):
+            self.breaker.allow(1)
+
+        self.breaker.succeeded(1)
+        self.assertEqual(self.state(), "closed")
+        self.breaker.allow(1)
+
+    def testFailedProbe(self):
+        '''
+        Test that a failed probe opens the breaker for
+        another cool-down
+        '''
+        for i in range(3):
+            self.breaker.failed(1)
+        self.cooledDown()
+
+        self.breaker.allow(1)
+        self.breaker.failed(1)
+        with self.assertRaisesRegex(CircuitOpen, "not retrying"):
+            self.breaker.allow(1)
+
+        self.cooledDown()
+        self.breaker.allow(1)
+
+    def testGuard(self):
+        '''
+        Test that guard() records connection failures, treats
+        rejected credentials as reachable and gives the probe up
+        when work is cancelled
+        '''
+        for error in (OSError("No route to host"), EOFError(), paramiko.SSHException("Error reading SSH protocol banner")):
+            with self.assertRaises(type(error)):
+                with self.breaker.guard(1):
+                    raise error
+        self.assertEqual(self.state(), "open")
+
+        self.cooledDown()
+        with self.assertRaises(JobCancelled):
+            with self.breaker.guard(1):
+                raise JobCancelled("Job 1 was cancelled")
+        self.assertEqual(self.state(), "half_open")
+
+        with self.assertRaises(paramiko.AuthenticationException):
+            with self.breaker.guard(1):
+                raise paramiko.AuthenticationException("Authentication failed.")
+        self.assertEqual(self.state(), "closed")
+
+    def testScoutCalls(self):
+        '''
+        Test that scout calls count against the breaker and
+        are not made while it is open
+        '''
+        calls = []
+        def unreachable(**kwargs):
+            calls.append(kwargs)
+            raise OSError("No route to host")
+
+        apInfo = dict(ap_id=1, ap_ip="192.0.2.1", ap_ssh_username="cisco", ap_ssh_password="secret")
+        with mock.patch.object(CardinalEnv, "encryption", lambda env, input, action: input):
+            for i in range(3):
+                self.assertRaises(OSError, AccessPoint().scout, apInfo, unreachable, tftpIp="192.0.2.9")
+            self.assertRaises(CircuitOpen, AccessPoint().scout, apInfo, unreachable, tftpIp="192.0.2.9")
+
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(calls[0], dict(ip="192.0.2.1", username="cisco", password="secret", tftpIp="192.0.2.9"))
+
+    def testGroupTaskFailsFast(self):
+        '''
+        Test that a group task for an access point behind an open
+        breaker fails without retrying or touching the access point
+        '''
+        for i in range(3):
+            self.breaker.failed(2)
+
+        groupJobId = GroupJob().create(operation="manageHttp", apIds=[2])
+        with mock.patch.object(AccessPoint, "manageHttp") as manageHttp:
+            self.assertRaises(CircuitOpen, runGroupTask, groupJobId, 2, "manageHttp", dict(status="enable"))
+
+        manageHttp.assert_not_called()
+        self.assertEqual(GroupJob().status(groupJobId)["access_points"][0]["state"], "failed")
+
+if __name__ == "__main__":
+    unittest.main()
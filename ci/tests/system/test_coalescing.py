@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+import fakeredis
+import os
+import sys
+import unittest
+from datetime import timedelta
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "webapp"))
+
+from cardinal.system.common import AsyncOpsManager
+from cardinal.system.common import CardinalEnv
+from cardinal.system.common import JobCoalescer
+from rq.job import Job
+from rq.utils import utcnow
+
+# Asynchronous work by dotted path, so nothing needs to be importable
+fetchInfo = "cardinal.system.accesspoints.AccessPoint.fetchInfo"
+manageHttp = "cardinal.system.accesspoints.AccessPoint.manageHttp"
+
+class TestJobCoalescing(unittest.TestCase):
+    '''
+    Object for testing idempotency keys and job
+    sharing of JobCoalescer() and AsyncOpsManager().
+    '''
+    def setUp(self):
+        '''
+        Point CardinalEnv() at an in-memory Redis.
+        '''
+        self.redis = fakeredis.FakeRedis()
+        patcher = mock.patch.object(CardinalEnv, "redis", lambda env: self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def testClaim(self):
+        '''
+        Test that a free idempotency key is claimed for the new job
+        '''
+        coalescer = JobCoalescer()
+        self.assertIsNone(coalescer.claim("fetchInfo", dict(id=1), "job-1", lambda existingId: None))
+
+        key = coalescer.key("fetchInfo", dict(id=1))
+        self.assertEqual(self.redis.get(key), b"job-1")
+        self.assertTrue(0 < self.redis.ttl(key) <= coalescer.tunings['jobKeyTtl'])
+
+    def testClaimShared(self):
+        '''
+        Test that a shareable job keeps its idempotency key
+        '''
+        coalescer = JobCoalescer()
+        coalescer.claim("fetchInfo", dict(id=1), "job-1", lambda existingId: None)
+
+        self.assertEqual(coalescer.claim("fetchInfo", dict(id=1), "job-2", lambda existingId: existingId), "job-1")
+        self.assertEqual(self.redis.get(coalescer.key("fetchInfo", dict(id=1))), b"job-1")
+
+    def testClaimReplaced(self):
+        '''
+        Test that a job that can't be shared loses its idempotency key
+        '''
+        coalescer = JobCoalescer()
+        coalescer.claim("fetchInfo", dict(id=1), "job-1", lambda existingId: None)
+
+        self.assertIsNone(coalescer.claim("fetchInfo", dict(id=1), "job-2", lambda existingId: None))
+        self.assertEqual(self.redis.get(coalescer.key("fetchInfo", dict(id=1))), b"job-2")
+
+    def testShareQueued(self):
+        '''
+        Test that identical read-only work shares a queued job
+        '''
+        job = AsyncOpsManager()
+        first = job.run(func=fetchInfo, args=dict(id=1))
+
+        self.assertEqual(job.run(func=fetchInfo, args=dict(id=1)).id, first.id)
+        self.assertNotEqual(job.run(func=fetchInfo, args=dict(id=2)).id, first.id)
+
+    def testStartedNotShared(self):
+        '''
+        Test that a job that already started isn't shared
+        '''
+        job = AsyncOpsManager()
+        first = job.run(func=fetchInfo, args=dict(id=1))
+        first.set_status("started")
+
+        self.assertNotEqual(job.run(func=fetchInfo, args=dict(id=1)).id, first.id)
+
+    def testStateChangesNotShared(self):
+        '''
+        Test that state changing work is never coalesced
+        '''
+        job = AsyncOpsManager()
+        first = job.run(func=manageHttp, args=dict(id=1, status="disable"))
+        job.run(func=manageHttp, args=dict(id=1, status="enable"))
+
+        self.assertNotEqual(job.run(func=manageHttp, args=dict(id=1, status="disable")).id, first.id)
+        self.assertEqual(len(job.queue("interactive")), 3)
+
+    def testFreshnessExpiry(self):
+        '''
+        Test that a finished job is shared only within freshness seconds
+        '''
+        job = AsyncOpsManager()
+        first = job.run(func=fetchInfo, args=dict(id=1))
+        first.set_status("finished")
+        first.ended_at = utcnow() - timedelta(seconds=10)
+        first.save()
+
+        self.assertEqual(job.run(func=fetchInfo, args=dict(id=1), freshness=30).id, first.id)
+        self.assertIsNone(job.shareable(first.id, 5))
+
+        second = job.run(func=fetchInfo, args=dict(id=1), freshness=5)
+        self.assertNotEqual(second.id, first.id)
+        self.assertEqual(Job.fetch(second.id, connection=self.redis).get_status(), "queued")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+import os
+import paramiko
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "webapp"))
+
+from cardinal.system import commands as iosCommands
+from cardinal.system.sshpool import ApSession
+from cardinal.system.sshpool import SshCommandError
+
+# Output captured from an AIR-CAP2602I running autonomous IOS 15.3(3)JD4,
+# as ApSession().send() returns it (echoed command, output, prompt)
+showVersion = """show version\r
+Cisco IOS Software, C2600 Software (AP3G2-K9W7-M), Version 15.3(3)JD4, RELEASE SOFTWARE (fc1)\r
+Technical Support: http://www.cisco.com/techsupport\r
+Copyright (c) 1986-2020 by Cisco Systems, Inc.\r
+Compiled Thu 30-Apr-20 00:06 by prod_rel_team\r
+\r
+ROM: Bootstrap program is C2600 boot loader\r
+BOOTLDR: C2600 Boot Loader (AP3G2-BOOT-M) LoaderVersion 15.2(2)JA1, RELEASE SOFTWARE (fc1)\r
+\r
+ap1 uptime is 1 week, 2 days, 3 hours, 4 minutes\r
+System returned to ROM by power-on\r
+System image file is "flash:/ap3g2-k9w7-mx.153-3.JD4/ap3g2-k9w7-mx.153-3.JD4"\r
+Last reload reason: \r
+\r
+cisco AIR-CAP2602I-A-K9     (PowerPC) processor (revision A0) with 178160K/82432K bytes of memory.\r
+Processor board ID FGL1234ABCD\r
+PowerPC CPU at 800Mhz, revision number 0x2151\r
+Last reset from power-on\r
+1 Gigabit Ethernet interface\r
+2 802.11 Radios\r
+\r
+32K bytes of flash-simulated non-volatile configuration memory.\r
+Base ethernet MAC Address          : 00:11:22:33:44:55\r
+Part Number                        : 73-14511-02\r
+PCA Assembly Number                : 800-37898-01\r
+PCA Revision Number                : A0\r
+PCB Serial Number                  : FOC12345678\r
+Top Assembly Part Number           : 068-0600-01\r
+Top Assembly Serial Number         : FGL1234ABCD\r
+Top Revision Number                : A0\r
+Product/Model Number               : AIR-CAP2602I-A-K9\r
+\r
+\r
+Configuration register is 0xF\r
+\r
+ap1#"""
+
+showInterface = """show interfaces GigabitEthernet0\r
+GigabitEthernet0 is up, line protocol is up \r
+  Hardware is PowerPC ppc405ex Gigabit Ethernet, address is 0011.2233.4455 (bia 0011.2233.4455)\r
+  Description: Uplink\r
+  MTU 1500 bytes, BW 1000000 Kbit/sec, DLY 10 usec, \r
+     reliability 255/255, txload 1/255, rxload 1/255\r
+  Encapsulation ARPA, loopback not set\r
+  Full-duplex, 1000Mb/s, media type is T\r
+ap1#"""
+
+showAssociations = """show dot11 associations\r
+\r
+802.11 Client Stations on Dot11Radio0: \r
+\r
+SSID [Guest] : \r
+\r
+MAC Address    IP address      IPV6 address                              Device        Name            Parent         State     \r
+a0b1.c2d3.e4f5 10.20.0.15      ::                                        ccx-client    -               self           Assoc    \r
+a0b1.c2d3.e4f6 10.20.0.16      ::                                        ccx-client    -               self           Assoc    \r
+\r
+802.11 Client Stations on Dot11Radio1: \r
+\r
+SSID [Guest] : \r
+\r
+MAC Address    IP address      IPV6 address                              Device        Name            Parent         State     \r
+a0b1.c2d3.e4f7 10.20.0.17      ::                                        11n-client    -               self           Assoc    \r
+\r
+ap1#"""
+
+showLocation = """show snmp location\r
+Server Room\r
+ap1#"""
+
+class FakeShell():
+    '''
+    Interactive IOS shell that answers commands with
+    captured output.
+    '''
+    def __init__(self, enableSecret):
+        '''
+        Constructor for FakeShell(), logged in at an
+        unprivileged prompt.
+        '''
+        self.enableSecret = enableSecret
+        self.pending = "\r\nap1>"
+        self.sent = []
+        self.closed = False
+        self.mode = "exec"
+        self.questions = []
+        self.responses = {"show version": showVersion, "show interfaces GigabitEthernet0": showInterface, \
+            "show dot11 associations": showAssociations, "show snmp location": showLocation}
+
+    def prompt(self):
+        '''
+        Prompt for the current mode.
+        '''
+        return {"user": "ap1>", "config": "ap1(config)#"}.get(self.mode, "ap1#")
+
+    def send(self, data):
+        '''
+        Answer one line the way IOS would.
+        '''
+        line = data.rstrip("\n")
+        self.sent.append(line)
+
+        if self.mode == "password":
+            self.mode = "exec" if line == self.enableSecret else "user"
+            self.pending += "\r\n" + ("" if self.mode == "exec" else "% Access denied\r\n\r\n") + self.prompt()
+        elif self.questions:
+            question = self.questions.pop(0)
+            self.pending += "\r\n" + (question if question is not None else "Building configuration...\r\n[OK]\r\n" + self.prompt())
+        elif line == "enable":
+            self.mode = "password"
+            self.pending += "enable\r\nPassword: "
+        elif line in self.responses:
+            self.pending += self.responses[line][len(line):]
+        elif line.startswith("copy "):
+            destination = line.split()[-1]
+            if destination.startswith("tftp://"):
+                host, filename = destination[len("tftp://"):].split("/")
+                self.questions = ["Destination filename [{}]? ".format(filename), None]
+                self.pending += line + "\r\nAddress or name of remote host [{}]? ".format(host)
+            else:
+                self.questions = [None]
+                self.pending += line + "\r\nDestination filename [startup-config]? "
+        elif line.startswith("bogus"):
+            self.pending += line + "\r\n                ^\r\n% Invalid input detected at '^' marker.\r\n\r\n" + self.prompt()
+        else:
+            if line == "configure terminal":
+                self.mode = "config"
+            elif line == "end":
+                self.mode = "exec"
+            self.pending += line + "\r\n" + self.prompt()
+
+    def recv_ready(self):
+        return bool(self.pending)
+
+    def recv(self, size):
+        output, self.pending = self.pending[:size], self.pending[size:]
+        return output.encode('utf-8')
+
+class FakeClient():
+    '''
+    paramiko.SSHClient() handing out a FakeShell().
+    '''
+    def __init__(self, shell):
+        self.shell = shell
+        self.connected = None
+
+    def set_missing_host_key_policy(self, policy):
+        pass
+
+    def connect(self, ip, **kwargs):
+        self.connected = dict(kwargs, ip=ip)
+
+    def get_transport(self):
+        return self
+
+    def set_keepalive(self, interval):
+        pass
+
+    def is_active(self):
+        return not self.shell.closed
+
+    def invoke_shell(self):
+        return self.shell
+
+    def close(self):
+        self.shell.closed = True
+
+class TestParseFetchInfo(unittest.TestCase):
+    '''
+    Object for testing parseFetchInfo() against
+    captured IOS output.
+    '''
+    def testCaptured(self):
+        '''
+        Test that captured output parses into the
+        positional list scout's fetcher returns
+        '''
+        self.assertEqual(iosCommands.parseFetchInfo(showVersion, showInterface, showAssociations, showLocation), \
+            ["0011.2233.4455", "1000Mbps", "Cisco IOS Software, C2600 Software (AP3G2-K9W7-M), Version 15.3(3)JD4, RELEASE SOFTWARE (fc1)", \
+            "1 week, 2 days, 3 hours, 4 minutes", "FGL1234ABCD", "AIR-CAP2602I-A-K9", 3, "Server Room"])
+
+    def testNoClients(self):
+        '''
+        Test an access point without associations
+        or location
+        '''
+        apInfo = iosCommands.parseFetchInfo(showVersion, showInterface, "show dot11 associations\r\n\r\nap1#", "show snmp location\r\n\r\nap1#")
+        self.assertEqual((apInfo[6], apInfo[7]), (0, ""))
+
+    def testModelFallback(self):
+        '''
+        Test that the model is read from the processor line
+        when "show version" has no Product/Model Number
+        '''
+        version = "\r\n".join(line for line in showVersion.split("\r\n") if not line.startswith("Product/Model"))
+        self.assertEqual(iosCommands.parseFetchInfo(version, showInterface, showAssociations, showLocation)[5], "AIR-CAP2602I-A-K9")
+
+    def testUnparsable(self):
+        '''
+        Test that missing fields are left empty rather than raising
+        '''
+        self.assertEqual(iosCommands.parseFetchInfo("", "", "", ""), ["", "0Mbps", "", "", "", "", 0, ""])
+
+class TestCommandTemplates(unittest.TestCase):
+    '''
+    Object for testing the IOS command templates.
+    '''
+    def testConfigChanges(self):
+        '''
+        Test that configuration templates enter and leave
+        configuration mode
+        '''
+        for commands in (iosCommands.changeName(apName="ap2"), iosCommands.enableHttp(), iosCommands.disableHttp(), \
+            iosCommands.enableSnmp(snmp="public"), iosCommands.disableSnmp(), \
+            iosCommands.createSsid(band="24", ssid="Guest", wpa2Pass="changeme", vlan=20, bridgeGroup=20, radioSub=20, gigaSub=20), \
+            iosCommands.deleteSsid(band="5", ssid="Guest", vlan=20, radioSub=20, gigaSub=20)):
+            self.assertEqual((commands[0], commands[-1]), ("configure terminal", "end"))
+
+        self.assertNotEqual(iosCommands.tftpBackup(tftpIp="192.0.2.9", apName="ap1")[0], "configure terminal")
+        self.assertNotEqual(iosCommands.writeMemory()[0], "configure terminal")
+
+    def testCreateSsid(self):
+        '''
+        Test that an SSID is bridged onto its VLAN on the
+        radio of its band
+        '''
+        commands = iosCommands.createSsid(band="5", ssid="Guest", wpa2Pass="changeme", vlan=20, bridgeGroup=21, radioSub=22, gigaSub=23)
+
+        self.assertEqual(commands[1:7], ["dot11 ssid Guest", "vlan 20", "authentication open", "authentication key-management wpa version 2", \
+            "wpa-psk ascii 0 changeme", "exit"])
+        self.assertIn("interface Dot11Radio1.22", commands)
+        self.assertIn("interface GigabitEthernet0.23", commands)
+        self.assertEqual(commands.count("bridge-group 21"), 2)
+        self.assertEqual(commands[-3:], ["interface Dot11Radio1", "ssid Guest", "end"])
+        self.assertIn("interface Dot11Radio0", iosCommands.createSsid(band="24", ssid="Guest", wpa2Pass="changeme", vlan=20, bridgeGroup=21, \
+            radioSub=22, gigaSub=23))
+
+    def testCreateSsidRadius(self):
+        '''
+        Test that an 802.1x SSID points at its RADIUS server
+        '''
+        commands = iosCommands.createSsidRadius(band="24", ssid="Staff", vlan=30, bridgeGroup=30, radioSub=30, gigaSub=30, radiusIp="192.0.2.5", \
+            sharedSecret="s3cret", authPort=1812, acctPort=1813, radiusTimeout=5, radiusGroup="RADIUS", methodList="EAP")
+
+        self.assertIn("address ipv4 192.0.2.5 auth-port 1812 acct-port 1813", commands)
+        self.assertIn("aaa authentication login EAP group RADIUS", commands)
+        self.assertIn("authentication open eap EAP", commands)
+        self.assertEqual(commands[-3:], ["interface Dot11Radio0", "ssid Staff", "end"])
+
+class TestApSession(unittest.TestCase):
+    '''
+    Object for testing ApSession() against an IOS
+    shell replaying captured output.
+    '''
+    def setUp(self):
+        '''
+        Hand out a FakeShell() instead of connecting.
+        '''
+        self.shell = FakeShell(enableSecret="enable-secret")
+        self.client = FakeClient(self.shell)
+
+        patcher = mock.patch.object(paramiko, "SSHClient", lambda: self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def testEnablePassword(self):
+        '''
+        Test that the stored enable password is entered at
+        the enable prompt, not the SSH password
+        '''
+        session = ApSession(1, "192.0.2.1", 22, "cisco", "ssh-password", 5, enablePassword="enable-secret")
+
+        self.assertEqual(self.shell.sent, ["enable", "enable-secret", "terminal length 0"])
+        self.assertEqual(self.client.connected["password"], "ssh-password")
+        self.assertTrue(session.alive())
+
+    def testEnableFallback(self):
+        '''
+        Test that the SSH password is entered when no
+        enable password is stored
+        '''
+        self.shell.enableSecret = "ssh-password"
+        ApSession(1, "192.0.2.1", 22, "cisco", "ssh-password", 5)
+
+        self.assertEqual(self.shell.sent[:2], ["enable", "ssh-password"])
+
+    def testEnableRejected(self):
+        '''
+        Test that a rejected enable password fails the
+        session instead of leaving it unprivileged
+        '''
+        with self.assertRaisesRegex(paramiko.AuthenticationException, "enable password"):
+            ApSession(1, "192.0.2.1", 22, "cisco", "ssh-password", 5)
+
+        self.assertTrue(self.shell.closed)
+
+    def testFetchInfo(self):
+        '''
+        Test that fetchInfo() commands sent over a session
+        parse like the captured output
+        '''
+        session = ApSession(1, "192.0.2.1", 22, "cisco", "ssh-password", 5, enablePassword="enable-secret")
+        apInfo = iosCommands.parseFetchInfo(*[session.send([command]) for command in iosCommands.fetchInfo()])
+
+        self.assertEqual(apInfo, iosCommands.parseFetchInfo(showVersion, showInterface, showAssociations, showLocation))
+
+    def testConfirmPrompts(self):
+        '''
+        Test that copy prompts are answered with their defaults
+        '''
+        session = ApSession(1, "192.0.2.1", 22, "cisco", "ssh-password", 5, enablePassword="enable-secret")
+
+        self.assertIn("[OK]", session.send(iosCommands.writeMemory()))
+        self.assertEqual(self.shell.sent[-2:], ["copy running-config startup-config", ""])
+
+        session.send(iosCommands.tftpBackup(tftpIp="192.0.2.9", apName="ap1"))
+        self.assertEqual(self.shell.sent[-3:], ["copy running-config tftp://192.0.2.9/ap1-confg", "", ""])
+
+    def testRejectedCommand(self):
+        '''
+        Test that a rejected line raises and the session
+        recovers to an exec prompt
+        '''
+        session = ApSession(1, "192.0.2.1", 22, "cisco", "ssh-password", 5, enablePassword="enable-secret")
+        session.send(iosCommands.enableHttp())
+
+        with self.assertRaisesRegex(SshCommandError, "bogus command"):
+            session.send(["configure terminal", "bogus command"])
+        self.assertTrue(session.recover())
+
+if __name__ == "__main__":
+    unittest.main()
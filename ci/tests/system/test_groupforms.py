@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+import os
+import sys
+import unittest
+from unittest import mock
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "webapp"))
+
+from cardinal.system.accesspoints import AccessPointGroup
+from cardinal.system.accesspoints import Ssid24Ghz
+from cardinal.views.cardinal_ap_group_ops import cardinal_ap_group_ops
+from cardinal.views.cardinal_forms import cardinal_forms
+from flask import Flask
+from flask_login import LoginManager
+
+class TestGroupForms(unittest.TestCase):
+    '''
+    Object for testing the group operation forms and
+    REST endpoints against a recording dispatch().
+    '''
+    def setUp(self):
+        '''
+        Serve the group ops and forms blueprints without
+        logins, and record every group dispatch.
+        '''
+        app = Flask(__name__)
+        app.secret_key = "test"
+        app.config["LOGIN_DISABLED"] = True
+        LoginManager().init_app(app)
+        app.register_blueprint(cardinal_ap_group_ops)
+        app.register_blueprint(cardinal_forms)
+        self.client = app.test_client()
+
+        self.dispatched = []
+        self.groupJobId = "3f1d6c8e-group-job"
+
+        def dispatch(group, id, operation, **kwargs):
+            self.dispatched.append(dict(kwargs, id=id, operation=operation))
+            return self.groupJobId
+
+        patches = ((AccessPointGroup, "dispatch", dispatch), (AccessPointGroup, "info", lambda group, id=None, **kwargs: [dict(ap_group_id=int(id))]), \
+            (Ssid24Ghz, "info", lambda ssid, id=None, **kwargs: [dict(ap_ssid_id=int(id))]))
+        for target, name, value in patches:
+            patcher = mock.patch.object(target, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def redirected(self, response):
+        '''
+        Return the path and query arguments a form
+        redirected to.
+        '''
+        self.assertEqual(response.status_code, 302)
+        location = urlparse(response.headers["Location"])
+        return location.path, {name: values[0] for name, values in parse_qs(location.query).items()}
+
+    def testHttpForm(self):
+        '''
+        Test that the HTTP form dispatches for the group in the
+        session and redirects back with the group job id
+        '''
+        with self.client.session_transaction() as session:
+            session["apGroupId"] = 3
+            session["apGroupName"] = "Lobby"
+
+        path, args = self.redirected(self.client.post("/enable-ap-group-http"))
+
+        self.assertEqual(self.dispatched, [dict(id=3, operation="manageHttp", status="enable")])
+        self.assertEqual(path, "/config-ap-group-http")
+        self.assertEqual(args["job_id"], self.groupJobId)
+        self.assertIn("Lobby", args["status"])
+
+    def testSsidForm(self):
+        '''
+        Test that the group SSID forms redirect to their
+        matching form page
+        '''
+        path, args = self.redirected(self.client.post("/deploy-ssid-24ghz-group", data=dict(ap_group_id="4", ssid_id="9")))
+        self.assertEqual(self.dispatched[-1], dict(id="4", operation="deploy24GhzSsid", ssidId="9"))
+        self.assertEqual((path, args["job_id"]), ("/forms/deploy-ssid-24ghz-group", self.groupJobId))
+
+        path, args = self.redirected(self.client.post("/remove-ssid-5ghz-radius-group", data=dict(ap_group_id="4", ssid_id="2")))
+        self.assertEqual(self.dispatched[-1], dict(id="4", operation="remove5GhzRadiusSsid", ssidId="2"))
+        self.assertEqual(path, "/forms/remove-ssid-5ghz-radius-group")
+
+    def testFormError(self):
+        '''
+        Test that a failed dispatch is shown without a
+        group job id to stream
+        '''
+        self.groupJobId = "ERROR: Access point group 4 has no access points."
+        path, args = self.redirected(self.client.post("/get-ap-group-tftp-backup", data=dict(ap_group_id="4", tftp_ip="10.0.0.5")))
+
+        self.assertEqual(self.dispatched, [dict(id="4", operation="tftpBackup", tftpIp="10.0.0.5")])
+        self.assertEqual(path, "/get-ap-group-tftp-backup")
+        self.assertEqual(args["status"], self.groupJobId)
+        self.assertNotIn("job_id", args)
+
+    def testSsidEndpoint(self):
+        '''
+        Test the group SSID REST endpoints
+        '''
+        response = self.client.post("/api/v1/access_point_groups/4/ops/deploy_ssid/24ghz", data=dict(ssid_id="9"))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json()["reference"], self.groupJobId)
+        self.assertEqual(self.dispatched, [dict(id=4, operation="deploy24GhzSsid", ssidId="9")])
+
+        response = self.client.post("/api/v1/access_point_groups/4/ops/deploy_ssid/6ghz", data=dict(ssid_id="9"))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(self.dispatched), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+import fakeredis
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "webapp"))
+
+from cardinal.system import accesspoints
+from cardinal.system.accesspoints import AccessPointGroup
+from cardinal.system.accesspoints import dispatchGroupTasks
+from cardinal.system.common import AsyncOpsManager
+from cardinal.system.common import CardinalEnv
+from cardinal.system.groupjobs import GroupJob
+from cardinal.system.settings import cardinalSettings
+
+class TestGroupJob(unittest.TestCase):
+    '''
+    Object for testing how group operations are dispatched
+    and how their progress is reported.
+    '''
+    def setUp(self):
+        '''
+        Point CardinalEnv() at an in-memory Redis, with
+        an access point group of three members.
+        '''
+        self.redis = fakeredis.FakeRedis()
+        self.tunings = dict(cardinalSettings.snapshot(), groupBackend="rq", groupPrecheck="off")
+
+        for name, value in (("redis", lambda env: self.redis), ("releaseSql", lambda env: None), ("tunings", property(lambda env: self.tunings))):
+            patcher = mock.patch.object(CardinalEnv, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        for name, value in (("members", lambda group, id: [1, 2, 3]), ("sites", lambda group, apIds: "ERROR: No sites")):
+            patcher = mock.patch.object(AccessPointGroup, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.queue = AsyncOpsManager().queue("bulk")
+
+    def testStatus(self):
+        '''
+        Test that per access point transitions add up to
+        the group job's state
+        '''
+        groupJob = GroupJob()
+        groupJobId = groupJob.create(operation="manageHttp", apIds=[1, 2, 3])
+
+        groupStatus = groupJob.status(groupJobId)
+        self.assertEqual(groupStatus["state"], "queued")
+        self.assertEqual(groupStatus["counts"]["queued"], 3)
+        self.assertEqual([i["ap_id"] for i in groupStatus["access_points"]], [1, 2, 3])
+
+        groupJob.update(groupJobId, 1, "started")
+        self.assertEqual(groupJob.status(groupJobId)["state"], "started")
+
+        groupJob.update(groupJobId, 1, "succeeded")
+        groupJob.update(groupJobId, 2, "failed", detail="Authentication failed")
+        groupJob.update(groupJobId, 3, "succeeded")
+
+        groupStatus = groupJob.status(groupJobId)
+        self.assertEqual(groupStatus["state"], "finished")
+        self.assertEqual((groupStatus["counts"]["succeeded"], groupStatus["counts"]["failed"]), (2, 1))
+        self.assertEqual(groupStatus["access_points"][1]["detail"], "Authentication failed")
+
+        self.assertIsNone(groupJob.status("missing"))
+
+    def testDispatch(self):
+        '''
+        Test that dispatch() returns right away with one
+        dispatcher job, which fans out one job per access point
+        '''
+        groupJobId = AccessPointGroup().dispatch(id=7, operation="manageHttp", status="enable")
+
+        self.assertEqual(len(self.queue), 1)
+        dispatcher = self.queue.jobs[0]
+        self.assertEqual(dispatcher.func_name, "cardinal.system.accesspoints.dispatchGroupTasks")
+
+        groupStatus = GroupJob().status(groupJobId)
+        self.assertEqual((groupStatus["state"], groupStatus["ap_group_id"], groupStatus["total"]), ("queued", 7, 3))
+        self.assertEqual({i["job_id"] for i in groupStatus["access_points"]}, {dispatcher.id})
+
+        self.assertEqual(dispatchGroupTasks(**dispatcher.kwargs), dict(dispatched=3))
+
+        apJobs = {job.id: job for job in self.queue.jobs if job.id != dispatcher.id}
+        self.assertEqual(len(apJobs), 3)
+        for apState in GroupJob().status(groupJobId)["access_points"]:
+            apJob = apJobs[apState["job_id"]]
+            self.assertEqual(apJob.kwargs, dict(groupJobId=groupJobId, apId=apState["ap_id"], operation="manageHttp", kwargs=dict(status="enable")))
+            self.assertEqual(apJob.meta["group_job_id"], groupJobId)
+
+    def testUnsupported(self):
+        '''
+        Test that only group operations can be dispatched
+        '''
+        self.assertTrue(AccessPointGroup().dispatch(id=7, operation="changeIp").startswith("ERROR"))
+        self.assertEqual(len(self.queue), 0)
+
+    def testCancelQueued(self):
+        '''
+        Test that cancelling marks access points whose job
+        never started as aborted
+        '''
+        groupJobId = AccessPointGroup().dispatch(id=7, operation="manageHttp", status="enable")
+        dispatchGroupTasks(**self.queue.jobs[0].kwargs)
+
+        self.assertTrue(GroupJob().cancel(groupJobId))
+
+        groupStatus = GroupJob().status(groupJobId)
+        self.assertEqual(groupStatus["state"], "aborted")
+        self.assertEqual(groupStatus["counts"]["aborted"], 3)
+        self.assertTrue(groupStatus["cancelled"])
+        self.assertFalse(GroupJob().cancel("missing"))
+
+    def testCancelWhileDispatching(self):
+        '''
+        Test that a group cancelled while its dispatcher runs
+        stops dispatching
+        '''
+        groupJobId = AccessPointGroup().dispatch(id=7, operation="manageHttp", status="enable")
+        dispatcher = self.queue.jobs[0]
+
+        def precheckGroup(groupJob, groupJobId, apIds):
+            GroupJob().annotate(groupJobId, cancelled=True)
+            return apIds
+
+        with mock.patch.object(accesspoints, "precheckGroup", precheckGroup):
+            self.assertEqual(dispatchGroupTasks(**dispatcher.kwargs), dict(dispatched=0))
+
+        self.assertEqual([job.id for job in self.queue.jobs], [dispatcher.id])
+        groupStatus = GroupJob().status(groupJobId)
+        self.assertEqual(groupStatus["state"], "aborted")
+        self.assertEqual(groupStatus["counts"]["aborted"], 3)
+
+    def testEventsTimeout(self):
+        '''
+        Test that an event stream ends after sseTimeout
+        seconds, and right away for a finished group job
+        '''
+        self.tunings.update(sseTimeout=0, sseKeepalive=0.01)
+        groupJob = GroupJob()
+        groupJobId = groupJob.create(operation="manageHttp", apIds=[1, 2])
+
+        events = list(groupJob.events(groupJobId))
+        self.assertEqual([event.split("\n")[0] for event in events], ["event: status", "event: timeout"])
+
+        self.tunings["sseTimeout"] = 60
+        groupJob.update(groupJobId, 1, "succeeded")
+        groupJob.update(groupJobId, 2, "succeeded")
+        events = list(groupJob.events(groupJobId))
+        self.assertTrue(events[-1].startswith("event: finished"))
+
+        self.assertEqual(list(groupJob.events("missing")), [])
+
+    def testStreamLimit(self):
+        '''
+        Test that only sseMaxStreams event streams may be
+        open at once
+        '''
+        self.tunings["sseMaxStreams"] = 2
+        groupJob = GroupJob()
+
+        self.assertTrue(groupJob.claimStream())
+        self.assertTrue(groupJob.claimStream())
+        self.assertFalse(groupJob.claimStream())
+
+        groupJob.releaseStream()
+        self.assertTrue(groupJob.claimStream())
+        groupJob.releaseStream()
+        groupJob.releaseStream()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+import fakeredis
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "webapp"))
+
+from cardinal.system.accesspoints import AccessPoint
+from cardinal.system.circuitbreaker import CircuitBreaker
+from cardinal.system.common import CardinalEnv
+from cardinal.system.common import JobCancelled
+from cardinal.system.common import jobCancelKey
+from cardinal.system.jobcontext import DeadlineExceeded
+from cardinal.system.jobcontext import JobContext
+from cardinal.system.jobcontext import jobContext
+from cardinal.system.settings import cardinalSettings
+
+class TestJobContextCall(unittest.TestCase):
+    '''
+    Object for testing how JobContext.call() bounds calls
+    without a timeout of their own (e.g. scout).
+    '''
+    def setUp(self):
+        '''
+        Point CardinalEnv() at an in-memory Redis with
+        a short cancellation poll.
+        '''
+        self.redis = fakeredis.FakeRedis()
+        self.tunings = dict(cardinalSettings.snapshot(), jobCancelPoll=0.05, breakerThreshold=1)
+
+        for name, value in (("redis", lambda env: self.redis), ("tunings", property(lambda env: self.tunings)), \
+            ("encryption", lambda env, input, action: input)):
+            patcher = mock.patch.object(CardinalEnv, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+    def stalled(self, **kwargs):
+        '''
+        A call that hangs until the test ends.
+        '''
+        self.release.wait(10)
+        return "late"
+
+    def testOutsideJob(self):
+        '''
+        Test that calls outside of a job run on the
+        calling thread
+        '''
+        self.assertEqual(JobContext().call(lambda **kwargs: (threading.current_thread(), kwargs), ip="192.0.2.1"), \
+            (threading.current_thread(), dict(ip="192.0.2.1")))
+
+    def testResult(self):
+        '''
+        Test that results and errors of a call within a job
+        are handed back
+        '''
+        context = JobContext(jobId="job-1", deadline=time.time() + 10)
+        self.assertEqual(context.call(lambda **kwargs: kwargs["ip"], ip="192.0.2.1"), "192.0.2.1")
+
+        def failing(**kwargs):
+            raise OSError("No route to host")
+        self.assertRaises(OSError, context.call, failing)
+
+    def testDeadline(self):
+        '''
+        Test that a stalled call is abandoned at the deadline
+        '''
+        started = time.time()
+        self.assertRaises(DeadlineExceeded, JobContext(jobId="job-1", deadline=time.time() + 0.2).call, self.stalled)
+        self.assertLess(time.time() - started, 1)
+
+    def testCancelled(self):
+        '''
+        Test that a cancelled job stops waiting on a stalled call,
+        and that nothing is called once it is cancelled
+        '''
+        context = JobContext(jobId="job-1")
+        threading.Timer(0.2, lambda: self.redis.set(jobCancelKey("job-1"), 1)).start()
+
+        started = time.time()
+        self.assertRaises(JobCancelled, context.call, self.stalled)
+        self.assertLess(time.time() - started, 1)
+
+        calls = []
+        context.lastCheck = 0
+        self.assertRaises(JobCancelled, context.call, lambda **kwargs: calls.append(kwargs))
+        self.assertEqual(calls, [])
+
+    def testScoutDeadline(self):
+        '''
+        Test that a scout call past the job's deadline doesn't
+        count as the access point being unreachable
+        '''
+        apInfo = dict(ap_id=1, ap_ip="192.0.2.1", ap_ssh_username="cisco", ap_ssh_password="secret")
+
+        with jobContext(JobContext(jobId="job-1", deadline=time.time() + 0.2)):
+            self.assertRaises(DeadlineExceeded, AccessPoint().scout, apInfo, self.stalled)
+
+        self.assertEqual(CircuitBreaker().states([1])[1], dict(state="closed", failures=0))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+import copy
+import os
+import re
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "webapp"))
+
+from cardinal.system.common import CardinalEnv
+from cardinal.system.keyrotation import SecretRotation
+from cardinal.system.keyrotation import encryptedColumns
+from cardinal.system.settings import cardinalSettings
+from cryptography.fernet import Fernet
+
+class FakeConnection():
+    '''
+    Stand-in for a MySQLdb connection holding the encrypted
+    tables in memory, with transactions.
+    '''
+    def __init__(self, tables):
+        '''
+        Constructor for FakeConnection()
+        '''
+        self.tables = tables
+        self.saved = None
+        self.failUpdate = None
+        self.updates = 0
+
+    def begin(self):
+        '''
+        Start a transaction.
+        '''
+        self.saved = copy.deepcopy(self.tables)
+
+    def commit(self):
+        '''
+        Keep the transaction's changes.
+        '''
+        self.saved = None
+
+    def rollback(self):
+        '''
+        Undo the transaction's changes.
+        '''
+        self.tables.clear()
+        self.tables.update(self.saved)
+        self.saved = None
+
+    def cursor(self, *args):
+        '''
+        Cursors run against the connection's tables.
+        '''
+        return self
+
+    def close(self):
+        '''
+        Nothing to close.
+        '''
+        pass
+
+    def execute(self, statement, args):
+        '''
+        Answer a chunked SELECT ... FOR UPDATE.
+        '''
+        primaryKey, columns, table = re.match(r"SELECT (\w+), (.+) FROM (\w+) WHERE", statement).groups()
+        lastId, chunkSize = args
+        ids = sorted(rowId for rowId in self.tables[table] if rowId > lastId)[:chunkSize]
+        self.rows = [(rowId,) + tuple(self.tables[table][rowId][column] for column in columns.split(", ")) for rowId in ids]
+
+    def fetchall(self):
+        '''
+        Rows from the last SELECT.
+        '''
+        return self.rows
+
+    def executemany(self, statement, args):
+        '''
+        Apply an UPDATE to every row, rewriting one row at
+        a time so a failure leaves the chunk half done.
+        '''
+        table, assignments = re.match(r"UPDATE (\w+) SET (.+) WHERE", statement).groups()
+        columns = [assignment.split(" = ")[0] for assignment in assignments.split(", ")]
+        for values in args:
+            if self.failUpdate == self.updates:
+                raise Exception("Lock wait timeout exceeded; try restarting transaction")
+            self.updates += 1
+            self.tables[table][values[-1]].update(zip(columns, values[:-1]))
+
+class TestSecretRotation(unittest.TestCase):
+    '''
+    Object for testing re-encryption of stored secrets
+    from a retired key to the current one.
+    '''
+    def setUp(self):
+        '''
+        Encrypt every secret with an old key, then make a
+        new key current with the old one kept for decryption.
+        '''
+        self.oldKey = Fernet.generate_key().decode('utf-8')
+        self.newKey = Fernet.generate_key().decode('utf-8')
+
+        oldSuite = Fernet(bytes(self.oldKey, 'utf-8'))
+        tables = dict()
+        for table, primaryKey, columns in encryptedColumns:
+            tables[table] = dict()
+            for rowId in range(1, 8):
+                tables[table][rowId] = {column: oldSuite.encrypt(bytes("{0}-{1}-{2}".format(table, rowId, column), 'utf-8')).decode('utf-8') for column in columns}
+        # Empty secrets are left alone
+        tables["access_points"][3]["ap_snmp"] = None
+
+        self.conn = FakeConnection(tables)
+        self.tunings = dict(cardinalSettings.snapshot(), encryptKey=self.newKey, encryptKeyPrevious=self.oldKey, encryptChunkSize=3)
+
+        for name, value in (("sql", lambda env: self.conn), ("releaseSql", lambda env: None), ("tunings", property(lambda env: self.tunings))):
+            patcher = mock.patch.object(CardinalEnv, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def assertRotated(self):
+        '''
+        Assert that every secret decrypts with the new key
+        alone, to its original value.
+        '''
+        newSuite = Fernet(bytes(self.newKey, 'utf-8'))
+        for table, primaryKey, columns in encryptedColumns:
+            for rowId, row in self.conn.tables[table].items():
+                for column in columns:
+                    if row[column] is None:
+                        continue
+                    self.assertEqual(newSuite.decrypt(bytes(row[column], 'utf-8')).decode('utf-8'), "{0}-{1}-{2}".format(table, rowId, column))
+
+    def testRoundTrip(self):
+        '''
+        Test that every row is rewritten across several
+        chunks, and that a second run has nothing to do
+        '''
+        result = SecretRotation().run()
+
+        self.assertEqual(result["rotated"], {table: 7 for table, primaryKey, columns in encryptedColumns})
+        self.assertRotated()
+
+        result = SecretRotation().run()
+        self.assertEqual(result["rotated"], {table: 0 for table, primaryKey, columns in encryptedColumns})
+
+    def testExactChunks(self):
+        '''
+        Test a chunk size that divides the table evenly
+        '''
+        result = SecretRotation().run(chunkSize=7)
+
+        self.assertEqual(result["rotated"]["access_points"], 7)
+        self.assertRotated()
+
+    def testResume(self):
+        '''
+        Test that an interrupted chunk is rolled back and
+        that the next run finishes the rotation
+        '''
+        # Fail in the middle of the second access_points chunk
+        self.conn.failUpdate = 4
+        result = SecretRotation().run()
+        self.assertTrue(result.startswith("ERROR"))
+
+        newSuite = SecretRotation()
+        newSuite.primaryKey = Fernet(bytes(self.newKey, 'utf-8'))
+        current = [rowId for rowId, row in self.conn.tables["access_points"].items() if newSuite.current(row["ap_ssh_password"])]
+        self.assertEqual(current, [1, 2, 3])
+
+        self.conn.failUpdate = None
+        result = SecretRotation().run()
+
+        self.assertEqual(result["rotated"]["access_points"], 4)
+        self.assertEqual(result["rotated"]["ssids_5ghz"], 7)
+        self.assertRotated()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+import fakeredis
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "webapp"))
+
+from cardinal.system import accesspoints
+from cardinal.system import sshpool
+from cardinal.system.accesspoints import AccessPoint
+from cardinal.system.common import CardinalEnv
+from cardinal.system.settings import cardinalSettings
+from cardinal.system.sshpool import cardinalSshPool
+
+class FakeSession(sshpool.ApSession):
+    '''
+    ApSession() that records every command sent over
+    it instead of connecting.
+    '''
+    opened = []
+
+    def __init__(self, apId, ip, port, username, password, timeout, enablePassword=None):
+        self.apId = apId
+        self.fingerprint = self.fingerprintFor(ip, port, username, password)
+        self.lock = threading.Lock()
+        self.lastUsed = time.time()
+        self.enablePassword = enablePassword
+        self.commands = []
+        self.closed = False
+        FakeSession.opened.append(self)
+
+    def send(self, commands, timeout=None):
+        self.commands += commands
+        return ""
+
+    def alive(self):
+        return not self.closed
+
+    def recover(self, timeout=None):
+        return True
+
+    def close(self):
+        self.closed = True
+
+class TestPlan(unittest.TestCase):
+    '''
+    Object for testing that an operation plan runs over
+    a single SSH session.
+    '''
+    def setUp(self):
+        '''
+        Point CardinalEnv() at an in-memory Redis and one access
+        point, and open FakeSession() objects instead of SSH sessions.
+        '''
+        self.redis = fakeredis.FakeRedis()
+        self.tunings = dict(cardinalSettings.snapshot(), sshSessionReuse="off", writeMemoryDebounce=30)
+        self.apInfo = dict(ap_id=1, ap_name="ap1", ap_ip="192.0.2.1", ap_ssh_port=22, ap_ssh_username="cisco", ap_ssh_password="secret", \
+            ap_snmp="public")
+
+        for name, value in (("redis", lambda env: self.redis), ("tunings", property(lambda env: self.tunings)), \
+            ("encryption", lambda env, input, action: input)):
+            patcher = mock.patch.object(CardinalEnv, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        for target, name, value in ((AccessPoint, "info", lambda ap, id, secrets=False: [dict(self.apInfo)]), \
+            (sshpool, "ApSession", FakeSession), (cardinalSettings, "snapshot", lambda: self.tunings), \
+            (accesspoints, "scoutSys", mock.Mock())):
+            patcher = mock.patch.object(target, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        FakeSession.opened = []
+        cardinalSshPool.reset()
+        self.addCleanup(cardinalSshPool.reset)
+
+        self.steps = [dict(operation="manageHttp", args=dict(status="enable")), dict(operation="tftpBackup", args=dict(tftpIp="192.0.2.9")), \
+            dict(operation="manageSnmp", args=dict(status="disable"))]
+
+    def testOneSession(self):
+        '''
+        Test that a plan opens exactly one (unpooled) session when
+        sessions aren't reused, and saves once at the end
+        '''
+        planResult = AccessPoint().plan(id=1, steps=self.steps)
+
+        self.assertEqual((planResult["succeeded"], planResult["failed"]), (4, 0))
+        self.assertEqual(planResult["steps"][-1], dict(step=3, operation="writeMemory", status="succeeded"))
+        self.assertEqual(len(FakeSession.opened), 1)
+
+        session = FakeSession.opened[0]
+        self.assertTrue(session.closed)
+        self.assertEqual(session.commands.count("copy running-config startup-config"), 1)
+        self.assertEqual(session.commands[-1], "copy running-config startup-config")
+        self.assertIn("copy running-config tftp://192.0.2.9/ap1-confg", session.commands)
+        self.assertEqual(cardinalSshPool.info()["open"], 0)
+        accesspoints.scoutSys.scoutDoWr.assert_not_called()
+        accesspoints.scoutSys.scoutEnableHttp.assert_not_called()
+
+    def testPooledSession(self):
+        '''
+        Test that with sshSessionReuse on a plan and the
+        operations after it share the pooled session
+        '''
+        self.tunings["sshSessionReuse"] = "on"
+
+        AccessPoint().plan(id=1, steps=self.steps)
+        AccessPoint().manageHttp(id=1, status="disable")
+
+        self.assertEqual(len(FakeSession.opened), 1)
+        self.assertFalse(FakeSession.opened[0].closed)
+        self.assertEqual(cardinalSshPool.info()["reused"], 1)
+
+    def testEnablePassword(self):
+        '''
+        Test that sessions are opened with the stored enable
+        password, if the access point has one
+        '''
+        AccessPoint().plan(id=1, steps=self.steps)
+        self.apInfo["ap_enable_password"] = "enable-secret"
+        AccessPoint().plan(id=1, steps=self.steps)
+
+        self.assertEqual([session.enablePassword for session in FakeSession.opened], [None, "enable-secret"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+import fakeredis
+import os
+import sys
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "webapp"))
+
+from cardinal.system import accesspoints
+from cardinal.system.common import AsyncOpsManager
+from cardinal.system.common import CardinalEnv
+from cardinal.system.poller import TelemetryPoller
+from rq.registry import ScheduledJobRegistry
+from cardinal.system.settings import cardinalSettings
+
+def fetchInfoResult(clients, bandwidth):
+    '''
+    fetchInfo() output (as returned by scout's fetcher) with
+    the given client count and bandwidth.
+    '''
+    return ["0011.2233.4455", "{}Mbps".format(bandwidth), "15.3(3)JD4", "1 day", "FGL1234ABCD", "AIR-CAP2602I-A-K9", str(clients), "Server Room"]
+
+class TestTelemetryPoller(unittest.TestCase):
+    '''
+    Object for testing adaptive polling intervals and
+    the poll budget of TelemetryPoller().
+    '''
+    def setUp(self):
+        '''
+        Point CardinalEnv() at an in-memory Redis and
+        fixed poll tunings.
+        '''
+        self.redis = fakeredis.FakeRedis()
+        self.tunings = dict(cardinalSettings.snapshot(), pollInterval=300, pollAdaptive="on", pollIntervalMin=60, pollIntervalMax=1800, \
+            pollVolatility=0.2, pollBudget=600, pollSpread=0, pollConcurrency=4)
+
+        for name, value in (("redis", lambda env: self.redis), ("tunings", property(lambda env: self.tunings))):
+            patcher = mock.patch.object(CardinalEnv, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.poller = TelemetryPoller()
+
+    def testStableStretches(self):
+        '''
+        Test that a steady access point is polled less often,
+        up to pollIntervalMax
+        '''
+        self.assertEqual(self.poller.adapt(1, fetchInfoResult(20, 100)), 300)
+        self.assertEqual(self.poller.adapt(1, fetchInfoResult(21, 100)), 375)
+
+        for i in range(20):
+            interval = self.poller.adapt(1, fetchInfoResult(20, 100))
+        self.assertEqual(interval, 1800)
+
+    def testVolatileShrinks(self):
+        '''
+        Test that a busy access point is polled more often,
+        down to pollIntervalMin
+        '''
+        self.poller.adapt(1, fetchInfoResult(20, 100))
+        self.assertEqual(self.poller.adapt(1, fetchInfoResult(30, 100)), 150)
+        self.assertEqual(self.poller.adapt(1, fetchInfoResult(30, 300)), 75)
+        self.assertEqual(self.poller.adapt(1, fetchInfoResult(10, 300)), 60)
+
+    def testSmallCountsAreNoisy(self):
+        '''
+        Test that one extra client on a quiet access point
+        doesn't count as volatile
+        '''
+        self.poller.adapt(1, fetchInfoResult(1, 100))
+        self.assertEqual(self.poller.adapt(1, fetchInfoResult(2, 100)), 375)
+
+    def testUnparsable(self):
+        '''
+        Test that output that can't be parsed leaves the interval alone
+        '''
+        self.assertIsNone(self.poller.adapt(1, "ERROR: Authentication failed."))
+        self.assertEqual(self.poller.intervals([1]), {1: 300})
+
+    def testIntervals(self):
+        '''
+        Test per access point intervals, and a fixed
+        pollInterval when pollAdaptive is off
+        '''
+        self.poller.markPolled(1, fetchInfoResult(20, 100))
+        self.poller.markPolled(1, fetchInfoResult(20, 100))
+        self.assertEqual(self.poller.intervals([1, 2]), {1: 375, 2: 300})
+
+        self.tunings["pollAdaptive"] = "off"
+        self.poller.markPolled(1, fetchInfoResult(50, 100))
+        self.assertEqual(self.poller.intervals([1, 2]), {1: 300, 2: 300})
+
+    def testDue(self):
+        '''
+        Test that a cycle only polls access points whose
+        interval runs out before the next tick
+        '''
+        now = time.time()
+        self.redis.zadd(self.poller.key("polled"), {1: now - 250, 2: now - 30, 3: now - 250})
+        self.redis.hset(self.poller.key("ap:3"), mapping=dict(clients=5, bandwidth=100, interval=600))
+
+        polled = []
+        with mock.patch.object(TelemetryPoller, "fleet", lambda poller: [1, 2, 3, 4]):
+            cycleStats = self.poller.cycle(polled.append)
+
+        self.assertEqual(sorted(polled), [1, 4])
+        self.assertEqual(cycleStats["skipped"], 2)
+
+    def testBudget(self):
+        '''
+        Test that at most pollBudget polls run per minute,
+        most overdue first
+        '''
+        self.tunings["pollBudget"] = 30
+        now = time.time()
+        self.redis.zadd(self.poller.key("polled"), {apId: now - 60 - apId * 10 for apId in range(1, 101)})
+
+        polled = []
+        with mock.patch.object(TelemetryPoller, "fleet", lambda poller: list(range(1, 101))):
+            cycleStats = self.poller.cycle(polled.append)
+
+        self.assertEqual(sorted(polled), list(range(71, 101)))
+        # Access points 1-17 aren't due yet; 18-70 wait for the next tick
+        self.assertEqual(cycleStats["due"], 30)
+        self.assertEqual(cycleStats["deferred"], 53)
+        self.assertEqual(cycleStats["skipped"], 17)
+
+    def testFreshness(self):
+        '''
+        Test that access points polled on demand within
+        pollFreshness seconds are skipped in adaptive mode too
+        '''
+        now = time.time()
+        self.redis.zadd(self.poller.key("polled"), {1: now - 40, 2: now - 90})
+        self.redis.hset(self.poller.key("ap:1"), mapping=dict(clients=5, bandwidth=100, interval=60))
+        self.redis.hset(self.poller.key("ap:2"), mapping=dict(clients=5, bandwidth=100, interval=60))
+
+        polled = []
+        with mock.patch.object(TelemetryPoller, "fleet", lambda poller: [1, 2]):
+            self.poller.cycle(polled.append)
+
+        self.assertEqual(polled, [2])
+
+    def testChain(self):
+        '''
+        Test that the next cycle is scheduled before polling,
+        so a cycle killed at its timeout doesn't end the chain,
+        and that a retry of that cycle doesn't fork it
+        '''
+        class HardKill(BaseException):
+            pass
+
+        def cycle(poller, poll, batch=None):
+            raise HardKill()
+
+        first = self.poller.schedule(0)
+        registry = ScheduledJobRegistry(queue=AsyncOpsManager().queue("telemetry"))
+
+        for name, value in (("cycle", cycle), ("releaseSql", lambda poller: None)):
+            patcher = mock.patch.object(TelemetryPoller, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        with mock.patch.object(accesspoints, "get_current_job", lambda: first):
+            with self.assertRaises(HardKill):
+                accesspoints.runTelemetryCycle()
+
+            scheduled = registry.get_job_ids()
+            self.assertEqual(len(scheduled), 2)
+            self.assertEqual(self.redis.get(self.poller.key("scheduled")).decode('utf-8'), [jobId for jobId in scheduled if jobId != first.id][0])
+
+            # The retried cycle is no longer the current link
+            self.assertIsNone(accesspoints.runTelemetryCycle())
+            self.assertEqual(len(registry.get_job_ids()), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+import fakeredis
+import os
+import sys
+import unittest
+from datetime import timedelta
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "webapp"))
+
+from cardinal.system.common import AsyncOpsManager
+from cardinal.system.common import CardinalEnv
+from cardinal.system.common import RqJob
+from cardinal.system.common import jobPriorities
+from cardinal.system.common import jobPriorityOf
+from rq.registry import ScheduledJobRegistry
+from rq.utils import utcnow
+
+# Asynchronous work by dotted path, so nothing needs to be importable
+manageHttp = "cardinal.system.accesspoints.AccessPoint.manageHttp"
+runGroupTask = "cardinal.system.accesspoints.runGroupTask"
+flushRqJobResults = "cardinal.system.common.flushRqJobResults"
+
+class TestJobPriorities(unittest.TestCase):
+    '''
+    Object for testing how AsyncOpsManager() routes work
+    to one rq queue per priority class.
+    '''
+    def setUp(self):
+        '''
+        Point CardinalEnv() at an in-memory Redis.
+        '''
+        self.redis = fakeredis.FakeRedis()
+        patcher = mock.patch.object(CardinalEnv, "redis", lambda env: self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def testQueues(self):
+        '''
+        Test that every priority class has a queue of its own
+        '''
+        job = AsyncOpsManager()
+
+        self.assertEqual({priority: job.queue(priority).name for priority in jobPriorities}, \
+            dict(interactive="high", bulk="default", background="low", telemetry="poller"))
+        self.assertEqual({jobPriorityOf(queueName) for queueName in ("high", "default", "low", "poller")}, set(jobPriorities))
+        self.assertIsNone(jobPriorityOf("cardinal"))
+
+        with self.assertRaises(ValueError):
+            job.queue("urgent")
+
+    def testRouting(self):
+        '''
+        Test that run(), runMany() and runIn() enqueue onto
+        the queue of the requested priority class
+        '''
+        job = AsyncOpsManager()
+
+        single = job.run(func=manageHttp, args=dict(id=1, status="enable"))
+        self.assertEqual(single.origin, "high")
+
+        group = job.runMany(func=runGroupTask, argsList=[dict(apId=apId) for apId in range(3)])
+        self.assertEqual({asyncResult.origin for asyncResult in group}, {"default"})
+        self.assertEqual(len(job.queue("bulk")), 3)
+
+        scheduled = job.runIn(func=flushRqJobResults, args=dict(), delay=60)
+        self.assertIn(scheduled.id, ScheduledJobRegistry(queue=job.queue("background")).get_job_ids())
+        self.assertEqual(len(job.queue("background")), 0)
+
+        self.assertEqual(RqJob().status([single.id])[0]["priority"], "interactive")
+
+    def testMetrics(self):
+        '''
+        Test that queue depth, enqueued counts and queue wait
+        are kept per priority class
+        '''
+        job = AsyncOpsManager()
+        interactive = job.run(func=manageHttp, args=dict(id=1, status="enable"))
+        job.runMany(func=runGroupTask, argsList=[dict(apId=apId) for apId in range(4)])
+
+        interactive.enqueued_at = utcnow() - timedelta(seconds=3)
+        interactive.started_at = utcnow()
+        job.recordWait(interactive)
+
+        queueMetrics = job.metrics()
+        self.assertEqual((queueMetrics["interactive"]["queued"], queueMetrics["interactive"]["enqueued"]), (1, 1))
+        self.assertEqual((queueMetrics["bulk"]["queued"], queueMetrics["bulk"]["enqueued"]), (4, 4))
+        self.assertEqual(queueMetrics["background"]["queued"], 0)
+        self.assertAlmostEqual(queueMetrics["interactive"]["average_wait"], 3, delta=0.5)
+        self.assertEqual(queueMetrics["bulk"]["average_wait"], 0.0)
+
+if __name__ == '__main__':
+    unittest.main()
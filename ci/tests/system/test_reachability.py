@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+import fakeredis
+import os
+import socket
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "webapp"))
+
+from cardinal.system.accesspoints import AccessPointGroup
+from cardinal.system.accesspoints import precheckGroup
+from cardinal.system.common import CardinalEnv
+from cardinal.system.groupjobs import GroupJob
+from cardinal.system.reachability import ReachabilityCheck
+from cardinal.system.settings import cardinalSettings
+
+class TestReachabilityCheck(unittest.TestCase):
+    '''
+    Object for testing the pre-flight TCP check of group
+    fan-outs against local ports.
+    '''
+    def setUp(self):
+        '''
+        Listen on one local port and find another that
+        nothing listens on.
+        '''
+        self.listener = socket.socket()
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(16)
+        self.addCleanup(self.listener.close)
+        self.openPort = self.listener.getsockname()[1]
+
+        closed = socket.socket()
+        closed.bind(("127.0.0.1", 0))
+        self.closedPort = closed.getsockname()[1]
+        closed.close()
+
+    def testRun(self):
+        '''
+        Test that a closed port is reported with its reason
+        and open ports keep their order
+        '''
+        reachable, unreachable, duration = ReachabilityCheck(timeout=2, concurrency=2).run({ \
+            3: ("127.0.0.1", self.openPort), 1: ("127.0.0.1", self.closedPort), 2: ("127.0.0.1", self.openPort)})
+
+        self.assertEqual(reachable, [3, 2])
+        self.assertEqual(list(unreachable), [1])
+        self.assertIn("TCP port {} on 127.0.0.1 is unreachable".format(self.closedPort), unreachable[1])
+        self.assertLess(duration, 2)
+
+    def testEmpty(self):
+        '''
+        Test that nothing is probed for an empty group
+        '''
+        self.assertEqual(ReachabilityCheck().run(dict())[:2], ([], dict()))
+
+    def testPrecheckGroup(self):
+        '''
+        Test that unreachable access points are failed before
+        any SSH work and count against their circuit breaker
+        '''
+        redis = fakeredis.FakeRedis()
+        tunings = dict(cardinalSettings.snapshot(), groupPrecheck="on")
+        endpoints = {1: ("127.0.0.1", self.openPort), 2: ("127.0.0.1", self.closedPort)}
+
+        for target, name, value in ((CardinalEnv, "redis", lambda env: redis), (CardinalEnv, "tunings", property(lambda env: tunings)), \
+                (AccessPointGroup, "endpoints", lambda group, apIds: {apId: endpoints[apId] for apId in apIds})):
+            patcher = mock.patch.object(target, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        groupJob = GroupJob()
+        groupJobId = groupJob.create(operation="manageHttp", apIds=[1, 2])
+
+        self.assertEqual(precheckGroup(groupJob, groupJobId, [1, 2]), [1])
+
+        groupStatus = groupJob.status(groupJobId)
+        self.assertEqual([apState["state"] for apState in groupStatus["access_points"]], ["queued", "failed"])
+        self.assertEqual((groupStatus["precheck"]["reachable"], groupStatus["precheck"]["unreachable"]), (1, 1))
+        self.assertEqual(redis.get("cardinal:breaker:2:failures"), b"1")
+
+        tunings["groupPrecheck"] = "off"
+        self.assertEqual(precheckGroup(groupJob, groupJobId, [1, 2]), [1, 2])
+
+if __name__ == '__main__':
+    unittest.main()
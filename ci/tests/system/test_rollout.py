@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "webapp"))
+
+from cardinal.system.executor import TaskEngine
+from cardinal.system.rollout import Rollout
+
+class TestRollout(unittest.TestCase):
+    '''
+    Object for testing the canary/rolling rollout
+    policy of Rollout().
+    '''
+    def setUp(self):
+        '''
+        Run rollouts on a small engine of their own.
+        '''
+        self.engine = TaskEngine("test", "scoutWorkers")
+
+    def rollout(self, **policy):
+        '''
+        Return a Rollout() that runs one access point at a time,
+        so completion order is deterministic.
+        '''
+        return Rollout(maxInFlight=1, engine=self.engine, **policy)
+
+    def failOn(self, failing):
+        '''
+        Return a unit of work that fails for the
+        access points in failing.
+        '''
+        def work(apId):
+            if apId in failing:
+                raise OSError("Access point {} unreachable".format(apId))
+            return apId
+        return work
+
+    def testBatches(self):
+        '''
+        Test splitting into the canary batch and regular batches
+        '''
+        batches = self.rollout(canary=1, batchSize=3).batches(range(8))
+        self.assertEqual([len(batch) for batch in batches], [1, 3, 3, 1])
+        self.assertEqual(batches[0], [(0, 0)])
+
+    def testExceededCanary(self):
+        '''
+        Test that any failure in the canary batch spends the budget
+        '''
+        rollout = self.rollout(canary=2, failureThreshold=0.5, minSample=5)
+        self.assertTrue(rollout.exceeded(1, 1, True, 100))
+        self.assertFalse(rollout.exceeded(0, 2, True, 100))
+
+    def testExceededMinSample(self):
+        '''
+        Test that the failure ratio needs minSample completions
+        '''
+        rollout = self.rollout(canary=0, failureThreshold=0.2, minSample=5)
+        self.assertFalse(rollout.exceeded(1, 1, False, 100))
+        self.assertFalse(rollout.exceeded(4, 4, False, 100))
+        self.assertFalse(rollout.exceeded(1, 5, False, 100))
+        self.assertTrue(rollout.exceeded(2, 5, False, 100))
+
+    def testExceededSmallRollout(self):
+        '''
+        Test that a rollout smaller than minSample is judged
+        once every access point has completed
+        '''
+        rollout = self.rollout(canary=0, failureThreshold=0.2, minSample=5)
+        self.assertFalse(rollout.exceeded(1, 1, False, 2))
+        self.assertTrue(rollout.exceeded(1, 2, False, 2))
+
+    def testFirstFailureWithoutCanary(self):
+        '''
+        Test that one early failure doesn't abort a rollout
+        without a canary batch
+        '''
+        result = self.rollout(canary=0, batchSize=5, failureThreshold=0.2, minSample=5).run(self.failOn({0}), [(apId,) for apId in range(10)])
+
+        self.assertIsNone(result["reason"])
+        self.assertEqual(len(result["outcomes"]), 10)
+        self.assertEqual(result["aborted"], [])
+
+    def testCanaryFailure(self):
+        '''
+        Test that a failed canary aborts every other access point
+        '''
+        completed = []
+        result = self.rollout(canary=1, batchSize=3, failureThreshold=0.5).run(self.failOn({0}), [(apId,) for apId in range(10)], \
+            onComplete=lambda *outcome: completed.append(outcome[0]))
+
+        self.assertIn("canary", result["reason"])
+        self.assertEqual(completed, [0])
+        self.assertEqual([args[0] for index, args in result["aborted"]], list(range(1, 10)))
+
+    def testFailureBudget(self):
+        '''
+        Test that the rollout stops once the failure ratio over
+        at least minSample completions passes failureThreshold
+        '''
+        result = self.rollout(canary=0, batchSize=2, failureThreshold=0.5, minSample=3).run(self.failOn(set(range(10))), \
+            [(apId,) for apId in range(10)])
+
+        self.assertEqual(result["reason"], "3 of 3 access points failed")
+        self.assertEqual(len(result["outcomes"]), 3)
+        self.assertEqual(len(result["aborted"]), 7)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "webapp"))
+
+from cardinal.system import scheduler
+from cardinal.system.executor import TaskEngine
+from cardinal.system.scheduler import SiteScheduler
+from cardinal.system.scheduler import TokenBucket
+
+class FakeClock():
+    '''
+    Stand-in for the time module that only moves
+    forward when asked to.
+    '''
+    def __init__(self):
+        '''
+        Constructor for FakeClock()
+        '''
+        self.now = 1000.0
+        self.slept = 0.0
+
+    def monotonic(self):
+        '''
+        Current fake time.
+        '''
+        return self.now
+
+    def sleep(self, seconds):
+        '''
+        Advance the fake time instead of sleeping.
+        '''
+        self.now += seconds
+        self.slept += seconds
+
+class TestTokenBucket(unittest.TestCase):
+    '''
+    Object for testing TokenBucket() against a fake clock.
+    '''
+    def setUp(self):
+        '''
+        Swap the scheduler's clock for a FakeClock().
+        '''
+        self.clock = FakeClock()
+        patcher = mock.patch.object(scheduler, "time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def testBurst(self):
+        '''
+        Test that a new bucket allows burst tokens at once
+        '''
+        bucket = TokenBucket(rate=1, burst=3)
+        self.assertEqual([bucket.take(1) for i in range(4)], [True, True, True, False])
+
+    def testRefill(self):
+        '''
+        Test that tokens come back at rate per second
+        '''
+        bucket = TokenBucket(rate=2, burst=4)
+        self.assertTrue(bucket.take(4))
+        self.assertFalse(bucket.take(1))
+        self.assertAlmostEqual(bucket.delay(1), 0.5)
+
+        self.clock.sleep(0.5)
+        self.assertTrue(bucket.take(1))
+        self.assertFalse(bucket.take(1))
+
+    def testRefillCappedAtBurst(self):
+        '''
+        Test that an idle bucket never holds more than burst tokens
+        '''
+        bucket = TokenBucket(rate=10, burst=2)
+        self.clock.sleep(60)
+        self.assertEqual([bucket.take(1) for i in range(3)], [True, True, False])
+
+    def testCostAboveBurst(self):
+        '''
+        Test that a cost larger than the burst size still runs
+        '''
+        bucket = TokenBucket(rate=1, burst=2)
+        self.assertTrue(bucket.take(5))
+        self.assertAlmostEqual(bucket.delay(5), 2)
+
+    def testDisabled(self):
+        '''
+        Test that a rate of 0 never limits
+        '''
+        bucket = TokenBucket(rate=0, burst=1)
+        self.assertTrue(all(bucket.take(1) for i in range(100)))
+        self.assertEqual(bucket.delay(1), 0)
+
+class TestSiteScheduler(unittest.TestCase):
+    '''
+    Object for testing per-site admission control
+    and ordering of SiteScheduler().
+    '''
+    def setUp(self):
+        '''
+        Swap the scheduler's clock for a FakeClock() and run
+        work on a small engine of its own.
+        '''
+        self.clock = FakeClock()
+        patcher = mock.patch.object(scheduler, "time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.engine = TaskEngine("test", "scoutWorkers")
+
+    def testSiteConcurrency(self):
+        '''
+        Test that each site has its own concurrency limit
+        '''
+        siteScheduler = SiteScheduler(concurrency=2, rate=0, burst=1, engine=self.engine)
+
+        self.assertTrue(siteScheduler.admit("10.0.0.0/24", 1))
+        self.assertTrue(siteScheduler.admit("10.0.0.0/24", 1))
+        self.assertFalse(siteScheduler.admit("10.0.0.0/24", 1))
+        self.assertTrue(siteScheduler.admit("10.0.1.0/24", 1))
+
+        siteScheduler.release("10.0.0.0/24")
+        self.assertTrue(siteScheduler.admit("10.0.0.0/24", 1))
+
+    def testNoSite(self):
+        '''
+        Test that work without a site is never limited
+        '''
+        siteScheduler = SiteScheduler(concurrency=1, rate=1, burst=1, engine=self.engine)
+        self.assertTrue(all(siteScheduler.admit(None, 1) for i in range(10)))
+
+    def testStreamRoundRobin(self):
+        '''
+        Test that stream() serves sites in turn and yields
+        every unit of work once
+        '''
+        started = []
+        entries = [(index, (site,), 1, site) for index, site in enumerate(["a", "a", "a", "b", "b", "c"])]
+
+        siteScheduler = SiteScheduler(concurrency=0, rate=0, burst=1, engine=self.engine)
+        outcomes = list(siteScheduler.stream(started.append, entries, window=1))
+
+        self.assertEqual(started, ["a", "b", "c", "a", "b", "a"])
+        self.assertEqual([outcome[0] for outcome in outcomes], [0, 3, 5, 1, 4, 2])
+        self.assertTrue(all(outcome[3] is None for outcome in outcomes))
+
+    def testStreamRate(self):
+        '''
+        Test that stream() waits on a site's token bucket
+        '''
+        entries = [(index, (index,), 1, "a") for index in range(4)]
+
+        siteScheduler = SiteScheduler(concurrency=0, rate=2, burst=1, engine=self.engine)
+        outcomes = list(siteScheduler.stream(lambda index: index, entries, window=1))
+
+        self.assertEqual([outcome[2] for outcome in outcomes], [0, 1, 2, 3])
+        self.assertAlmostEqual(self.clock.slept, 1.5)
+
+    def testStreamStop(self):
+        '''
+        Test that no new work starts once stop() is true
+        '''
+        entries = [(index, (index,), 1, None) for index in range(5)]
+
+        siteScheduler = SiteScheduler(concurrency=0, rate=0, burst=1, engine=self.engine)
+        outcomes = []
+        for outcome in siteScheduler.stream(lambda index: index, entries, window=1, stop=lambda: len(outcomes) >= 2):
+            outcomes.append(outcome)
+
+        self.assertEqual([outcome[0] for outcome in outcomes], [0, 1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+import os
+import signal
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "webapp"))
+
+from cardinal.system.settings import CardinalSettings
+
+class TestCardinalSettings(unittest.TestCase):
+    '''
+    Object for testing how CardinalSettings() loads
+    and reloads tunings.
+    '''
+    def setUp(self):
+        '''
+        Point CARDINALCONFIG at a temporary file, with no
+        CARDINAL_* overrides in the environment.
+        '''
+        configDir = tempfile.TemporaryDirectory()
+        self.addCleanup(configDir.cleanup)
+        self.path = os.path.join(configDir.name, "cardinal.ini")
+
+        environment = {name: value for name, value in os.environ.items() if not name.startswith("CARDINAL_")}
+        environment["CARDINALCONFIG"] = self.path
+        patcher = mock.patch.dict(os.environ, environment, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write(self, mtime=None, **tunings):
+        '''
+        Write tunings to the configuration file, optionally
+        with a given mtime.
+        '''
+        with open(self.path, "w") as config:
+            config.write("[cardinal]\n")
+            for name, value in tunings.items():
+                config.write("{0}={1}\n".format(name, value))
+
+        if mtime is not None:
+            os.utime(self.path, (mtime, mtime))
+
+    def testFileAndDefaults(self):
+        '''
+        Test that tunings come from the file, typed, with
+        defaults for the rest
+        '''
+        self.write(dbPoolSize=20, siteRate=0.5)
+        tunings = CardinalSettings().snapshot()
+
+        self.assertEqual(tunings["dbPoolSize"], 20)
+        self.assertEqual(tunings["siteRate"], 0.5)
+        self.assertEqual(tunings["dbPoolTimeout"], 30)
+
+    def testEnvironmentOverride(self):
+        '''
+        Test that CARDINAL_<TUNING> wins over the file
+        '''
+        self.write(dbPoolSize=20)
+        os.environ["CARDINAL_DBPOOLSIZE"] = "7"
+
+        self.assertEqual(CardinalSettings().snapshot()["dbPoolSize"], 7)
+
+    def testReadOnly(self):
+        '''
+        Test that a snapshot can't be changed in place
+        '''
+        self.write()
+        with self.assertRaises(TypeError):
+            CardinalSettings().snapshot()["dbPoolSize"] = 1
+
+    def testMtimeReload(self):
+        '''
+        Test that a changed file is picked up on the next
+        check, and only then
+        '''
+        self.write(mtime=1000000, dbPoolSize=20, configCheckInterval=3600)
+        settings = CardinalSettings()
+        first = settings.snapshot()
+
+        self.write(mtime=2000000, dbPoolSize=30, configCheckInterval=3600)
+        self.assertIs(settings.snapshot(), first)
+
+        settings.lastCheck = 0
+        self.assertEqual(settings.snapshot()["dbPoolSize"], 30)
+        self.assertEqual(first["dbPoolSize"], 20)
+
+    def testBrokenFile(self):
+        '''
+        Test that a file that no longer parses keeps the
+        previous snapshot
+        '''
+        self.write(mtime=1000000, dbPoolSize=20, configCheckInterval=0)
+        settings = CardinalSettings()
+        settings.snapshot()
+
+        self.write(mtime=2000000, dbPoolSize="twenty", configCheckInterval=0)
+        self.assertEqual(settings.snapshot()["dbPoolSize"], 20)
+
+    @unittest.skipUnless(hasattr(signal, "SIGHUP"), "SIGHUP is not available")
+    def testSighup(self):
+        '''
+        Test that SIGHUP reloads the file right away, and
+        that the previous handler still runs
+        '''
+        previousHandler = signal.getsignal(signal.SIGHUP)
+        self.addCleanup(signal.signal, signal.SIGHUP, previousHandler)
+        received = []
+        signal.signal(signal.SIGHUP, lambda signum, frame: received.append(signum))
+
+        self.write(mtime=1000000, dbPoolSize=20, configCheckInterval=3600)
+        settings = CardinalSettings()
+        settings.snapshot()
+
+        self.write(mtime=1000000, dbPoolSize=30, configCheckInterval=3600)
+        os.kill(os.getpid(), signal.SIGHUP)
+
+        self.assertEqual(settings.snapshot()["dbPoolSize"], 30)
+        self.assertEqual(received, [signal.SIGHUP])
+
+    @unittest.skipUnless(hasattr(signal, "SIGHUP"), "SIGHUP is not available")
+    def testSighupIgnored(self):
+        '''
+        Test that an ignored SIGHUP is left alone
+        '''
+        previousHandler = signal.getsignal(signal.SIGHUP)
+        self.addCleanup(signal.signal, signal.SIGHUP, previousHandler)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+        self.write()
+        CardinalSettings().snapshot()
+        self.assertEqual(signal.getsignal(signal.SIGHUP), signal.SIG_IGN)
+
+if __name__ == '__main__':
+    unittest.main()
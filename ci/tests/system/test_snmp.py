@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+
+import os
+import socket
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "webapp"))
+
+from cardinal.system.snmp import SnmpCollector
+from cardinal.system.snmp import berEncode
+from cardinal.system.snmp import berInteger
+from cardinal.system.snmp import formatUptime
+from cardinal.system.snmp import parseSnmpMessage
+from cardinal.system.snmp import snmpMessage
+
+class SnmpAgentStandIn():
+    '''
+    Minimal SNMPv2c agent answering GetRequest and GetBulkRequest
+    from a static MIB, for testing SnmpCollector().
+    '''
+    def __init__(self, mib, community="public"):
+        '''
+        Constructor for SnmpAgentStandIn()
+        '''
+        self.mib = mib
+        self.order = sorted(mib, key=lambda oid: [int(i) for i in oid.split(".")])
+        self.community = community
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.port = self.sock.getsockname()[1]
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def following(self, oid):
+        '''
+        Return the first MIB object after oid.
+        '''
+        key = [int(i) for i in oid.split(".")]
+        return next((i for i in self.order if [int(j) for j in i.split(".")] > key), None)
+
+    def serve(self):
+        '''
+        Answer requests until the socket is closed.
+        '''
+        while True:
+            try:
+                data, address = self.sock.recvfrom(65535)
+            except OSError:
+                return
+
+            request = parseSnmpMessage(data)
+            if request["community"] != self.community:
+                continue
+
+            varbinds = []
+            if request["pduType"] == 0xa0:
+                for oid, value in request["varbinds"]:
+                    varbinds.append((oid, self.mib.get(oid, berEncode(0x80, b""))))
+            else:
+                for repetition in range(request["errorIndex"]):
+                    for position, (oid, value) in enumerate(request["varbinds"]):
+                        previous = varbinds[-len(request["varbinds"])][0] if repetition else oid
+                        following = self.following(previous) if previous is not None else None
+                        varbinds.append((following or previous, self.mib[following] if following else berEncode(0x82, b"")))
+
+            self.sock.sendto(snmpMessage(request["community"], 0xa2, request["requestId"], varbinds), address)
+
+    def close(self):
+        '''
+        Stop answering requests.
+        '''
+        self.sock.close()
+
+class TestSnmpCollector(unittest.TestCase):
+    '''
+    Object for testing SNMP telemetry collection
+    against a local agent stand-in.
+    '''
+    @classmethod
+    def setUpClass(cls):
+        '''
+        Start an agent that looks like a Cisco access point.
+        '''
+        def text(value):
+            return berEncode(0x04, value.encode())
+
+        mib = {
+            "1.3.6.1.2.1.1.1.0": text("Cisco IOS Software, C2600 Software (AP1G4-K9W8-M), Version 15.3(3)JD4\r\nCompiled Thu 09-Feb-17"),
+            "1.3.6.1.2.1.1.3.0": berInteger(96 * 360000 + 4 * 6000, tag=0x43),
+            "1.3.6.1.2.1.1.6.0": text("Server Room"),
+            "1.3.6.1.2.1.47.1.1.1.1.11.1": text("FGL1234ABCD"),
+            "1.3.6.1.2.1.47.1.1.1.1.13.1": text("AIR-CAP2602I-A-K9"),
+            "1.3.6.1.2.1.4.1.0": berInteger(2),
+        }
+
+        for index, name, speed, mac in ((1, "Dot11Radio0", 54000000, "001122334400"), (2, "Dot11Radio1", 300000000, "001122334401"), \
+            (3, "GigabitEthernet0", 1000000000, "0011223344ff")):
+            mib["1.3.6.1.2.1.2.2.1.2.{}".format(index)] = text(name)
+            mib["1.3.6.1.2.1.2.2.1.5.{}".format(index)] = berInteger(speed, tag=0x42)
+            mib["1.3.6.1.2.1.2.2.1.6.{}".format(index)] = berEncode(0x04, bytes.fromhex(mac))
+
+        mib["1.3.6.1.4.1.9.9.273.1.1.2.1.1.1"] = berInteger(7, tag=0x42)
+        mib["1.3.6.1.4.1.9.9.273.1.1.2.1.1.2"] = berInteger(5, tag=0x42)
+
+        cls.agent = SnmpAgentStandIn(mib)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.agent.close()
+
+    def testCollect(self):
+        '''
+        Test collecting the fetchInfo() fields from one access point
+        '''
+        collector = SnmpCollector(timeout=1, retries=0, concurrency=10, port=self.agent.port)
+        collected, failed, duration = collector.run({1: ("127.0.0.1", "public")})
+
+        self.assertEqual(failed, {})
+        self.assertEqual(collected[1], ["0011.2233.44ff", "1000Mbps", "Cisco IOS Software, C2600 Software (AP1G4-K9W8-M), Version 15.3(3)JD4", \
+            "4 days, 4 minutes", "FGL1234ABCD", "AIR-CAP2602I-A-K9", 12, "Server Room"])
+
+    def testCollectMany(self):
+        '''
+        Test collecting from many access points at once
+        '''
+        collector = SnmpCollector(timeout=1, retries=1, concurrency=16, port=self.agent.port)
+        collected, failed, duration = collector.run({apId: ("127.0.0.1", "public") for apId in range(100)})
+
+        self.assertEqual(failed, {})
+        self.assertEqual(len(collected), 100)
+
+    def testWrongCommunity(self):
+        '''
+        Test that an unanswered request is reported as failed
+        '''
+        collector = SnmpCollector(timeout=0.2, retries=1, concurrency=10, port=self.agent.port)
+        collected, failed, duration = collector.run({1: ("127.0.0.1", "private")})
+
+        self.assertEqual(collected, {})
+        self.assertIn("after 2 attempts", failed[1])
+
+    def testFormatUptime(self):
+        '''
+        Test formatting sysUpTime like "show version"
+        '''
+        self.assertEqual(formatUptime(0), "0 minutes")
+        self.assertEqual(formatUptime((10080 + 1440 + 60) * 6000), "1 week, 1 day, 1 hour")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "webapp"))
+
+from cardinal.system import sqlpool
+from cardinal.system.settings import cardinalSettings
+from cardinal.system.sqlpool import SqlPool
+from cardinal.system.sqlpool import SqlPoolExhausted
+
+class FakeConnection():
+    '''
+    Stand-in for a MySQLdb connection.
+    '''
+    def __init__(self):
+        '''
+        Constructor for FakeConnection()
+        '''
+        self.closed = False
+        self.broken = False
+        self.pingDelay = 0
+
+    def autocommit(self, enabled):
+        '''
+        Accept the pool's autocommit setting.
+        '''
+        pass
+
+    def ping(self):
+        '''
+        Fail once the connection is broken, after
+        pingDelay seconds.
+        '''
+        time.sleep(self.pingDelay)
+        if self.broken:
+            raise sqlpool.MySQLdb.Error("MySQL server has gone away")
+
+    def rollback(self):
+        '''
+        Fail once the connection is broken.
+        '''
+        if self.broken:
+            raise sqlpool.MySQLdb.Error("MySQL server has gone away")
+
+    def close(self):
+        '''
+        Record that the connection was closed.
+        '''
+        self.closed = True
+
+class FakeSettings():
+    '''
+    Stand-in for CardinalSettings() with pool tunings
+    suited to tests.
+    '''
+    def __init__(self, **tunings):
+        '''
+        Constructor for FakeSettings()
+        '''
+        self.tunings = dict(cardinalSettings.snapshot(), dbPoolSize=2, dbPoolTimeout=0.2, dbPoolRecycle=3600, dbPoolPingInterval=30)
+        self.tunings.update(tunings)
+
+    def snapshot(self):
+        '''
+        Current tunings.
+        '''
+        return self.tunings
+
+class TestSqlPool(unittest.TestCase):
+    '''
+    Object for testing SqlPool() against
+    fake MySQLdb connections.
+    '''
+    def setUp(self):
+        '''
+        Hand out FakeConnection() objects instead of
+        connecting to MySQL.
+        '''
+        self.connections = []
+
+        def connect(**kwargs):
+            conn = FakeConnection()
+            self.connections.append(conn)
+            return conn
+
+        patcher = mock.patch.object(sqlpool.MySQLdb, "connect", connect, create=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pool = SqlPool(FakeSettings())
+
+    def testReuse(self):
+        '''
+        Test that a released connection is handed out again
+        '''
+        conn = self.pool.acquire()
+        self.pool.release(conn)
+
+        self.assertIs(self.pool.acquire(), conn)
+        self.assertEqual(self.pool.info()["created"], 1)
+        self.assertEqual(self.pool.info()["reused"], 1)
+
+    def testExhausted(self):
+        '''
+        Test that no more than dbPoolSize connections are open
+        '''
+        self.pool.acquire()
+        self.pool.acquire()
+
+        with self.assertRaises(SqlPoolExhausted):
+            self.pool.acquire()
+        self.assertEqual(len(self.connections), 2)
+        self.assertEqual(self.pool.info()["timeouts"], 1)
+
+    def testWaitForRelease(self):
+        '''
+        Test that a waiting caller gets a connection
+        as soon as one is released
+        '''
+        self.pool.settings.tunings["dbPoolTimeout"] = 5
+        conn = self.pool.acquire()
+        self.pool.acquire()
+
+        threading.Timer(0.05, self.pool.release, [conn]).start()
+        self.assertIs(self.pool.acquire(), conn)
+        self.assertEqual(self.pool.info()["waits"], 1)
+
+    def testRecycle(self):
+        '''
+        Test that connections idle past dbPoolRecycle are closed
+        '''
+        conn = self.pool.acquire()
+        self.pool.release(conn)
+        self.pool.idle = [(conn, time.time() - 7200)]
+
+        self.assertIsNot(self.pool.acquire(), conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(self.pool.info()["recycled"], 1)
+
+    def testPingFailure(self):
+        '''
+        Test that a connection failing its ping is replaced
+        '''
+        conn = self.pool.acquire()
+        self.pool.release(conn)
+        self.pool.idle = [(conn, time.time() - 60)]
+        conn.broken = True
+
+        self.assertIsNot(self.pool.acquire(), conn)
+        self.assertTrue(conn.closed)
+
+    def testBrokenRelease(self):
+        '''
+        Test that a connection that can't roll back isn't pooled
+        '''
+        conn = self.pool.acquire()
+        conn.broken = True
+        self.pool.release(conn)
+
+        self.assertTrue(conn.closed)
+        self.assertEqual(self.pool.info()["idle"], 0)
+        self.assertEqual(self.pool.info()["busy"], 0)
+
+    def testThreadConnection(self):
+        '''
+        Test that each thread keeps its own connection
+        until it releases it
+        '''
+        conn = self.pool.threadConnection()
+        self.assertIs(self.pool.threadConnection(), conn)
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(self.pool.threadConnection()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], conn)
+
+        self.pool.releaseThreadConnection()
+        self.assertEqual(self.pool.info()["idle"], 1)
+        self.assertIs(self.pool.threadConnection(), conn)
+
+    def testSlowPing(self):
+        '''
+        Test that a slow ping doesn't hold up other
+        checkouts and checkins
+        '''
+        stale = self.pool.acquire()
+        other = self.pool.acquire()
+        self.pool.release(stale)
+        self.pool.idle = [(stale, time.time() - 60)]
+        stale.pingDelay = 0.5
+
+        thread = threading.Thread(target=self.pool.acquire)
+        thread.start()
+        time.sleep(0.1)
+
+        startTime = time.time()
+        self.pool.release(other)
+        self.assertIs(self.pool.acquire(), other)
+        self.assertLess(time.time() - startTime, 0.2)
+        thread.join()
+
+    def testConcurrentCheckouts(self):
+        '''
+        Test that statistics add up when many threads
+        check connections out at once
+        '''
+        self.pool.settings.tunings.update(dbPoolSize=8, dbPoolTimeout=5)
+
+        def work():
+            for i in range(50):
+                self.pool.release(self.pool.acquire())
+
+        threads = [threading.Thread(target=work) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        poolStats = self.pool.info()
+        self.assertEqual(poolStats["created"], len(self.connections))
+        self.assertEqual(poolStats["created"] + poolStats["reused"], 400)
+        self.assertEqual(poolStats["busy"], 0)
+
+    def testFork(self):
+        '''
+        Test that connections inherited across fork() are
+        neither reused nor closed
+        '''
+        conn = self.pool.threadConnection()
+        self.pool.pid = -1
+
+        self.pool.release(conn)
+        self.assertIsNot(self.pool.threadConnection(), conn)
+        self.assertFalse(conn.closed)
+        self.assertIn(conn, self.pool.inherited)
+
+if __name__ == '__main__':
+    unittest.main()
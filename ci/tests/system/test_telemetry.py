@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+import fakeredis
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "webapp"))
+
+from cardinal.system.common import CardinalEnv
+from cardinal.system.settings import cardinalSettings
+from cardinal.system.telemetry import TelemetryStore
+
+class FakeCursor:
+    '''
+    Cursor that records each statement instead of running it.
+    '''
+    def __init__(self, connection):
+        self.connection = connection
+        self.rowcount = 0
+
+    def execute(self, statement, args=None):
+        if self.connection.failOn is not None and self.connection.failOn in statement:
+            raise RuntimeError("Lost connection to MySQL server during query")
+        self.connection.statements.append((statement, args))
+        self.rowcount = 3
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    '''
+    Connection that counts commits, and fails statements
+    reading from failOn if it is set.
+    '''
+    def __init__(self):
+        self.statements = []
+        self.commits = 0
+        self.failOn = None
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+class TestTelemetryRollup(unittest.TestCase):
+    '''
+    Object for testing rollup watermarks of TelemetryStore().
+    '''
+    def setUp(self):
+        '''
+        Point CardinalEnv() at an in-memory Redis, a recording
+        SQL connection and fixed telemetry tunings.
+        '''
+        self.redis = fakeredis.FakeRedis()
+        self.conn = FakeConnection()
+        self.tunings = dict(cardinalSettings.snapshot(), telemetryFlushInterval=10, telemetryRetentionRaw=2, \
+            telemetryRetention5m=14, telemetryRetention1h=90)
+
+        for name, value in (("redis", lambda env: self.redis), ("sql", lambda env: self.conn), \
+            ("tunings", property(lambda env: self.tunings))):
+            patcher = mock.patch.object(CardinalEnv, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.store = TelemetryStore()
+        # 2 days, 3 hours and 17 minutes (plus the flush delay) after the epoch
+        self.now = 2 * 86400 + 3 * 3600 + 17 * 60 + 20
+
+    def watermarks(self):
+        '''
+        Stored watermarks as a dict() object.
+        '''
+        return {name.decode(): int(end) for name, end in self.redis.hgetall(self.store.key("rollups")).items()}
+
+    def ranges(self):
+        '''
+        (start, end) of each statement run so far.
+        '''
+        return [args[-2:] for statement, args in self.conn.statements]
+
+    def testFirstRun(self):
+        '''
+        Test that the first rollup starts at each source's
+        retention and stores each resolution's end
+        '''
+        self.assertEqual(self.store.rollup(now=self.now), {"5m": 3, "1h": 3, "1d": 3})
+
+        end5m = 2 * 86400 + 3 * 3600 + 15 * 60
+        end1h = 2 * 86400 + 3 * 3600
+        self.assertEqual(self.ranges(), [(end5m - 2 * 86400, end5m), (0, end1h), (0, 2 * 86400)])
+        self.assertEqual([args[:-2] for statement, args in self.conn.statements], [(300, 300), (3600, 3600, 300), (86400, 86400, 3600)])
+        self.assertEqual(self.watermarks(), {"5m": end5m, "1h": end1h, "1d": 2 * 86400})
+        self.assertEqual(self.conn.commits, 3)
+
+    def testRecomputeLastBucket(self):
+        '''
+        Test that later rollups restart one bucket before
+        each watermark to pick up late samples
+        '''
+        self.store.rollup(now=self.now)
+        self.conn.statements.clear()
+
+        self.assertEqual(self.store.rollup(now=self.now + 600), {"5m": 3, "1h": 3, "1d": 3})
+        end5m = 2 * 86400 + 3 * 3600 + 25 * 60
+        self.assertEqual(self.ranges(), [(end5m - 900, end5m), (2 * 86400 + 2 * 3600, 2 * 86400 + 3 * 3600), (86400, 2 * 86400)])
+        self.assertEqual(self.watermarks()["5m"], end5m)
+
+    def testNoCompleteBucket(self):
+        '''
+        Test that resolutions without a complete bucket
+        are skipped and get no watermark
+        '''
+        self.assertEqual(self.store.rollup(now=1000), {"5m": 3, "1h": 0, "1d": 0})
+        self.assertEqual(self.ranges(), [(0, 900)])
+        self.assertEqual(self.watermarks(), {"5m": 900})
+
+    def testErrorKeepsWatermark(self):
+        '''
+        Test that a failed statement leaves its watermark
+        alone so the next run covers the same buckets
+        '''
+        self.store.rollup(now=self.now)
+        before = self.watermarks()
+        self.conn.failOn = "FROM ap_telemetry_rollups"
+
+        self.assertTrue(self.store.rollup(now=self.now + 3600).startswith("ERROR: "))
+        after = self.watermarks()
+        self.assertGreater(after["5m"], before["5m"])
+        self.assertEqual(after["1h"], before["1h"])
+        self.assertEqual(after["1d"], before["1d"])
+
+if __name__ == "__main__":
+    unittest.main()
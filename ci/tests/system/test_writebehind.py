@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+import fakeredis
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "webapp"))
+
+from cardinal.system.accesspoints import AccessPoint
+from cardinal.system.common import CardinalEnv
+from cardinal.system.writebehind import ApInfoCache
+from redis.exceptions import ConnectionError
+
+class FakeConnection():
+    '''
+    Stand-in for a MySQLdb connection that records
+    every statement.
+    '''
+    def __init__(self):
+        '''
+        Constructor for FakeConnection()
+        '''
+        self.statements = []
+        self.rows = []
+        self.failing = False
+
+    def cursor(self, *args):
+        '''
+        Cursors share the connection's statement log.
+        '''
+        return self
+
+    def execute(self, statement, args=None):
+        '''
+        Record a statement, or fail like a lost connection.
+        '''
+        if self.failing:
+            raise Exception("Lost connection to MySQL server during query")
+        self.statements.append((statement, args))
+
+    def fetchall(self):
+        '''
+        Rows a SELECT returns.
+        '''
+        return [dict(row) for row in self.rows]
+
+    def close(self):
+        '''
+        Nothing to close.
+        '''
+        pass
+
+    def commit(self):
+        '''
+        Nothing to commit.
+        '''
+        pass
+
+class TestApInfoCache(unittest.TestCase):
+    '''
+    Object for testing the write-behind cache of
+    fetchInfo() results.
+    '''
+    def setUp(self):
+        '''
+        Point CardinalEnv() at an in-memory Redis and
+        a FakeConnection().
+        '''
+        self.redis = fakeredis.FakeRedis()
+        self.conn = FakeConnection()
+        for name, value in (("redis", lambda env: self.redis), ("sql", lambda env: self.conn)):
+            patcher = mock.patch.object(CardinalEnv, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.cache = ApInfoCache()
+        self.apInfo = dict(ap_mac_addr="0011.2233.4455", ap_bandwidth="1000", ap_ios_info="15.3(3)JD4", ap_uptime="1 day", \
+            ap_serial="FGL1234ABCD", ap_model="AIR-CAP2602I-A-K9", ap_total_clients="7", ap_location="Server Room")
+
+    def testUnchanged(self):
+        '''
+        Test that an unchanged result stages nothing
+        '''
+        self.assertEqual(self.cache.stage(1, self.apInfo), 8)
+        self.assertEqual(self.cache.flush(), 1)
+
+        self.assertEqual(self.cache.stage(1, self.apInfo), 0)
+        self.assertEqual(self.cache.flush(), 0)
+        self.assertEqual(self.cache.flush("telemetry"), 0)
+        self.assertEqual(len(self.conn.statements), 1)
+
+    def testPartlyChanged(self):
+        '''
+        Test that only changed columns are written
+        '''
+        self.cache.stage(1, self.apInfo)
+        self.cache.stage(2, self.apInfo)
+        self.cache.flush()
+        self.conn.statements = []
+
+        self.assertEqual(self.cache.stage(1, dict(self.apInfo, ap_ios_info="15.3(3)JF12")), 1)
+        self.assertEqual(self.cache.stage(2, dict(self.apInfo, ap_location="Lobby")), 1)
+        self.assertEqual(self.cache.flush(), 2)
+
+        statement, args = self.conn.statements[0]
+        self.assertEqual(len(self.conn.statements), 1)
+        self.assertIn("ap_ios_info = CASE ap_id WHEN %s THEN %s ELSE ap_ios_info END", statement)
+        self.assertIn("ap_location = CASE ap_id WHEN %s THEN %s ELSE ap_location END", statement)
+        self.assertNotIn("ap_model", statement)
+        self.assertEqual({tuple(args[0:2]), tuple(args[2:4])}, {(1, "15.3(3)JF12"), (2, "Lobby")})
+        self.assertEqual(sorted(args[4:]), [1, 2])
+
+    def testTelemetryLane(self):
+        '''
+        Test that volatile columns are only written on
+        the telemetry lane
+        '''
+        self.cache.stage(1, self.apInfo)
+        self.cache.flush()
+
+        self.cache.stage(1, dict(self.apInfo, ap_total_clients="9", ap_uptime="2 days"))
+        self.assertEqual(self.cache.flush(), 0)
+        self.assertEqual(self.cache.flush("telemetry"), 1)
+        self.assertNotIn("ap_ios_info", self.conn.statements[-1][0])
+
+    def testFlushFailure(self):
+        '''
+        Test that changes are kept for the next flush when
+        MySQL can't be written, without overwriting newer values
+        '''
+        self.cache.stage(1, self.apInfo)
+        self.conn.failing = True
+
+        self.assertTrue(self.cache.flush().startswith("ERROR"))
+        self.assertEqual(self.redis.smembers(self.cache.key("dirty:inventory")), {b"1"})
+
+        self.cache.stage(1, dict(self.apInfo, ap_location="Lobby"))
+        self.conn.failing = False
+        self.assertEqual(self.cache.flush(), 1)
+
+        statement, args = self.conn.statements[0]
+        self.assertIn("Lobby", args)
+        self.assertNotIn("Server Room", args)
+        self.assertEqual(self.cache.flush(), 0)
+
+    def testLatest(self):
+        '''
+        Test that reads are served the cached values
+        '''
+        self.cache.stage(1, dict(self.apInfo, ap_total_clients="9"))
+        rows = self.cache.latest([dict(ap_id=1, ap_name="ap1", ap_total_clients="7"), dict(ap_id=2, ap_name="ap2", ap_total_clients="3")])
+
+        self.assertEqual(rows[0], dict(ap_id=1, ap_name="ap1", ap_total_clients="9"))
+        self.assertEqual(rows[1]["ap_total_clients"], "3")
+
+    def testLatestWithoutRedis(self):
+        '''
+        Test that rows are returned unchanged if Redis is down
+        '''
+        rows = [dict(ap_id=1, ap_total_clients="7")]
+        with mock.patch.object(self.redis, "pipeline", side_effect=ConnectionError("Connection refused")):
+            self.assertEqual(self.cache.latest(rows), [dict(ap_id=1, ap_total_clients="7")])
+
+    def testInfoReadsLatest(self):
+        '''
+        Test that AccessPoint().info() serves polled values
+        before they are flushed, but not to secret reads
+        '''
+        self.conn.rows = [dict(ap_id=1, ap_name="ap1", ap_total_clients="7", ap_ios_info="15.3(3)JD4")]
+        self.cache.stage(1, dict(self.apInfo, ap_total_clients="9", ap_ios_info="15.3(3)JF12"))
+
+        with mock.patch.object(CardinalEnv, "releaseWorkerSql", lambda env: None):
+            self.assertEqual(AccessPoint().info(1), [dict(ap_id=1, ap_name="ap1", ap_total_clients="9", ap_ios_info="15.3(3)JF12")])
+            self.assertEqual(AccessPoint().info(1, secrets=True)[0]["ap_total_clients"], "7")
+
+        self.assertEqual(len(self.conn.statements), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+import fakeredis
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "webapp"))
+
+from cardinal.system import accesspoints
+from cardinal.system.accesspoints import AccessPoint
+from cardinal.system.accesspoints import runDeferredSave
+from cardinal.system.common import AsyncOpsManager
+from cardinal.system.common import CardinalEnv
+from cardinal.system.settings import cardinalSettings
+from cardinal.system.writememory import WriteMemory
+from rq.registry import ScheduledJobRegistry
+
+class TestWriteMemory(unittest.TestCase):
+    '''
+    Object for testing that configuration changes made
+    through scout are saved once per burst.
+    '''
+    def setUp(self):
+        '''
+        Point CardinalEnv() at an in-memory Redis and one access
+        point, with scout replaced by mocks.
+        '''
+        self.redis = fakeredis.FakeRedis()
+        self.tunings = dict(cardinalSettings.snapshot(), sshSessionReuse="off", writeMemoryDebounce=30)
+        apInfo = dict(ap_id=1, ap_name="ap1", ap_ip="192.0.2.1", ap_ssh_port=22, ap_ssh_username="cisco", ap_ssh_password="secret", ap_snmp="public")
+
+        for name, value in (("redis", lambda env: self.redis), ("releaseSql", lambda env: None), ("tunings", property(lambda env: self.tunings)), \
+            ("encryption", lambda env, input, action: input)):
+            patcher = mock.patch.object(CardinalEnv, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        for target, name, value in ((AccessPoint, "info", lambda ap, id, secrets=False: [dict(apInfo)]), \
+            (accesspoints, "scoutSys", mock.Mock()), (accesspoints, "scoutSsid", mock.Mock())):
+            patcher = mock.patch.object(target, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.ssid = dict(ap_ssid_name="Guest", ap_ssid_wpa2="changeme", ap_ssid_vlan=20, ap_ssid_bridge_id=20, ap_ssid_radio_id=20, ap_ssid_ethernet_id=20)
+        self.registry = ScheduledJobRegistry(queue=AsyncOpsManager().queue("background"))
+
+    def change(self):
+        '''
+        Make three configuration changes through scout.
+        '''
+        AccessPoint().manageHttp(id=1, status="enable")
+        AccessPoint().manageSnmp(id=1, status="disable")
+        AccessPoint().deploy24GhzSsid(id=1, ssid=self.ssid)
+
+    def testCoalesced(self):
+        '''
+        Test that several scout changes schedule a single
+        deferred save, which runs once
+        '''
+        self.change()
+
+        self.assertEqual(self.registry.count, 1)
+        accesspoints.scoutSys.scoutDoWr.assert_not_called()
+        self.assertIsNotNone(WriteMemory().dirty(1))
+
+        # Still inside the debounce window
+        self.assertEqual(runDeferredSave(1), "deferred")
+        accesspoints.scoutSys.scoutDoWr.assert_not_called()
+
+        self.redis.set(WriteMemory().key(1, "dirty"), repr(WriteMemory().dirty(1) - 60))
+        self.assertEqual(runDeferredSave(1), "clean")
+
+        accesspoints.scoutSys.scoutDoWr.assert_called_once_with(ip="192.0.2.1", username="cisco", password="secret")
+        self.assertIsNone(WriteMemory().dirty(1))
+        self.assertEqual(runDeferredSave(1), "clean")
+        self.assertEqual(accesspoints.scoutSys.scoutDoWr.call_count, 1)
+
+    def testNoDebounce(self):
+        '''
+        Test that each change is saved right away with
+        writeMemoryDebounce at 0
+        '''
+        self.tunings["writeMemoryDebounce"] = 0
+        self.change()
+
+        self.assertEqual(accesspoints.scoutSys.scoutDoWr.call_count, 3)
+        self.assertEqual(self.registry.count, 0)
+
+    def testReadsNotSaved(self):
+        '''
+        Test that operations that don't change the
+        configuration don't mark it dirty
+        '''
+        AccessPoint().tftpBackup(id=1, tftpIp="192.0.2.9")
+
+        self.assertIsNone(WriteMemory().dirty(1))
+        self.assertEqual(self.registry.count, 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -18,8 +18,19 @@ for i in `seq 1 60`;
 # Initiate NGINX for uWSGI
 /usr/sbin/nginx -c /etc/nginx/nginx.conf
 
-# Initiate uWSGI
-cd /opt/Cardinal/webapp && /opt/venv/cardinal/bin/uwsgi --ini wsgi.ini --master --enable-threads
+# Initiate rq workers for asynchronous work. Queues are drained in priority order
+# (interactive, bulk, background); a second worker only serves interactive jobs so
+# single access point operations never wait behind group operations. Workers run
+# jobs in their own long-lived process (SimpleWorker) rather than forking a work
+# horse per job, so pooled SSH sessions (sshSessionReuse) are reused across jobs.
+# Job timeouts are still enforced, by an alarm signal within the worker.
+cd /opt/Cardinal/webapp && /opt/venv/cardinal/bin/rq worker high default low --with-scheduler -w rq.worker.SimpleWorker -u redis://redis &
+cd /opt/Cardinal/webapp && /opt/venv/cardinal/bin/rq worker high -w rq.worker.SimpleWorker -u redis://redis &
 
-# Initiate rq worker for asynchronous work
-cd /opt/Cardinal/webapp && /opt/venv/cardinal/bin/rq worker high default low -u redis://redis &
+# Initiate the telemetry poller's rq worker. Poll cycles (and rollups) run on
+# their own queue, so they never occupy the workers above, and keep their SSH
+# sessions from one cycle to the next.
+cd /opt/Cardinal/webapp && /opt/venv/cardinal/bin/rq worker poller --with-scheduler -w rq.worker.SimpleWorker -u redis://redis &
+
+# Initiate uWSGI last, in the foreground, so the container lives as long as it does
+cd /opt/Cardinal/webapp && exec /opt/venv/cardinal/bin/uwsgi --ini wsgi.ini --master --enable-threads
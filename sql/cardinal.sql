@@ -46,6 +46,7 @@ CREATE TABLE `access_points` (
   `ap_ssh_port` int DEFAULT NULL,
   `ap_ssh_username` text CHARACTER SET utf8mb3 COLLATE utf8mb3_general_ci NOT NULL,
   `ap_ssh_password` text CHARACTER SET utf8mb3 COLLATE utf8mb3_general_ci NOT NULL,
+  `ap_enable_password` text CHARACTER SET utf8mb3 COLLATE utf8mb3_general_ci,
   `ap_snmp` text CHARACTER SET utf8mb3 COLLATE utf8mb3_general_ci NOT NULL,
   `ap_total_clients` varchar(255) CHARACTER SET utf8mb3 COLLATE utf8mb3_general_ci DEFAULT '0',
   `ap_bandwidth` varchar(255) CHARACTER SET utf8mb3 COLLATE utf8mb3_general_ci DEFAULT NULL,
@@ -64,6 +65,45 @@ CREATE TABLE `access_points` (
 ) ENGINE=InnoDB AUTO_INCREMENT=380 DEFAULT CHARSET=latin1 COMMENT='For Cardinal Individual Access Points';
 /*!40101 SET character_set_client = @saved_cs_client */;
 
+--
+-- Table structure for table `ap_telemetry`
+--
+
+DROP TABLE IF EXISTS `ap_telemetry`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `ap_telemetry` (
+  `ap_id` int NOT NULL,
+  `ts` int unsigned NOT NULL,
+  `clients` smallint unsigned NOT NULL DEFAULT '0',
+  `bandwidth` int unsigned NOT NULL DEFAULT '0',
+  `uptime` int unsigned DEFAULT NULL,
+  PRIMARY KEY (`ap_id`,`ts`),
+  KEY `ts` (`ts`)
+) ENGINE=InnoDB DEFAULT CHARSET=latin1 COMMENT='For Cardinal raw access point telemetry samples';
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `ap_telemetry_rollups`
+--
+
+DROP TABLE IF EXISTS `ap_telemetry_rollups`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `ap_telemetry_rollups` (
+  `resolution` int unsigned NOT NULL,
+  `ap_id` int NOT NULL,
+  `bucket` int unsigned NOT NULL,
+  `samples` int unsigned NOT NULL,
+  `clients_avg` float NOT NULL,
+  `clients_max` smallint unsigned NOT NULL,
+  `bandwidth_avg` float NOT NULL,
+  `bandwidth_max` int unsigned NOT NULL,
+  PRIMARY KEY (`resolution`,`ap_id`,`bucket`),
+  KEY `resolution_bucket` (`resolution`,`bucket`)
+) ENGINE=InnoDB DEFAULT CHARSET=latin1 COMMENT='For Cardinal 5 minute, hourly and daily telemetry buckets';
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `network_toolkit_jobs`
 --
@@ -109,7 +149,8 @@ CREATE TABLE `rqworker_results` (
   `job_id` varchar(36) NOT NULL,
   `result` text NOT NULL,
   `created` timestamp default CURRENT_TIMESTAMP,
-  PRIMARY KEY (`id`)
+  PRIMARY KEY (`id`),
+  KEY `job_id` (`job_id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8 COLLATE=utf8_general_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
@@ -0,0 +1,10 @@
+-- Cardinal schema upgrade: index rqworker_results by job_id
+--
+-- Job results that rq has already expired are looked up by job_id
+-- (GET /api/v1/jobs), which scans the whole table without this index.
+-- Fresh installs get the index from sql/cardinal.sql. Safe to run more
+-- than once:
+--
+--   mysql -u$dbUsername -p$dbPassword $dbName < sql/upgrades/001-rqworker-results-job-id.sql
+
+ALTER TABLE `rqworker_results` ADD KEY IF NOT EXISTS `job_id` (`job_id`);
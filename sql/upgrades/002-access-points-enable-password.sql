@@ -0,0 +1,10 @@
+-- Cardinal schema upgrade: store an enable password per access point
+--
+-- Access points whose login lands at an unprivileged (>) prompt are
+-- enabled with ap_enable_password (encrypted like ap_ssh_password), or
+-- with their SSH password while it is NULL. Fresh installs get the column
+-- from sql/cardinal.sql. Safe to run more than once:
+--
+--   mysql -u$dbUsername -p$dbPassword $dbName < sql/upgrades/002-access-points-enable-password.sql
+
+ALTER TABLE `access_points` ADD COLUMN IF NOT EXISTS `ap_enable_password` text CHARACTER SET utf8mb3 COLLATE utf8mb3_general_ci AFTER `ap_ssh_password`;
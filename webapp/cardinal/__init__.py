@@ -28,10 +28,12 @@ SOFTWARE.
 
 from cardinal.system.common import CardinalEnv
 from cardinal.system.common import User
+from cardinal.system.poller import TelemetryPoller
 
 from datetime import timedelta
 from flask import Flask
 from flask_login import LoginManager
+from redis.exceptions import RedisError
 
 
 # Intialize a CardinalEnv() object
@@ -55,6 +57,21 @@ login_manager.login_view = 'cardinal_auth_bp.login'
 #with Cardinal.app_context():
 #    cardinalEnv.db().create_all()
 
+# Return request-scoped MySQL connection to the pool
+@Cardinal.teardown_appcontext
+def releaseSql(exception=None):
+    cardinalEnv.releaseSql()
+
+# Keep the fleet-wide telemetry poller running
+telemetryPoller = TelemetryPoller()
+
+@Cardinal.before_request
+def schedulePoller():
+    try:
+        telemetryPoller.ensureScheduled()
+    except RedisError:
+        pass
+
 # Load user for Flask-Login
 @login_manager.user_loader
 def load_user(user_name):
@@ -65,9 +82,11 @@ from cardinal.views import cardinal_ap_group
 from cardinal.views import cardinal_ap_group_ops
 from cardinal.views import cardinal_ap
 from cardinal.views import cardinal_auth
+from cardinal.views import cardinal_jobs
 from cardinal.views import cardinal_forms
 from cardinal.views import cardinal_network_toolkit
 from cardinal.views import cardinal_ssid
+from cardinal.views import cardinal_system
 #from cardinal.views import cardinal_ssid_ops
 from cardinal.views import cardinal_visuals
 
@@ -75,8 +94,10 @@ Cardinal.register_blueprint(cardinal_ap_group.cardinal_ap_group)
 Cardinal.register_blueprint(cardinal_ap_group_ops.cardinal_ap_group_ops)
 Cardinal.register_blueprint(cardinal_ap.cardinal_ap)
 Cardinal.register_blueprint(cardinal_auth.cardinal_auth)
+Cardinal.register_blueprint(cardinal_jobs.cardinal_jobs)
 Cardinal.register_blueprint(cardinal_forms.cardinal_forms)
 Cardinal.register_blueprint(cardinal_network_toolkit.cardinal_network_toolkit)
 Cardinal.register_blueprint(cardinal_ssid.cardinal_ssid)
+Cardinal.register_blueprint(cardinal_system.cardinal_system)
 #Cardinal.register_blueprint(cardinal_ssid_ops.cardinal_ssid_ops)
 Cardinal.register_blueprint(cardinal_visuals.cardinal_visuals)
@@ -0,0 +1,24 @@
+// Draw a sparkline of one telemetry bucket field (e.g. clients_avg)
+// from a Cardinal telemetry endpoint into an <svg> element.
+function cardinalSparkline(svgId, url, field) {
+    fetch(url)
+      .then((response) => response.json())
+      .then((telemetry) => {
+        var svg = document.getElementById(svgId);
+        var buckets = telemetry.buckets || [];
+        if (buckets.length < 2) {
+            return;
+        }
+
+        var width = svg.viewBox.baseVal.width;
+        var height = svg.viewBox.baseVal.height;
+        var values = buckets.map((bucket) => bucket[field]);
+        var max = Math.max.apply(null, values) || 1;
+        var points = values.map((value, index) => (index * width / (values.length - 1)).toFixed(1) + "," +
+            (height - value * height / max).toFixed(1));
+
+        var line = document.createElementNS("http://www.w3.org/2000/svg", "polyline");
+        line.setAttribute("points", points.join(" "));
+        svg.appendChild(line);
+      });
+}
@@ -25,11 +25,64 @@ SOFTWARE.
 '''
 import MySQLdb
 import json
+import uuid
+from cardinal.system import commands as iosCommands
+from cardinal.system.asyncbackend import AsyncBackend
+from cardinal.system.circuitbreaker import CircuitBreaker
+from cardinal.system.common import AsyncOpsManager
 from cardinal.system.common import CardinalEnv
+from cardinal.system.common import JobCancelled
+from cardinal.system.common import JobCoalescer
+from cardinal.system.common import coalescedJobs
+from cardinal.system.common import jobName
+from cardinal.system.executor import scoutEngine
+from cardinal.system.groupjobs import GroupJob
+from cardinal.system.jobcontext import currentJobContext
+from cardinal.system.poller import TelemetryPoller
+from cardinal.system.reachability import ReachabilityCheck
+from cardinal.system.rollout import Rollout
+from cardinal.system.scheduler import SiteScheduler
+from cardinal.system.scheduler import operationCost
+from cardinal.system.scheduler import siteOf
+from cardinal.system.snmp import SnmpCollector
+from cardinal.system.telemetry import TelemetryStore
+from cardinal.system.sshpool import cardinalSshPool
+from cardinal.system.writebehind import ApInfoCache
+from cardinal.system.writememory import WriteMemory
+from contextlib import nullcontext
+from rq import get_current_job
 from scout import info as scoutInfo
 from scout import ssid as scoutSsid
 from scout import sys as scoutSys
 
+# AccessPoint() methods that may be fanned out across an access point group
+groupOperations = ("tftpBackup", "manageHttp", "manageSnmp", "deploy24GhzSsid", "deploy5GhzSsid", "deploy24GhzRadiusSsid", "deploy5GhzRadiusSsid", \
+    "remove24GhzSsid", "remove5GhzSsid", "remove24GhzRadiusSsid", "remove5GhzRadiusSsid", "writeMemory", "plan", "fetchInfo")
+
+# AccessPoint() methods that only read from access points. Recent results
+# of these may be shared for up to fetchInfoFreshness seconds.
+readOnlyOperations = ("fetchInfo",)
+
+# AccessPoint() methods that may be used as steps of an operation plan
+planOperations = ("changeHostname", "tftpBackup", "manageHttp", "manageSnmp", "deploy24GhzSsid", "deploy5GhzSsid", "deploy24GhzRadiusSsid", \
+    "deploy5GhzRadiusSsid", "remove24GhzSsid", "remove5GhzSsid", "remove24GhzRadiusSsid", "remove5GhzRadiusSsid", "fetchInfo", "writeMemory")
+
+def validatePlan(steps):
+    '''
+    Check an operation plan (a list of dict(operation=..., args=dict(...))
+    steps). Returns an "ERROR: ..." string for an invalid plan, otherwise None.
+    '''
+    if not isinstance(steps, list) or len(steps) == 0:
+        return "ERROR: An operation plan requires a non-empty list of steps."
+
+    for index, step in enumerate(steps):
+        if not isinstance(step, dict) or step.get("operation") not in planOperations:
+            return "ERROR: Step {0} must name one of the following operations: {1}".format(index, ", ".join(planOperations))
+        if not isinstance(step.get("args", dict()), dict) or "id" in step.get("args", dict()):
+            return "ERROR: Step {} arguments must be an object without an id.".format(index)
+
+    return None
+
 class AccessPoint(CardinalEnv):
     '''
     Object that defines a Cisco access point under
@@ -41,28 +94,135 @@ class AccessPoint(CardinalEnv):
         object
         '''
         super().__init__()
+        self.activeSession = None
+        self.planDirty = False
+
+    def sessionReuse(self):
+        '''
+        True when operations run over pooled SSH sessions
+        (sshSessionReuse tuning) instead of a fresh scout
+        connection per operation.
+        '''
+        return self.tunings['sshSessionReuse'] == "on"
+
+    def useSession(self):
+        '''
+        True when an operation runs over an ApSession() rather than
+        scout: inside plan(), or whenever sessions are reused.
+        '''
+        return self.activeSession is not None or self.sessionReuse()
+
+    def session(self, apInfo):
+        '''
+        Context manager yielding an ApSession() for an access point
+        row returned by info(secrets=True): the pooled session, or a
+        dedicated one when sshSessionReuse is off. While plan() is
+        running, the session it holds is handed out instead. Access
+        points without a stored enable password are enabled with
+        their SSH password.
+        '''
+        if self.activeSession is not None:
+            return nullcontext(self.activeSession)
+
+        enablePassword = self.encryption(input=apInfo["ap_enable_password"], action="decrypt") if apInfo.get("ap_enable_password") else None
+
+        return cardinalSshPool.session(apInfo["ap_id"], apInfo["ap_ip"], apInfo["ap_ssh_port"], apInfo["ap_ssh_username"], \
+            self.encryption(input=apInfo["ap_ssh_password"], action="decrypt"), pooled=self.sessionReuse(), enablePassword=enablePassword)
+
+    def scout(self, apInfo, operation, **kwargs):
+        '''
+        Run a scout operation (e.g. scoutSys.scoutEnableHttp) against
+        an access point row returned by info(secrets=True), through the
+        access point's CircuitBreaker(). scout has no timeout of its own,
+        so the call is bounded by the running job's deadline and stops
+        waiting once the job is cancelled (see JobContext.call()).
+        '''
+        context = currentJobContext()
+        context.check()
+
+        with CircuitBreaker().guard(apInfo["ap_id"]):
+            return context.call(operation, ip=apInfo["ap_ip"], username=apInfo["ap_ssh_username"], \
+                password=self.encryption(input=apInfo["ap_ssh_password"], action="decrypt"), **kwargs)
+
+    def scoutChange(self, apInfo, operation, **kwargs):
+        '''
+        scout() for an operation that changes the configuration,
+        which is then saved through configChanged().
+        '''
+        result = self.scout(apInfo, operation, **kwargs)
+        self.configChanged(apInfo["ap_id"])
+        return result
+
+    def runCommands(self, apInfo, commands):
+        '''
+        Send a list of IOS commands to an access point over
+        its pooled SSH session. Configuration changes are saved
+        later through configChanged().
+        '''
+        with self.session(apInfo) as session:
+            output = session.send(commands)
 
-    def add(self, name, ip, subnetMask, sshPort, username, password, community, groupId=None):
+        if commands and commands[0] == "configure terminal":
+            self.configChanged(apInfo["ap_id"])
+
+        return output
+
+    def configChanged(self, id):
+        '''
+        Schedule a write memory after a configuration change. Inside
+        plan() the save happens once at the end of the plan, otherwise
+        saves are coalesced by WriteMemory() after writeMemoryDebounce
+        seconds (0 saves immediately).
+        '''
+        if self.activeSession is not None:
+            self.planDirty = True
+        elif self.tunings['writeMemoryDebounce'] <= 0:
+            self.writeMemory(id=id)
+        else:
+            WriteMemory().markDirty(id)
+
+    def writeMemory(self, id):
+        '''
+        Save the running configuration to NVRAM (copy run start)
+        right away.
+        '''
+        # Get connection information for access point
+        wrInfo = self.info(id=id, secrets=True)
+        writeMemory = WriteMemory()
+        dirtySince = writeMemory.dirty(id)
+
+        if self.useSession():
+            with self.session(wrInfo[0]) as session:
+                session.send(iosCommands.writeMemory(), timeout=self.tunings['writeMemoryTimeout'])
+        else:
+            # Invoke scout to execute write memory operation
+            self.scout(wrInfo[0], scoutSys.scoutDoWr)
+
+        self.planDirty = False
+        writeMemory.clear(id, dirtySince)
+
+    def add(self, name, ip, subnetMask, sshPort, username, password, community, groupId=None, enablePassword=None):
         '''
         Method for adding a Cisco access point to Cardinal.
         '''
         conn = self.sql()
 
-        # Encrypt SSH password and SNMP community
+        # Encrypt SSH password, enable password and SNMP community
         encryptedSshPassword = self.encryption(input=password, action="encrypt")
+        encryptedEnablePassword = self.encryption(input=enablePassword, action="encrypt") if enablePassword else None
         encryptedSnmpCommunity = self.encryption(input=community, action="encrypt")
 
         # Insert access point into the MySQL backend
         try:
             if groupId is None:
                 addApCursor = conn.cursor()
-                addApCursor.execute("INSERT INTO access_points (ap_name, ap_ip, ap_subnetmask, ap_ssh_port, ap_ssh_username, ap_ssh_password, ap_snmp, ap_group_id) VALUES (%s, %s, %s, %s, %s, %s, %s, NULL)",
-                (name, ip, subnetMask, sshPort, username, encryptedSshPassword, encryptedSnmpCommunity))
+                addApCursor.execute("INSERT INTO access_points (ap_name, ap_ip, ap_subnetmask, ap_ssh_port, ap_ssh_username, ap_ssh_password, ap_enable_password, ap_snmp, ap_group_id) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NULL)",
+                (name, ip, subnetMask, sshPort, username, encryptedSshPassword, encryptedEnablePassword, encryptedSnmpCommunity))
                 addApCursor.close()
             else:
                 addApCursor = conn.cursor()
-                addApCursor.execute("INSERT INTO access_points (ap_name, ap_ip, ap_subnetmask, ap_ssh_port, ap_ssh_username, ap_ssh_password, ap_snmp, ap_group_id) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
-                (name, ip, subnetMask, sshPort, username, encryptedSshPassword, encryptedSnmpCommunity, groupId))
+                addApCursor.execute("INSERT INTO access_points (ap_name, ap_ip, ap_subnetmask, ap_ssh_port, ap_ssh_username, ap_ssh_password, ap_enable_password, ap_snmp, ap_group_id) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                (name, ip, subnetMask, sshPort, username, encryptedSshPassword, encryptedEnablePassword, encryptedSnmpCommunity, groupId))
                 addApCursor.close()
         except Exception as e:
             return "ERROR: {}".format(e)
@@ -152,6 +312,20 @@ class AccessPoint(CardinalEnv):
             else:
                 conn.commit()
 
+        if "enablePassword" in kwargs:
+
+            # No enable password means the SSH password is used
+            encryptedEnablePassword = self.encryption(input=kwargs["enablePassword"], action="encrypt") if kwargs["enablePassword"] else None
+
+            try:
+                updateApEnablePassCursor = conn.cursor()
+                updateApEnablePassCursor.execute("UPDATE access_points SET ap_enable_password = %s WHERE ap_id = %s", (encryptedEnablePassword, id))
+                updateApEnablePassCursor.close()
+            except Exception as e:
+                return "ERROR: {}".format(e)
+            else:
+                conn.commit()
+
         if "community" in kwargs:
 
             encryptedSnmpCommunity = self.encryption(input=kwargs["community"], action="encrypt")
@@ -206,7 +380,7 @@ class AccessPoint(CardinalEnv):
                     ap_location,ap_ios_info,ap_uptime FROM access_points")
                     apInfo = apInfoCursor.fetchall()
                 else:
-                    apInfoCursor.execute("SELECT ap_id,ap_group_id,ap_name,ap_ip,ap_subnetmask,ap_ssh_port,ap_ssh_username,ap_ssh_password,ap_snmp,ap_total_clients,ap_bandwidth,ap_mac_addr,ap_model,ap_serial,\
+                    apInfoCursor.execute("SELECT ap_id,ap_group_id,ap_name,ap_ip,ap_subnetmask,ap_ssh_port,ap_ssh_username,ap_ssh_password,ap_enable_password,ap_snmp,ap_total_clients,ap_bandwidth,ap_mac_addr,ap_model,ap_serial,\
                     ap_location,ap_ios_info,ap_uptime FROM access_points")
                     apInfo = apInfoCursor.fetchall()
             else:
@@ -215,7 +389,7 @@ class AccessPoint(CardinalEnv):
                     ap_location,ap_ios_info,ap_uptime FROM access_points WHERE ap_id = %s", [id])
                     apInfo = apInfoCursor.fetchall()
                 else:
-                    apInfoCursor.execute("SELECT ap_id,ap_group_id,ap_name,ap_ip,ap_subnetmask,ap_ssh_port,ap_ssh_username,ap_ssh_password,ap_snmp,ap_total_clients,ap_bandwidth,ap_mac_addr,ap_model,ap_serial,\
+                    apInfoCursor.execute("SELECT ap_id,ap_group_id,ap_name,ap_ip,ap_subnetmask,ap_ssh_port,ap_ssh_username,ap_ssh_password,ap_enable_password,ap_snmp,ap_total_clients,ap_bandwidth,ap_mac_addr,ap_model,ap_serial,\
                     ap_location,ap_ios_info,ap_uptime FROM access_points WHERE ap_id = %s", [id])
                     apInfo = apInfoCursor.fetchall()
 
@@ -225,7 +399,7 @@ class AccessPoint(CardinalEnv):
                     ap_location,ap_ios_info,ap_uptime FROM access_points WHERE ap_name = %s", [kwargs["name"]])
                     apInfo = apInfoCursor.fetchall()
                 else:
-                    apInfoCursor.execute("SELECT ap_id,ap_group_id,ap_name,ap_ip,ap_subnetmask,ap_ssh_port,ap_ssh_username,ap_ssh_password,ap_snmp,ap_total_clients,ap_bandwidth,ap_mac_addr,ap_model,ap_serial,\
+                    apInfoCursor.execute("SELECT ap_id,ap_group_id,ap_name,ap_ip,ap_subnetmask,ap_ssh_port,ap_ssh_username,ap_ssh_password,ap_enable_password,ap_snmp,ap_total_clients,ap_bandwidth,ap_mac_addr,ap_model,ap_serial,\
                     ap_location,ap_ios_info,ap_uptime FROM access_points WHERE ap_name = %s", [kwargs["name"]])
                     apInfo = apInfoCursor.fetchall()
 
@@ -233,8 +407,16 @@ class AccessPoint(CardinalEnv):
 
         except Exception as e:
             return "ERROR: {}".format(e)
-        else:
-            return list(apInfo)
+
+        finally:
+            # Operations go on to SSH, so engine threads hand the connection back first
+            self.releaseWorkerSql()
+
+        # Serve the latest telemetry, which MySQL is written behind
+        if not secrets:
+            return ApInfoCache().latest(list(apInfo))
+
+        return list(apInfo)
 
     def changeIp(self, id, newIp, subnetMask):
         '''
@@ -244,12 +426,18 @@ class AccessPoint(CardinalEnv):
         changeApIp = self.info(id=id, secrets=True)
 
         # Invoke scout to execute change IP operation
-        scoutSys.scoutChangeIp(ip=changeApIp[0]["ap_ip"], username=changeApIp[0]["ap_ssh_username"], \
-            password=self.encryption(input=changeApIp[0]["ap_ssh_password"], action="decrypt"), newIp=newIp, subnetMask=subnetMask)
+        self.scout(changeApIp[0], scoutSys.scoutChangeIp, newIp=newIp, subnetMask=subnetMask)
+
+        # Any pooled session (and reachability history) belongs to the old address
+        cardinalSshPool.discard(id)
+        CircuitBreaker().reset(id)
 
         # Commit changes to MariaDB backend
         self.modify(id=id, ip=newIp, subnetMask=subnetMask)
 
+        # Saved once the new address is known, so the save connects to it
+        self.configChanged(id)
+
     def changeHostname(self, id, hostname):
         '''
         Change access point IP via scout
@@ -257,9 +445,11 @@ class AccessPoint(CardinalEnv):
         # Get connection information for access point
         changeApHostname = self.info(id=id, secrets=True)
 
-        # Invoke scout to execute change IP operation
-        scoutSys.scoutChangeName(ip=changeApHostname[0]["ap_ip"], username=changeApHostname[0]["ap_ssh_username"], \
-            password=self.encryption(input=changeApHostname[0]["ap_ssh_password"], action="decrypt"), apName=hostname)
+        if self.useSession():
+            self.runCommands(changeApHostname[0], iosCommands.changeName(apName=hostname))
+        else:
+            # Invoke scout to execute change IP operation
+            self.scoutChange(changeApHostname[0], scoutSys.scoutChangeName, apName=hostname)
 
         # Commit changes to MariaDB backend
         self.modify(id=id, name=hostname)
@@ -271,9 +461,11 @@ class AccessPoint(CardinalEnv):
         # Get connection information for access point
         tftpInfo = self.info(id=id, secrets=True)
 
-        # Invoke scout to execute change IP operation
-        scoutSys.scoutTftpBackup(ip=tftpInfo[0]["ap_ip"], username=tftpInfo[0]["ap_ssh_username"], \
-            password=self.encryption(input=tftpInfo[0]["ap_ssh_password"], action="decrypt"), tftpIp=tftpIp)
+        if self.useSession():
+            self.runCommands(tftpInfo[0], iosCommands.tftpBackup(tftpIp=tftpIp, apName=tftpInfo[0]["ap_name"]))
+        else:
+            # Invoke scout to execute change IP operation
+            self.scout(tftpInfo[0], scoutSys.scoutTftpBackup, tftpIp=tftpIp)
 
     def manageHttp(self, id, status):
         '''
@@ -282,14 +474,14 @@ class AccessPoint(CardinalEnv):
         # Get connection information for access point
         httpInfo = self.info(id=id, secrets=True)
 
-        if status == "enable":
+        if status in ("enable", "disable") and self.useSession():
+            self.runCommands(httpInfo[0], iosCommands.enableHttp() if status == "enable" else iosCommands.disableHttp())
+        elif status == "enable":
             # Invoke scout to execute enable HTTP operation
-            scoutSys.scoutEnableHttp(ip=httpInfo[0]["ap_ip"], username=httpInfo[0]["ap_ssh_username"], \
-                password=self.encryption(input=httpInfo[0]["ap_ssh_password"], action="decrypt"))
+            self.scoutChange(httpInfo[0], scoutSys.scoutEnableHttp)
         elif status == "disable":
             # Invoke scout to execute disable HTTP operation
-            scoutSys.scoutDisableHttp(ip=httpInfo[0]["ap_ip"], username=httpInfo[0]["ap_ssh_username"], \
-                password=self.encryption(input=httpInfo[0]["ap_ssh_password"], action="decrypt"))
+            self.scoutChange(httpInfo[0], scoutSys.scoutDisableHttp)
         else:
             return "ERROR: Please select either enable or disable for HTTP operation status."
 
@@ -300,18 +492,20 @@ class AccessPoint(CardinalEnv):
         # Get connection information for access point
         snmpInfo = self.info(id=id, secrets=True)
 
-        if status == "enable":
+        if status == "enable" and self.useSession():
+            self.runCommands(snmpInfo[0], iosCommands.enableSnmp(snmp=self.encryption(input=snmpInfo[0]["ap_snmp"], action="decrypt")))
+        elif status == "disable" and self.useSession():
+            self.runCommands(snmpInfo[0], iosCommands.disableSnmp())
+        elif status == "enable":
             # Invoke scout to execute enable SNMP operation
-            scoutSys.scoutEnableSnmp(ip=snmpInfo[0]["ap_ip"], username=snmpInfo[0]["ap_ssh_username"], \
-                password=self.encryption(input=snmpInfo[0]["ap_ssh_password"], action="decrypt"), snmp=self.encryption(input=snmpInfo[0]["ap_snmp"], action="decrypt"))
+            self.scoutChange(snmpInfo[0], scoutSys.scoutEnableSnmp, snmp=self.encryption(input=snmpInfo[0]["ap_snmp"], action="decrypt"))
         elif status == "disable":
             # Invoke scout to execute disable SNMP operation
-            scoutSys.scoutDisableSnmp(ip=snmpInfo[0]["ap_ip"], username=snmpInfo[0]["ap_ssh_username"], \
-                password=self.encryption(input=snmpInfo[0]["ap_ssh_password"], action="decrypt"))
+            self.scoutChange(snmpInfo[0], scoutSys.scoutDisableSnmp)
         else:
             return "ERROR: Please select either enable or disable for SNMP operation status."
 
-    def deploy24GhzSsid(self, id, ssidId):
+    def deploy24GhzSsid(self, id, ssidId=None, ssid=None):
         '''
         Deploy 2.4GHz SSID to Cisco AP
         '''
@@ -319,15 +513,20 @@ class AccessPoint(CardinalEnv):
         apInfo = self.info(id=id, secrets=True)
 
         # Get SSID deployment information
-        ssidInfo = Ssid24Ghz().info(id=ssidId, secrets=True)
+        ssidInfo = [ssid if ssid is not None else resolveSsid("deploy24GhzSsid", ssidId)]
+
+        if self.useSession():
+            self.runCommands(apInfo[0], iosCommands.createSsid(band="24", ssid=ssidInfo[0]["ap_ssid_name"], \
+                wpa2Pass=ssidInfo[0]["ap_ssid_wpa2"], vlan=ssidInfo[0]["ap_ssid_vlan"], \
+                bridgeGroup=ssidInfo[0]["ap_ssid_bridge_id"], radioSub=ssidInfo[0]["ap_ssid_radio_id"], gigaSub=ssidInfo[0]["ap_ssid_ethernet_id"]))
+            return
 
         # Invoke scout to execute enable HTTP operation
-        scoutSsid.scoutCreateSsid24(ip=apInfo[0]["ap_ip"], username=apInfo[0]["ap_ssh_username"], \
-            password=self.encryption(input=apInfo[0]["ap_ssh_password"], action="decrypt"), ssid=ssidInfo[0]["ap_ssid_name"], \
-            wpa2Pass=self.encryption(input=ssidInfo[0]["ap_ssid_wpa2"], action="decrypt"), vlan=ssidInfo[0]["ap_ssid_vlan"], \
+        self.scoutChange(apInfo[0], scoutSsid.scoutCreateSsid24, ssid=ssidInfo[0]["ap_ssid_name"], \
+            wpa2Pass=ssidInfo[0]["ap_ssid_wpa2"], vlan=ssidInfo[0]["ap_ssid_vlan"], \
             bridgeGroup=ssidInfo[0]["ap_ssid_bridge_id"], radioSub=ssidInfo[0]["ap_ssid_radio_id"], gigaSub=ssidInfo[0]["ap_ssid_ethernet_id"])
 
-    def deploy5GhzSsid(self, id, ssidId):
+    def deploy5GhzSsid(self, id, ssidId=None, ssid=None):
         '''
         Deploy 5GHz SSID to Cisco AP
         '''
@@ -335,15 +534,20 @@ class AccessPoint(CardinalEnv):
         apInfo = self.info(id=id, secrets=True)
 
         # Get SSID deployment information
-        ssidInfo = Ssid5Ghz().info(id=ssidId, secrets=True)
+        ssidInfo = [ssid if ssid is not None else resolveSsid("deploy5GhzSsid", ssidId)]
+
+        if self.useSession():
+            self.runCommands(apInfo[0], iosCommands.createSsid(band="5", ssid=ssidInfo[0]["ap_ssid_name"], \
+                wpa2Pass=ssidInfo[0]["ap_ssid_wpa2"], vlan=ssidInfo[0]["ap_ssid_vlan"], \
+                bridgeGroup=ssidInfo[0]["ap_ssid_bridge_id"], radioSub=ssidInfo[0]["ap_ssid_radio_id"], gigaSub=ssidInfo[0]["ap_ssid_ethernet_id"]))
+            return
 
         # Invoke scout to execute enable HTTP operation
-        scoutSsid.scoutCreateSsid5(ip=apInfo[0]["ap_ip"], username=apInfo[0]["ap_ssh_username"], \
-            password=self.encryption(input=apInfo[0]["ap_ssh_password"], action="decrypt"), ssid=ssidInfo[0]["ap_ssid_name"], \
-            wpa2Pass=self.encryption(input=ssidInfo[0]["ap_ssid_wpa2"], action="decrypt"), vlan=ssidInfo[0]["ap_ssid_vlan"], \
+        self.scoutChange(apInfo[0], scoutSsid.scoutCreateSsid5, ssid=ssidInfo[0]["ap_ssid_name"], \
+            wpa2Pass=ssidInfo[0]["ap_ssid_wpa2"], vlan=ssidInfo[0]["ap_ssid_vlan"], \
             bridgeGroup=ssidInfo[0]["ap_ssid_bridge_id"], radioSub=ssidInfo[0]["ap_ssid_radio_id"], gigaSub=ssidInfo[0]["ap_ssid_ethernet_id"])
 
-    def deploy24GhzRadiusSsid(self, id, ssidId):
+    def deploy24GhzRadiusSsid(self, id, ssidId=None, ssid=None):
         '''
         Deploy 2.4GHz 802.1x SSID to Cisco AP
         '''
@@ -351,17 +555,24 @@ class AccessPoint(CardinalEnv):
         apInfo = self.info(id=id, secrets=True)
 
         # Get SSID deployment information
-        ssidInfo = Ssid24GhzRadius().info(id=ssidId, secrets=True)
+        ssidInfo = [ssid if ssid is not None else resolveSsid("deploy24GhzRadiusSsid", ssidId)]
+
+        if self.useSession():
+            self.runCommands(apInfo[0], iosCommands.createSsidRadius(band="24", ssid=ssidInfo[0]["ap_ssid_name"], \
+                vlan=ssidInfo[0]["ap_ssid_vlan"], bridgeGroup=ssidInfo[0]["ap_ssid_bridge_id"], radioSub=ssidInfo[0]["ap_ssid_radio_id"], \
+                gigaSub=ssidInfo[0]["ap_ssid_ethernet_id"], radiusIp=ssidInfo[0]["ap_ssid_radius_server"], sharedSecret=ssidInfo[0]["ap_ssid_radius_secret"], \
+                authPort=ssidInfo[0]["ap_ssid_authorization_port"], acctPort=ssidInfo[0]["ap_ssid_accounting_port"], radiusTimeout=ssidInfo[0]["ap_ssid_radius_timeout"], \
+                radiusGroup=ssidInfo[0]["ap_ssid_radius_group"], methodList=ssidInfo[0]["ap_ssid_radius_method_list"]))
+            return
 
         # Invoke scout to execute enable HTTP operation
-        scoutSsid.scoutCreateSsid24Radius(ip=apInfo[0]["ap_ip"], username=apInfo[0]["ap_ssh_username"], \
-            password=self.encryption(input=apInfo[0]["ap_ssh_password"], action="decrypt"), ssid=ssidInfo[0]["ap_ssid_name"], \
+        self.scoutChange(apInfo[0], scoutSsid.scoutCreateSsid24Radius, ssid=ssidInfo[0]["ap_ssid_name"], \
             vlan=ssidInfo[0]["ap_ssid_vlan"], bridgeGroup=ssidInfo[0]["ap_ssid_bridge_id"], radioSub=ssidInfo[0]["ap_ssid_radio_id"], \
-            gigaSub=ssidInfo[0]["ap_ssid_ethernet_id"], radiusIp=ssidInfo[0]["ap_ssid_radius_ip"], sharedSecret=self.encryption(input=apInfo[0]["ap_ssid_radius_secret"], action="decrypt"), \
+            gigaSub=ssidInfo[0]["ap_ssid_ethernet_id"], radiusIp=ssidInfo[0]["ap_ssid_radius_server"], sharedSecret=ssidInfo[0]["ap_ssid_radius_secret"], \
             authPort=ssidInfo[0]["ap_ssid_authorization_port"], acctPort=ssidInfo[0]["ap_ssid_accounting_port"], radiusTimeout=ssidInfo[0]["ap_ssid_radius_timeout"], \
             radiusGroup=ssidInfo[0]["ap_ssid_radius_group"], methodList=ssidInfo[0]["ap_ssid_radius_method_list"])
 
-    def deploy5GhzRadiusSsid(self, id, ssidId):
+    def deploy5GhzRadiusSsid(self, id, ssidId=None, ssid=None):
         '''
         Deploy 5GHz 802.1x SSID to Cisco AP
         '''
@@ -369,18 +580,25 @@ class AccessPoint(CardinalEnv):
         apInfo = self.info(id=id, secrets=True)
 
         # Get SSID deployment information
-        ssidInfo = Ssid5GhzRadius().info(id=ssidId, secrets=True)
+        ssidInfo = [ssid if ssid is not None else resolveSsid("deploy5GhzRadiusSsid", ssidId)]
+
+        if self.useSession():
+            self.runCommands(apInfo[0], iosCommands.createSsidRadius(band="5", ssid=ssidInfo[0]["ap_ssid_name"], \
+                vlan=ssidInfo[0]["ap_ssid_vlan"], bridgeGroup=ssidInfo[0]["ap_ssid_bridge_id"], radioSub=ssidInfo[0]["ap_ssid_radio_id"], \
+                gigaSub=ssidInfo[0]["ap_ssid_ethernet_id"], radiusIp=ssidInfo[0]["ap_ssid_radius_server"], sharedSecret=ssidInfo[0]["ap_ssid_radius_secret"], \
+                authPort=ssidInfo[0]["ap_ssid_authorization_port"], acctPort=ssidInfo[0]["ap_ssid_accounting_port"], radiusTimeout=ssidInfo[0]["ap_ssid_radius_timeout"], \
+                radiusGroup=ssidInfo[0]["ap_ssid_radius_group"], methodList=ssidInfo[0]["ap_ssid_radius_method_list"]))
+            return
 
         # Invoke scout to execute enable HTTP operation
-        scoutSsid.scoutCreateSsid5Radius(ip=apInfo[0]["ap_ip"], username=apInfo[0]["ap_ssh_username"], \
-            password=self.encryption(input=apInfo[0]["ap_ssh_password"], action="decrypt"), ssid=ssidInfo[0]["ap_ssid_name"], \
+        self.scoutChange(apInfo[0], scoutSsid.scoutCreateSsid5Radius, ssid=ssidInfo[0]["ap_ssid_name"], \
             vlan=ssidInfo[0]["ap_ssid_vlan"], bridgeGroup=ssidInfo[0]["ap_ssid_bridge_id"], radioSub=ssidInfo[0]["ap_ssid_radio_id"], \
-            gigaSub=ssidInfo[0]["ap_ssid_ethernet_id"], radiusIp=ssidInfo[0]["ap_ssid_radius_ip"], sharedSecret=self.encryption(input=apInfo[0]["ap_ssid_radius_secret"], action="decrypt"), \
+            gigaSub=ssidInfo[0]["ap_ssid_ethernet_id"], radiusIp=ssidInfo[0]["ap_ssid_radius_server"], sharedSecret=ssidInfo[0]["ap_ssid_radius_secret"], \
             authPort=ssidInfo[0]["ap_ssid_authorization_port"], acctPort=ssidInfo[0]["ap_ssid_accounting_port"], radiusTimeout=ssidInfo[0]["ap_ssid_radius_timeout"], \
             radiusGroup=ssidInfo[0]["ap_ssid_radius_group"], methodList=ssidInfo[0]["ap_ssid_radius_method_list"])
 
 
-    def remove24GhzSsid(self, id, ssidId):
+    def remove24GhzSsid(self, id, ssidId=None, ssid=None):
         '''
         Remove 2.4GHz SSID to Cisco AP
         '''
@@ -388,14 +606,18 @@ class AccessPoint(CardinalEnv):
         apInfo = self.info(id=id, secrets=True)
 
         # Get SSID deployment information
-        ssidInfo = Ssid24Ghz().info(id=ssidId, secrets=True)
+        ssidInfo = [ssid if ssid is not None else resolveSsid("remove24GhzSsid", ssidId)]
+
+        if self.useSession():
+            self.runCommands(apInfo[0], iosCommands.deleteSsid(band="24", ssid=ssidInfo[0]["ap_ssid_name"], \
+                vlan=ssidInfo[0]["ap_ssid_vlan"], radioSub=ssidInfo[0]["ap_ssid_radio_id"], gigaSub=ssidInfo[0]["ap_ssid_ethernet_id"]))
+            return
 
         # Invoke scout to execute enable HTTP operation
-        scoutSsid.scoutDeleteSsid24(ip=apInfo[0]["ap_ip"], username=apInfo[0]["ap_ssh_username"], \
-            password=self.encryption(input=apInfo[0]["ap_ssh_password"], action="decrypt"), ssid=ssidInfo[0]["ap_ssid_name"], \
+        self.scoutChange(apInfo[0], scoutSsid.scoutDeleteSsid24, ssid=ssidInfo[0]["ap_ssid_name"], \
             vlan=ssidInfo[0]["ap_ssid_vlan"], radioSub=ssidInfo[0]["ap_ssid_radio_id"], gigaSub=ssidInfo[0]["ap_ssid_ethernet_id"])
 
-    def remove5GhzSsid(self, id, ssidId):
+    def remove5GhzSsid(self, id, ssidId=None, ssid=None):
         '''
         Remove 5GHz SSID to Cisco AP
         '''
@@ -403,14 +625,18 @@ class AccessPoint(CardinalEnv):
         apInfo = self.info(id=id, secrets=True)
 
         # Get SSID deployment information
-        ssidInfo = Ssid5Ghz().info(id=ssidId, secrets=True)
+        ssidInfo = [ssid if ssid is not None else resolveSsid("remove5GhzSsid", ssidId)]
+
+        if self.useSession():
+            self.runCommands(apInfo[0], iosCommands.deleteSsid(band="5", ssid=ssidInfo[0]["ap_ssid_name"], \
+                vlan=ssidInfo[0]["ap_ssid_vlan"], radioSub=ssidInfo[0]["ap_ssid_radio_id"], gigaSub=ssidInfo[0]["ap_ssid_ethernet_id"]))
+            return
 
         # Invoke scout to execute enable HTTP operation
-        scoutSsid.scoutDeleteSsid5(ip=apInfo[0]["ap_ip"], username=apInfo[0]["ap_ssh_username"], \
-            password=self.encryption(input=apInfo[0]["ap_ssh_password"], action="decrypt"), ssid=ssidInfo[0]["ap_ssid_name"], \
+        self.scoutChange(apInfo[0], scoutSsid.scoutDeleteSsid5, ssid=ssidInfo[0]["ap_ssid_name"], \
             vlan=ssidInfo[0]["ap_ssid_vlan"], radioSub=ssidInfo[0]["ap_ssid_radio_id"], gigaSub=ssidInfo[0]["ap_ssid_ethernet_id"])
 
-    def remove24GhzRadiusSsid(self, id, ssidId):
+    def remove24GhzRadiusSsid(self, id, ssidId=None, ssid=None):
         '''
         Remove 2.4GHz 802.1x SSID to Cisco AP
         '''
@@ -418,14 +644,18 @@ class AccessPoint(CardinalEnv):
         apInfo = self.info(id=id, secrets=True)
 
         # Get SSID deployment information
-        ssidInfo = Ssid24GhzRadius().info(id=ssidId, secrets=True)
+        ssidInfo = [ssid if ssid is not None else resolveSsid("remove24GhzRadiusSsid", ssidId)]
+
+        if self.useSession():
+            self.runCommands(apInfo[0], iosCommands.deleteSsid(band="24", ssid=ssidInfo[0]["ap_ssid_name"], \
+                vlan=ssidInfo[0]["ap_ssid_vlan"], radioSub=ssidInfo[0]["ap_ssid_radio_id"], gigaSub=ssidInfo[0]["ap_ssid_ethernet_id"]))
+            return
 
         # Invoke scout to execute enable HTTP operation
-        scoutSsid.scoutDeleteSsid24(ip=apInfo[0]["ap_ip"], username=apInfo[0]["ap_ssh_username"], \
-            password=self.encryption(input=apInfo[0]["ap_ssh_password"], action="decrypt"), ssid=ssidInfo[0]["ap_ssid_name"], \
+        self.scoutChange(apInfo[0], scoutSsid.scoutDeleteSsid24, ssid=ssidInfo[0]["ap_ssid_name"], \
             vlan=ssidInfo[0]["ap_ssid_vlan"], radioSub=ssidInfo[0]["ap_ssid_radio_id"], gigaSub=ssidInfo[0]["ap_ssid_ethernet_id"])
 
-    def remove5GhzRadiusSsid(self, id, ssidId):
+    def remove5GhzRadiusSsid(self, id, ssidId=None, ssid=None):
         '''
         Remove 5GHz 802.1x SSID to Cisco AP
         '''
@@ -433,43 +663,171 @@ class AccessPoint(CardinalEnv):
         apInfo = self.info(id=id, secrets=True)
 
         # Get SSID deployment information
-        ssidInfo = Ssid5GhzRadius().info(id=ssidId, secrets=True)
+        ssidInfo = [ssid if ssid is not None else resolveSsid("remove5GhzRadiusSsid", ssidId)]
+
+        if self.useSession():
+            self.runCommands(apInfo[0], iosCommands.deleteSsid(band="5", ssid=ssidInfo[0]["ap_ssid_name"], \
+                vlan=ssidInfo[0]["ap_ssid_vlan"], radioSub=ssidInfo[0]["ap_ssid_radio_id"], gigaSub=ssidInfo[0]["ap_ssid_ethernet_id"]))
+            return
 
         # Invoke scout to execute enable HTTP operation
-        scoutSsid.scoutDeleteSsid5(ip=apInfo[0]["ap_ip"], username=apInfo[0]["ap_ssh_username"], \
-            password=self.encryption(input=apInfo[0]["ap_ssh_password"], action="decrypt"), ssid=ssidInfo[0]["ap_ssid_name"], \
+        self.scoutChange(apInfo[0], scoutSsid.scoutDeleteSsid5, ssid=ssidInfo[0]["ap_ssid_name"], \
             vlan=ssidInfo[0]["ap_ssid_vlan"], radioSub=ssidInfo[0]["ap_ssid_radio_id"], gigaSub=ssidInfo[0]["ap_ssid_ethernet_id"])
 
-    def fetchInfo(self, id):
+    def snmpTelemetry(self):
         '''
-        Change access point IP via scout
+        True when telemetry is read over SNMP first (telemetrySource
+        tuning), with SSH as the fallback.
         '''
+        return self.tunings['telemetrySource'] == "snmp"
+
+    def snmpTargets(self, apIds):
+        '''
+        Return the SNMP endpoint of each access point in apIds
+        as a dict() object of apId -> (ip, community).
+        '''
+        if not apIds:
+            return dict()
+
         conn = self.sql()
 
+        try:
+            targetsCursor = conn.cursor()
+            targetsCursor.execute("SELECT ap_id,ap_ip,ap_snmp FROM access_points WHERE ap_snmp IS NOT NULL AND ap_id IN ({})".format(", ".join(["%s"] * len(apIds))), list(apIds))
+            apTargets = {i[0]: (i[1], self.encryption(input=i[2], action="decrypt")) for i in targetsCursor.fetchall()}
+            targetsCursor.close()
+        except Exception as e:
+            return "ERROR: {}".format(e)
+        else:
+            return apTargets
+
+    def collectInfo(self, apIds):
+        '''
+        Read telemetry from every access point in apIds over SNMP in
+        a single batch and store it. Returns a dict() object of apId ->
+        telemetry for the access points that answered.
+        '''
+        apTargets = self.snmpTargets(apIds)
+        if isinstance(apTargets, str):
+            return dict()
+
+        collected, failed, duration = SnmpCollector().run(apTargets)
+
+        for apId, apInfo in collected.items():
+            self.storeInfo(apId, apInfo)
+
+        return collected
+
+    def storeInfo(self, id, apInfo):
+        '''
+        Store telemetry (as returned by scout's fetcher) for an access point.
+        Only changed columns are written, batched with other access points
+        (see ApInfoCache()).
+        '''
+        ApInfoCache().stage(id, dict(ap_mac_addr=apInfo[0], ap_bandwidth=apInfo[1].strip("Mbps"), ap_ios_info=apInfo[2], ap_uptime=apInfo[3], \
+            ap_serial=apInfo[4], ap_model=apInfo[5], ap_total_clients=apInfo[6], ap_location=apInfo[7]))
+
+        # Keep history, and let the telemetry poller skip access points polled on demand
+        TelemetryStore().record(id, apInfo)
+        TelemetryPoller().markPolled(id, apInfo)
+
+        return apInfo
+
+    def fetchInfo(self, id, snmp=True):
+        '''
+        Change access point IP via scout
+        '''
+        # SNMP is much cheaper than an SSH login, so try it first
+        if snmp and self.snmpTelemetry():
+            apInfo = self.collectInfo([id]).get(id)
+            if apInfo is not None:
+                return apInfo
+
         # Get connection information for access point
         fetchInfo = self.info(id=id, secrets=True)
 
-        # Invoke scout to execute change IP operation
-        apInfo = scoutInfo.fetcher(ip=fetchInfo[0]["ap_ip"], username=fetchInfo[0]["ap_ssh_username"], \
-            password=self.encryption(input=fetchInfo[0]["ap_ssh_password"], action="decrypt"))
+        if self.useSession():
+            with self.session(fetchInfo[0]) as session:
+                apInfo = iosCommands.parseFetchInfo(*[session.send([command]) for command in iosCommands.fetchInfo()])
+        else:
+            # Invoke scout to execute change IP operation
+            apInfo = self.scout(fetchInfo[0], scoutInfo.fetcher)
 
-        # Commit changes to MariaDB backend
-        apMacAddr = apInfo[0]
-        apBandwidth = apInfo[1].strip("Mbps")
-        apIosInfo = apInfo[2]
-        apUptime = apInfo[3]
-        apSerial = apInfo[4]
-        apModel = apInfo[5]
-        apClientCount = apInfo[6]
-        apLocation = apInfo[7]
-        apInfoCursor = conn.cursor()
-        apInfoCursor.execute("UPDATE access_points SET ap_bandwidth = %s, ap_mac_addr = %s, ap_model = %s, ap_serial = %s, ap_location = %s,"
-        "ap_ios_info = %s, ap_uptime = %s, ap_total_clients = %s WHERE ap_id = %s", (apBandwidth,apMacAddr,apModel,apSerial,
-        apLocation,apIosInfo,apUptime,apClientCount,id))
-        conn.commit()
-        apInfoCursor.close()
+        return self.storeInfo(id, apInfo)
 
-        return apInfo
+    def runPlan(self, id, steps, stopOnError):
+        '''
+        Run every step of an operation plan in order and
+        return the result of each step.
+        '''
+        stepResults = []
+        failed = False
+
+        for index, step in enumerate(steps):
+            stepResult = dict(step=index, operation=step["operation"])
+
+            if failed and stopOnError:
+                stepResult["status"] = "skipped"
+                stepResults.append(stepResult)
+                continue
+
+            try:
+                result = getattr(self, step["operation"])(id=id, **step.get("args", dict()))
+                if isinstance(result, str) and result.startswith("ERROR"):
+                    raise RuntimeError(result)
+            except Exception as e:
+                failed = True
+                stepResult["status"] = "failed"
+                stepResult["detail"] = str(e)
+                # Nothing else can run once the session itself is gone
+                if self.activeSession is not None and not self.activeSession.alive():
+                    stopOnError = True
+            else:
+                stepResult["status"] = "succeeded"
+                if result is not None:
+                    stepResult["result"] = result
+
+            stepResults.append(stepResult)
+
+        return stepResults
+
+    def plan(self, id, steps, stopOnError=True):
+        '''
+        Run an operation plan, an ordered list of steps such as
+        [dict(operation="deploy24GhzSsid", args=dict(ssidId=1)),
+        dict(operation="manageSnmp", args=dict(status="enable"))],
+        against one access point over a single SSH session.
+
+        Steps after a failed step are skipped unless stopOnError is
+        False. Returns a dict() with the result of each step.
+        '''
+        planError = validatePlan(steps)
+        if planError is not None:
+            return planError
+
+        planInfo = self.info(id=id, secrets=True)
+        if isinstance(planInfo, str):
+            return planInfo
+        if len(planInfo) == 0:
+            return "ERROR: Access point {} does not exist.".format(id)
+
+        with self.session(planInfo[0]) as session:
+            self.activeSession = session
+            self.planDirty = False
+            try:
+                stepResults = self.runPlan(id, steps, stopOnError)
+                # One save for every configuration step in the plan
+                if self.planDirty:
+                    stepResults += self.runPlan(id, [dict(operation="writeMemory")], stopOnError=False)
+                    stepResults[-1]["step"] = len(steps)
+            finally:
+                self.activeSession = None
+                if self.planDirty:
+                    WriteMemory().markDirty(id)
+                    self.planDirty = False
+
+        return dict(steps=stepResults, succeeded=len([i for i in stepResults if i["status"] == "succeeded"]), \
+            failed=len([i for i in stepResults if i["status"] == "failed"]), skipped=len([i for i in stepResults if i["status"] == "skipped"]))
 
 class AccessPointGroup(CardinalEnv):
     '''
@@ -569,15 +927,199 @@ class AccessPointGroup(CardinalEnv):
 
         return apList
 
+    def members(self, id):
+        '''
+        Return the ids of every access point in
+        an access point group.
+        '''
+        conn = self.sql()
+
+        try:
+            membersCursor = conn.cursor()
+            membersCursor.execute("SELECT ap_id FROM access_points WHERE ap_group_id = %s ORDER BY ap_id", [id])
+            apIds = [i[0] for i in membersCursor.fetchall()]
+            membersCursor.close()
+        except Exception as e:
+            return "ERROR: {}".format(e)
+        else:
+            return apIds
+
+    def sites(self, apIds):
+        '''
+        Return the site (see siteOf()) of each access point
+        in apIds, in the same order.
+        '''
+        if not apIds:
+            return []
+
+        conn = self.sql()
+
+        try:
+            sitesCursor = conn.cursor()
+            sitesCursor.execute("SELECT ap_id,ap_ip,ap_subnetmask FROM access_points WHERE ap_id IN ({})".format(", ".join(["%s"] * len(apIds))), list(apIds))
+            apSites = {i[0]: siteOf(i[1], i[2]) for i in sitesCursor.fetchall()}
+            sitesCursor.close()
+        except Exception as e:
+            return "ERROR: {}".format(e)
+        else:
+            return [apSites.get(apId) for apId in apIds]
+
+    def endpoints(self, apIds):
+        '''
+        Return the SSH endpoint of each access point in apIds
+        as a dict() object of apId -> (ip, port).
+        '''
+        if not apIds:
+            return dict()
+
+        conn = self.sql()
+
+        try:
+            endpointsCursor = conn.cursor()
+            endpointsCursor.execute("SELECT ap_id,ap_ip,ap_ssh_port FROM access_points WHERE ap_id IN ({})".format(", ".join(["%s"] * len(apIds))), list(apIds))
+            apEndpoints = {i[0]: (i[1], i[2]) for i in endpointsCursor.fetchall()}
+            endpointsCursor.close()
+        except Exception as e:
+            return "ERROR: {}".format(e)
+        else:
+            return apEndpoints
+
+    def interleave(self, apIds):
+        '''
+        Order apIds round-robin across sites, so queued per-access
+        point jobs don't drain one site before starting the next.
+        '''
+        apSites = self.sites(apIds)
+        if isinstance(apSites, str):
+            return apIds
+
+        bySite = dict()
+        for apId, site in zip(apIds, apSites):
+            bySite.setdefault(site, []).append(apId)
+
+        interleaved = []
+        for i in range(max([len(siteApIds) for siteApIds in bySite.values()] or [0])):
+            interleaved += [siteApIds[i] for siteApIds in bySite.values() if i < len(siteApIds)]
+
+        return interleaved
+
+    def dispatch(self, id, operation, backend=None, rollout=None, **kwargs):
+        '''
+        Fan an AccessPoint() operation (e.g. manageHttp) out across
+        an access point group, tracked under a single group job id.
+        Returns the group job id without waiting for any access point
+        to finish. See plan() for running several steps per access point.
+        An identical read-only group operation that is still queued is
+        shared rather than dispatched again.
+
+        Unless groupPrecheck is off, access points whose SSH port doesn't
+        answer a quick TCP connect are marked failed before any SSH work
+        is dispatched (see precheckGroup()). The check runs within rq jobs,
+        never while the request waits.
+
+        With the "rq" backend (default), a short rq job runs the check and
+        enqueues one rq job per access point. With the "asyncio" backend, a single rq job drives every
+        access point concurrently through AsyncBackend(). With the "rollout"
+        backend, a single rq job runs a canary/rolling Rollout() using the
+        settings in rollout (canary, batchSize, maxInFlight, failureThreshold).
+        '''
+        if operation not in groupOperations:
+            return "ERROR: Unsupported group operation {}.".format(operation)
+
+        if operation == "plan":
+            planError = validatePlan(kwargs.get("steps"))
+            if planError is not None:
+                return planError
+
+        if backend is None:
+            backend = self.tunings['groupBackend']
+
+        # SSIDs are loaded and decrypted once by a coordinator job rather than by every per-access point job
+        if operation in ssidOperations and backend == "rq":
+            backend = "asyncio"
+
+        # Identical read-only group operations still queued (or, for fetchInfo, recently finished) are shared
+        groupJob = GroupJob()
+        groupJobId = str(uuid.uuid4())
+        if operation in coalescedJobs:
+            freshness = self.tunings['fetchInfoFreshness'] if operation in readOnlyOperations else 0
+            sharedJobId = JobCoalescer().claim(jobName(self.dispatch), dict(id=id, operation=operation, backend=backend, rollout=rollout, kwargs=kwargs), \
+                groupJobId, lambda existingId: groupJob.shareable(existingId, freshness))
+            if sharedJobId is not None:
+                return sharedJobId
+
+        apIds = self.members(id=id)
+        if isinstance(apIds, str):
+            return apIds
+
+        groupJobId = groupJob.create(operation=operation, apIds=apIds, groupJobId=groupJobId, ap_group_id=id, backend=backend)
+
+        if backend == "rollout":
+            policy = Rollout(**(rollout or dict())).policy()
+            groupJob.annotate(groupJobId, rollout=policy)
+            # Every access point may take up to asyncHostTimeout, maxInFlight at a time
+            waves = -(-len(apIds) // policy["maxInFlight"]) + -(-len(apIds) // policy["batchSize"])
+            timeout = (waves + 2) * self.tunings['asyncHostTimeout']
+            asyncResult = AsyncOpsManager().run(func=runRollout, args=dict(groupJobId=groupJobId, apIds=apIds, operation=operation, kwargs=kwargs, policy=policy), timeout=timeout, priority="bulk")
+            groupJob.attach(groupJobId, {apId: asyncResult.id for apId in apIds})
+            return groupJobId
+
+        if backend == "asyncio":
+            # Every access point may take up to asyncHostTimeout, asyncConcurrency at a time
+            waves = -(-len(apIds) // self.tunings['asyncConcurrency'])
+            timeout = (max(waves, 1) + 1) * self.tunings['asyncHostTimeout']
+            asyncResult = AsyncOpsManager().run(func=runGroupOperation, args=dict(groupJobId=groupJobId, apIds=apIds, operation=operation, kwargs=kwargs), timeout=timeout, priority="bulk")
+            groupJob.attach(groupJobId, {apId: asyncResult.id for apId in apIds})
+            return groupJobId
+
+        asyncResult = AsyncOpsManager().run(func=dispatchGroupTasks, args=dict(groupJobId=groupJobId, apIds=apIds, operation=operation, kwargs=kwargs), \
+            priority="bulk")
+        groupJob.attach(groupJobId, {apId: asyncResult.id for apId in apIds})
+
+        return groupJobId
+
+    def plan(self, id, steps, stopOnError=True, backend=None, rollout=None):
+        '''
+        Dispatch an operation plan (see AccessPoint.plan()) to every
+        access point in a group. Each access point gets one job that runs
+        all steps in one SSH session. Returns the group job id.
+        '''
+        return self.dispatch(id=id, operation="plan", backend=backend, rollout=rollout, steps=steps, stopOnError=stopOnError)
+
+    def stream(self, operation, apInfo):
+        '''
+        Run operation once per entry in apInfo and yield
+        (index, args, result, error) tuples as each access point
+        finishes. The groupBackend tuning selects the shared scout
+        thread pool ("rq", default) or AsyncBackend() ("asyncio").
+        Either way, per-site limits of SiteScheduler() apply, with
+        the site taken from the access point IP (first entry).
+        '''
+        sites = [siteOf(args[0]) for args in apInfo]
+
+        if self.tunings['groupBackend'] == "asyncio":
+            return AsyncBackend(scheduler=SiteScheduler()).run(operation, apInfo, sites=sites)
+
+        return SiteScheduler(engine=scoutEngine).stream(operation, [(index, args, 1, sites[index]) for index, args in enumerate(apInfo)])
+
     def processor(self, operation, apInfo):
         '''
         processor() is used for parallel processing. processor()
         accepts two positional arguments: operation and apInfo. operation is
         the function itself (e.g. scout_sys.scoutDoWr) and apInfo is a list of parameters
         that is passed for each access point (e.g. connection information).
+
+        Work runs on the long-lived scout thread pool (sized by scoutWorkers)
+        and results are returned in apInfo order. Failed access points are
+        reported as "ERROR: ..." strings.
         '''
-        with multiprocessing.Pool(processes=int(self.tunings['workers'])) as tasker:
-            taskResults = tasker.starmap(operation, apInfo)
+        taskResults = [None] * len(apInfo)
+
+        for index, args, result, error in self.stream(operation, apInfo):
+            if error is not None:
+                taskResults[index] = "ERROR: {}".format(error)
+            else:
+                taskResults[index] = result
 
         return taskResults
 
@@ -620,6 +1162,309 @@ class AccessPointGroup(CardinalEnv):
                     return json.loads(apGroupJson)
             return list(apGroupInfo)
 
+def resolveSsid(operation, ssidId):
+    '''
+    Load the SSID used by an SSID operation (e.g. deploy24GhzSsid)
+    and return it as a dict() object with its secret decrypted. Group
+    operations resolve the SSID once and pass it to every access point.
+    '''
+    ssidClass, secretColumn = ssidOperations[operation]
+    ssidInfo = ssidClass().info(id=ssidId, secrets=True)
+    ssidClass().releaseWorkerSql()
+
+    if isinstance(ssidInfo, str):
+        raise RuntimeError(ssidInfo)
+    if len(ssidInfo) == 0:
+        raise RuntimeError("SSID {} does not exist.".format(ssidId))
+
+    ssid = dict(ssidInfo[0])
+    if secretColumn is not None:
+        ssid[secretColumn] = ssidClass().encryption(input=ssid[secretColumn], action="decrypt")
+
+    return ssid
+
+def groupKwargs(operation, kwargs):
+    '''
+    Resolve SSIDs for a group operation (or the SSID steps of a
+    plan) once, before fanning out. Only used by coordinator jobs,
+    so decrypted secrets stay in process memory.
+    '''
+    if operation in ssidOperations and kwargs.get("ssidId") is not None:
+        return dict(kwargs, ssid=resolveSsid(operation, kwargs["ssidId"]))
+
+    if operation == "plan":
+        resolved = dict()
+        steps = []
+        for step in kwargs.get("steps", []):
+            args = step.get("args", dict())
+            if step["operation"] in ssidOperations and args.get("ssidId") is not None:
+                cacheKey = (step["operation"], args["ssidId"])
+                if cacheKey not in resolved:
+                    resolved[cacheKey] = resolveSsid(*cacheKey)
+                step = dict(step, args=dict(args, ssid=resolved[cacheKey]))
+            steps.append(step)
+        return dict(kwargs, steps=steps)
+
+    return kwargs
+
+def prepareGroup(groupJob, groupJobId, apIds, operation, kwargs):
+    '''
+    groupKwargs() for coordinator jobs. If the group can't start
+    (e.g. the SSID is gone), every access point is marked failed.
+    '''
+    try:
+        return groupKwargs(operation, kwargs)
+    except Exception as e:
+        for apId in apIds:
+            groupJob.update(groupJobId, apId, "failed", detail=e)
+        raise
+
+def precheckGroup(groupJob, groupJobId, apIds):
+    '''
+    Run the pre-flight ReachabilityCheck() of a group fan-out
+    (unless groupPrecheck is off) and return the apIds worth an SSH
+    job. Unreachable access points are marked failed right away and
+    count against their CircuitBreaker().
+    '''
+    if groupJob.tunings['groupPrecheck'] != "on" or not apIds:
+        return apIds
+
+    endpoints = AccessPointGroup().endpoints(apIds)
+    if isinstance(endpoints, str):
+        return apIds
+
+    reachable, unreachable, duration = ReachabilityCheck().run(endpoints)
+
+    breaker = CircuitBreaker()
+    for apId, reason in unreachable.items():
+        groupJob.update(groupJobId, apId, "failed", detail=reason)
+        breaker.failed(apId)
+
+    groupJob.annotate(groupJobId, precheck=dict(reachable=len(reachable), unreachable=len(unreachable), duration=round(duration, 3)))
+
+    return [apId for apId in apIds if apId not in unreachable]
+
+def checkGroupResult(groupJob, groupJobId, apId, operation, result):
+    '''
+    Raise for a failed group operation result. Plan results
+    are recorded step by step on the group job.
+    '''
+    if isinstance(result, str) and result.startswith("ERROR"):
+        raise RuntimeError(result)
+
+    if operation == "plan":
+        groupJob.steps(groupJobId, apId, result["steps"])
+        if result["failed"]:
+            failedSteps = [i for i in result["steps"] if i["status"] == "failed"]
+            raise RuntimeError("Step {0} ({1}) failed: {2}".format(failedSteps[0]["step"], failedSteps[0]["operation"], failedSteps[0]["detail"]))
+
+def runDeferredSave(apId):
+    '''
+    Function that performs a coalesced write memory (runs as a
+    scheduled rq job, see WriteMemory()). The save is pushed back
+    while changes keep arriving within writeMemoryDebounce.
+    '''
+    writeMemory = WriteMemory()
+
+    try:
+        while True:
+            dirtySince = writeMemory.dirty(apId)
+
+            if dirtySince is None:
+                if writeMemory.finish(apId):
+                    return "clean"
+                continue
+
+            remaining = writeMemory.remaining(dirtySince)
+            if remaining > 0:
+                writeMemory.schedule(apId, remaining)
+                return "deferred"
+
+            AccessPoint().writeMemory(id=apId)
+    finally:
+        writeMemory.releaseSql()
+
+def runTelemetryCycle():
+    '''
+    Function that runs one fleet-wide telemetry poll cycle (runs
+    as a scheduled rq job, see TelemetryPoller()). The next cycle is
+    scheduled before this one polls anything.
+    '''
+    poller = TelemetryPoller()
+    if not poller.enabled():
+        return None
+
+    # Only the current link of the chain goes on, so retries never fork it
+    currentJob = get_current_job()
+    if currentJob is not None and not poller.current(currentJob.id):
+        return None
+
+    poller.scheduleNext()
+
+    try:
+        accessPoint = AccessPoint()
+        cycleStats = poller.cycle(lambda apId: AccessPoint().fetchInfo(id=apId, snmp=False), \
+            batch=accessPoint.collectInfo if accessPoint.snmpTelemetry() else None)
+    except Exception as e:
+        cycleStats = "ERROR: {}".format(e)
+    finally:
+        poller.releaseSql()
+
+    # None means the previous cycle is still running
+    if cycleStats is not None:
+        AsyncOpsManager().runIn(func="cardinal.system.telemetry.runTelemetryRollup", args=dict(), delay=1, priority="telemetry")
+
+    return cycleStats
+
+def dispatchGroupTasks(groupJobId, apIds, operation, kwargs):
+    '''
+    Function that pre-checks a group (see precheckGroup()) and then
+    enqueues one runGroupTask() rq job per reachable access point.
+    Runs as a short rq job, so the request dispatching the group
+    returns without waiting on the check.
+    '''
+    groupJob = GroupJob()
+
+    try:
+        # Per-site limits need a coordinator job; rq jobs are at least ordered fairly across sites
+        apIds = AccessPointGroup().interleave(precheckGroup(groupJob, groupJobId, apIds))
+    finally:
+        groupJob.releaseSql()
+
+    # Nothing is enqueued for a group cancelled while it was pre-checked
+    groupStatus = groupJob.status(groupJobId)
+    if groupStatus is not None and groupStatus.get("cancelled"):
+        for apId in apIds:
+            groupJob.update(groupJobId, apId, "aborted", detail="Cancelled")
+        return dict(dispatched=0)
+
+    argsList = [dict(groupJobId=groupJobId, apId=apId, operation=operation, kwargs=kwargs) for apId in apIds]
+    asyncOpsManager = AsyncOpsManager()
+    asyncResults = asyncOpsManager.runMany(func=runGroupTask, argsList=argsList, meta=dict(group_job_id=groupJobId), priority="bulk", \
+        timeout=asyncOpsManager.timeoutFor(operation))
+    groupJob.attach(groupJobId, {apId: asyncResult.id for apId, asyncResult in zip(apIds, asyncResults)})
+
+    # A cancellation requested while this job ran only reached this job
+    groupStatus = groupJob.status(groupJobId)
+    if groupStatus is not None and groupStatus.get("cancelled"):
+        groupJob.cancel(groupJobId)
+
+    return dict(dispatched=len(asyncResults))
+
+def runGroupTask(groupJobId, apId, operation, kwargs):
+    '''
+    Function that runs one access point's share of a group
+    operation (runs as an rq job) and reports progress back to
+    the parent group job.
+    '''
+    groupJob = GroupJob()
+
+    try:
+        currentJobContext().check()
+        # Fail fast, before any SQL or SSH work, while the access point is known to be down
+        CircuitBreaker().check(apId)
+        groupJob.update(groupJobId, apId, "started")
+        result = getattr(AccessPoint(), operation)(id=apId, **kwargs)
+        checkGroupResult(groupJob, groupJobId, apId, operation, result)
+    except JobCancelled as e:
+        groupJob.update(groupJobId, apId, "aborted", detail=e)
+        raise
+    except Exception as e:
+        # rq will retry the job while retries remain
+        currentJob = get_current_job()
+        if currentJob is not None and currentJob.retries_left and getattr(e, "retryable", True):
+            groupJob.update(groupJobId, apId, "retrying", detail=e)
+        else:
+            groupJob.update(groupJobId, apId, "failed", detail=e)
+        raise
+    else:
+        groupJob.update(groupJobId, apId, "succeeded")
+    finally:
+        groupJob.releaseSql()
+
+    return result
+
+def runGroupOperation(groupJobId, apIds, operation, kwargs):
+    '''
+    Function that runs a whole group operation from a single rq job,
+    driving every access point concurrently through AsyncBackend()
+    with a per-host timeout.
+    '''
+    groupJob = GroupJob()
+    kwargs = prepareGroup(groupJob, groupJobId, apIds, operation, kwargs)
+    apIds = precheckGroup(groupJob, groupJobId, apIds)
+
+    def apTask(apId):
+        currentJobContext().check()
+        CircuitBreaker().check(apId)
+        groupJob.update(groupJobId, apId, "started")
+        result = getattr(AccessPoint(), operation)(id=apId, **kwargs)
+        checkGroupResult(groupJob, groupJobId, apId, operation, result)
+        return result
+
+    def apComplete(index, args, result, error, duration):
+        if isinstance(error, JobCancelled):
+            groupJob.update(groupJobId, args[0], "aborted", detail=error)
+        elif error is not None:
+            groupJob.update(groupJobId, args[0], "failed", detail=error)
+        else:
+            groupJob.update(groupJobId, args[0], "succeeded")
+
+    sites = AccessPointGroup().sites(apIds)
+    # The coordinator only waits on the fan-out from here on
+    groupJob.releaseSql()
+
+    outcomes = AsyncBackend(scheduler=SiteScheduler()).run(apTask, [(apId,) for apId in apIds], onComplete=apComplete, \
+        sites=sites if not isinstance(sites, str) else None, cost=operationCost(operation, kwargs))
+
+    return dict(succeeded=len([o for o in outcomes if o[3] is None]), failed=len([o for o in outcomes if o[3] is not None and not isinstance(o[3], JobCancelled)]), \
+        aborted=len([o for o in outcomes if isinstance(o[3], JobCancelled)]))
+
+def runRollout(groupJobId, apIds, operation, kwargs, policy):
+    '''
+    Function that runs a group operation as a canary/rolling
+    Rollout() from a single rq job. Access points left over when
+    the failure budget runs out are marked aborted.
+    '''
+    groupJob = GroupJob()
+    kwargs = prepareGroup(groupJob, groupJobId, apIds, operation, kwargs)
+    apIds = precheckGroup(groupJob, groupJobId, apIds)
+
+    def apTask(apId):
+        currentJobContext().check()
+        CircuitBreaker().check(apId)
+        groupJob.update(groupJobId, apId, "started")
+        result = getattr(AccessPoint(), operation)(id=apId, **kwargs)
+        checkGroupResult(groupJob, groupJobId, apId, operation, result)
+        return result
+
+    def apComplete(index, args, result, error):
+        if isinstance(error, JobCancelled):
+            groupJob.update(groupJobId, args[0], "aborted", detail=error)
+        elif error is not None:
+            groupJob.update(groupJobId, args[0], "failed", detail=error)
+        else:
+            groupJob.update(groupJobId, args[0], "succeeded")
+
+    try:
+        sites = AccessPointGroup().sites(apIds)
+        # The coordinator only waits on the rollout from here on
+        groupJob.releaseSql()
+
+        rolloutResult = Rollout(**policy).run(apTask, [(apId,) for apId in apIds], onComplete=apComplete, \
+            sites=sites if not isinstance(sites, str) else None, cost=operationCost(operation, kwargs))
+
+        for index, args in rolloutResult["aborted"]:
+            groupJob.update(groupJobId, args[0], "aborted", detail=rolloutResult["reason"])
+        if rolloutResult["reason"] is not None:
+            groupJob.annotate(groupJobId, abort_reason=rolloutResult["reason"])
+    finally:
+        groupJob.releaseSql()
+
+    outcomes = rolloutResult["outcomes"]
+    return dict(succeeded=len([o for o in outcomes if o[3] is None]), failed=len([o for o in outcomes if o[3] is not None and not isinstance(o[3], JobCancelled)]), \
+        aborted=len(rolloutResult["aborted"]) + len([o for o in outcomes if isinstance(o[3], JobCancelled)]), reason=rolloutResult["reason"])
+
 class Ssid24Ghz(CardinalEnv):
     '''
     Object that defines a 2.4GHz SSID under
@@ -990,3 +1835,15 @@ class Ssid5GhzRadius(CardinalEnv):
 
         else:
             return list(ssidInfo)
+
+# SSID class and encrypted column behind each SSID operation
+ssidOperations = dict(
+    deploy24GhzSsid=(Ssid24Ghz, "ap_ssid_wpa2"),
+    deploy5GhzSsid=(Ssid5Ghz, "ap_ssid_wpa2"),
+    deploy24GhzRadiusSsid=(Ssid24GhzRadius, "ap_ssid_radius_secret"),
+    deploy5GhzRadiusSsid=(Ssid5GhzRadius, "ap_ssid_radius_secret"),
+    remove24GhzSsid=(Ssid24Ghz, None),
+    remove5GhzSsid=(Ssid5Ghz, None),
+    remove24GhzRadiusSsid=(Ssid24GhzRadius, None),
+    remove5GhzRadiusSsid=(Ssid5GhzRadius, None),
+)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+
+import asyncio
+import time
+from cardinal.system.executor import TaskEngine
+from cardinal.system.jobcontext import currentJobContext
+from cardinal.system.settings import cardinalSettings
+
+class AsyncBackend():
+    '''
+    asyncio execution backend for driving scout sessions against
+    many access points at once from a single event loop.
+
+    scout only exposes blocking (paramiko) calls, so every session is
+    parked on a dedicated, long-lived thread pool sized by asyncConcurrency,
+    while the event loop schedules them and enforces a per-host timeout
+    (asyncHostTimeout). Command semantics are exactly those of scout.
+    '''
+    def __init__(self, engine=None, scheduler=None):
+        '''
+        Default constructor for AsyncBackend() object. An optional
+        SiteScheduler() applies per-site limits on top of the global
+        concurrency limit.
+        '''
+        self.engine = engine if engine is not None else asyncEngine
+        self.scheduler = scheduler
+
+    async def call(self, semaphore, index, func, args, onComplete, site=None, cost=1, context=None):
+        '''
+        Run a single unit of work under the concurrency limits and
+        per-host timeout. context is the JobContext() of the caller.
+        A unit of work that times out keeps its concurrency slot until
+        its engine thread returns, so every admitted unit of work has a
+        thread of its own and its timeout only covers running.
+        '''
+        timeout = cardinalSettings.snapshot()['asyncHostTimeout']
+        loop = asyncio.get_running_loop()
+
+        if self.scheduler is not None:
+            await self.scheduler.acquire(site, cost)
+
+        try:
+            await semaphore.acquire()
+        except BaseException:
+            if self.scheduler is not None:
+                self.scheduler.release(site)
+            raise
+
+        def finished(future):
+            # Slots are only given back once the engine thread is free
+            semaphore.release()
+            if self.scheduler is not None:
+                self.scheduler.release(site)
+
+        startTime = time.time()
+        try:
+            # SSH sessions on the engine thread give up at the per-host deadline too
+            context = (context if context is not None else currentJobContext()).child(timeout)
+            future = loop.run_in_executor(self.engine.executor(), self.engine.task, func, args, context)
+        except Exception as e:
+            finished(None)
+            outcome = (index, args, None, e)
+        else:
+            future.add_done_callback(finished)
+            try:
+                result = await asyncio.wait_for(asyncio.shield(future), timeout)
+            except asyncio.TimeoutError:
+                # A scout session keeps its thread (and slot) until paramiko
+                # gives up, but the event loop stops waiting on it.
+                outcome = (index, args, None, TimeoutError("No response after {} seconds".format(timeout)))
+            except Exception as e:
+                outcome = (index, args, None, e)
+            else:
+                outcome = (index, args, result, None)
+
+        if onComplete is not None:
+            onComplete(*outcome, duration=time.time() - startTime)
+
+        return outcome
+
+    async def gather(self, func, argsList, onComplete=None, sites=None, cost=1):
+        '''
+        Coroutine that runs func(*args) for every entry in argsList
+        concurrently and returns (index, args, result, error) tuples in
+        completion order. sites (parallel to argsList) and cost are
+        used by the SiteScheduler(), if any.
+        '''
+        semaphore = asyncio.Semaphore(self.engine.size())
+        context = currentJobContext()
+        calls = [asyncio.ensure_future(self.call(semaphore, index, func, args, onComplete, site=sites[index] if sites is not None else None, cost=cost, \
+            context=context)) for index, args in enumerate(argsList)]
+
+        outcomes = []
+        for call in asyncio.as_completed(calls):
+            outcomes.append(await call)
+
+        return outcomes
+
+    def run(self, func, argsList, onComplete=None, sites=None, cost=1):
+        '''
+        Blocking entry point for synchronous callers (e.g. rq jobs).
+        onComplete(index, args, result, error, duration=...) is
+        invoked as each access point finishes.
+        '''
+        return asyncio.run(self.gather(func, argsList, onComplete=onComplete, sites=sites, cost=cost))
+
+# Shared thread pool for AsyncBackend() sessions in this process
+asyncEngine = TaskEngine("asyncio", "asyncConcurrency")
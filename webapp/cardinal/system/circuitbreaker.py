@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+
+import paramiko
+import time
+from cardinal.system.common import CardinalEnv
+from cardinal.system.common import JobCancelled
+from cardinal.system.jobcontext import DeadlineExceeded
+from contextlib import contextmanager
+
+class CircuitOpen(ConnectionError):
+    '''
+    Raised instead of connecting to an access point whose
+    circuit breaker is open. Jobs failing with CircuitOpen
+    are not retried.
+    '''
+    retryable = False
+
+class CircuitBreaker(CardinalEnv):
+    '''
+    Per access point circuit breaker kept in Redis, so every uwsgi/rq
+    process shares it. After breakerThreshold consecutive connection
+    failures the breaker opens and connections fail fast for
+    breakerCooldown seconds. After that, a single probe connection is
+    let through (half open): it closes the breaker on success and
+    opens it for another cool-down on failure.
+    '''
+    def __init__(self):
+        '''
+        Default constructor for CircuitBreaker() object.
+        '''
+        super().__init__()
+
+    def key(self, apId, suffix):
+        '''
+        Redis key for an access point's breaker element.
+        '''
+        return "cardinal:breaker:{0}:{1}".format(apId, suffix)
+
+    def describe(self, failures, openedAt, probing):
+        '''
+        Build the breaker state of one access point
+        as a dict() object.
+        '''
+        failures = int(failures or 0)
+        if openedAt is None:
+            return dict(state="closed", failures=failures)
+
+        retryAt = float(openedAt) + self.tunings['breakerCooldown']
+        state = "open" if time.time() < retryAt or probing else "half_open"
+        return dict(state=state, failures=failures, opened_at=float(openedAt), retry_at=retryAt)
+
+    def states(self, apIds):
+        '''
+        Return the breaker state of every access point in apIds
+        as a dict() object of apId -> state, in one pipeline.
+        '''
+        with self.redis().pipeline() as pipe:
+            for apId in apIds:
+                pipe.get(self.key(apId, "failures"))
+                pipe.get(self.key(apId, "opened"))
+                pipe.exists(self.key(apId, "probe"))
+            results = pipe.execute()
+
+        return {apId: self.describe(*results[index * 3:index * 3 + 3]) for index, apId in enumerate(apIds)}
+
+    def check(self, apId):
+        '''
+        Raise CircuitOpen while the breaker is open, without claiming
+        the half-open probe (e.g. before queued work is started).
+        Returns True once the breaker is half open.
+        '''
+        openedAt = self.redis().get(self.key(apId, "opened"))
+        if openedAt is None:
+            return False
+
+        retryAt = float(openedAt) + self.tunings['breakerCooldown']
+        if time.time() < retryAt:
+            raise CircuitOpen("Access point {0} is unreachable; not retrying for {1:.0f} seconds".format(apId, retryAt - time.time()))
+
+        return True
+
+    def allow(self, apId):
+        '''
+        Check whether a connection to an access point may be attempted.
+        Raises CircuitOpen while the breaker is open, or while another
+        caller holds the half-open probe.
+        '''
+        if not self.check(apId):
+            return
+
+        # Half open: only the caller that claims the probe gets through
+        if not self.redis().set(self.key(apId, "probe"), 1, nx=True, ex=self.tunings['sshTimeout'] * 2):
+            raise CircuitOpen("Access point {} is unreachable; a probe connection is in progress".format(apId))
+
+    def succeeded(self, apId):
+        '''
+        Record a successful connection, closing the breaker.
+        '''
+        self.redis().delete(self.key(apId, "failures"), self.key(apId, "opened"), self.key(apId, "probe"))
+
+    def failed(self, apId):
+        '''
+        Record a failed connection. The breaker opens (or, after a
+        failed probe, re-opens) once breakerThreshold consecutive
+        connections have failed.
+        '''
+        ttl = self.tunings['breakerCooldown'] * 10
+
+        with self.redis().pipeline() as pipe:
+            pipe.incr(self.key(apId, "failures"))
+            pipe.expire(self.key(apId, "failures"), ttl)
+            failures, _ = pipe.execute()
+
+        if failures >= self.tunings['breakerThreshold']:
+            with self.redis().pipeline() as pipe:
+                pipe.set(self.key(apId, "opened"), time.time(), ex=ttl)
+                pipe.delete(self.key(apId, "probe"))
+                pipe.execute()
+
+    @contextmanager
+    def guard(self, apId):
+        '''
+        Context manager around one connection attempt (a pooled
+        ApSession() or a scout call): allow() first, then record the
+        outcome. Rejected credentials mean the access point answered,
+        so they close the breaker. Cancelled or timed out work gives
+        the probe up without a verdict.
+        '''
+        self.allow(apId)
+
+        try:
+            yield
+        except (DeadlineExceeded, JobCancelled):
+            self.release(apId)
+            raise
+        except paramiko.AuthenticationException:
+            self.succeeded(apId)
+            raise
+        except (OSError, EOFError, paramiko.SSHException):
+            self.failed(apId)
+            raise
+        except Exception:
+            self.release(apId)
+            raise
+        else:
+            self.succeeded(apId)
+
+    def release(self, apId):
+        '''
+        Give up the half-open probe without a verdict (e.g. the
+        job was cancelled while connecting).
+        '''
+        self.redis().delete(self.key(apId, "probe"))
+
+    def reset(self, apId):
+        '''
+        Forget everything known about an access point's
+        reachability (e.g. after its IP address changed).
+        '''
+        self.succeeded(apId)
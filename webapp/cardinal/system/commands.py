@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+
+import re
+
+# IOS command sets for Cardinal operations on autonomous Cisco access points,
+# mirroring the scout templates. Each function returns the ordered list of
+# lines to send over an ApSession() from an exec (#) prompt.
+
+# Radio interface carrying each band
+radioInterfaces = {"24": "Dot11Radio0", "5": "Dot11Radio1"}
+
+def changeName(apName):
+    '''
+    Set the access point hostname.
+    '''
+    return ["configure terminal", "hostname {}".format(apName), "end"]
+
+def tftpBackup(tftpIp, apName):
+    '''
+    Copy the running configuration to a TFTP server.
+    '''
+    return ["copy running-config tftp://{0}/{1}-confg".format(tftpIp, apName)]
+
+def enableHttp():
+    '''
+    Enable the HTTP(S) management interface.
+    '''
+    return ["configure terminal", "ip http server", "ip http secure-server", "end"]
+
+def disableHttp():
+    '''
+    Disable the HTTP(S) management interface.
+    '''
+    return ["configure terminal", "no ip http server", "no ip http secure-server", "end"]
+
+def enableSnmp(snmp):
+    '''
+    Enable read-only SNMP with the given community.
+    '''
+    return ["configure terminal", "snmp-server community {} RO".format(snmp), "end"]
+
+def disableSnmp():
+    '''
+    Disable SNMP.
+    '''
+    return ["configure terminal", "no snmp-server", "end"]
+
+def ssidInterfaces(band, vlan, bridgeGroup, radioSub, gigaSub):
+    '''
+    Radio and Ethernet sub-interfaces bridging an SSID onto its VLAN.
+    '''
+    radio = radioInterfaces[band]
+    return ["interface {0}".format(radio), "encryption vlan {} mode ciphers aes-ccm".format(vlan), "exit",
+        "interface {0}.{1}".format(radio, radioSub), "encapsulation dot1Q {}".format(vlan), "bridge-group {}".format(bridgeGroup), "exit",
+        "interface GigabitEthernet0.{}".format(gigaSub), "encapsulation dot1Q {}".format(vlan), "bridge-group {}".format(bridgeGroup), "exit"]
+
+def createSsid(band, ssid, wpa2Pass, vlan, bridgeGroup, radioSub, gigaSub):
+    '''
+    Create a WPA2-PSK SSID on the 2.4GHz ("24") or 5GHz ("5") radio.
+    '''
+    return ["configure terminal", "dot11 ssid {}".format(ssid), "vlan {}".format(vlan), "authentication open",
+        "authentication key-management wpa version 2", "wpa-psk ascii 0 {}".format(wpa2Pass), "exit"] + \
+        ssidInterfaces(band, vlan, bridgeGroup, radioSub, gigaSub) + \
+        ["interface {}".format(radioInterfaces[band]), "ssid {}".format(ssid), "end"]
+
+def createSsidRadius(band, ssid, vlan, bridgeGroup, radioSub, gigaSub, radiusIp, sharedSecret, authPort, acctPort, radiusTimeout, radiusGroup, methodList):
+    '''
+    Create an 802.1x SSID backed by a RADIUS server on the 2.4GHz ("24")
+    or 5GHz ("5") radio.
+    '''
+    return ["configure terminal", "aaa new-model", "radius server {}".format(radiusGroup),
+        "address ipv4 {0} auth-port {1} acct-port {2}".format(radiusIp, authPort, acctPort), "key {}".format(sharedSecret),
+        "timeout {}".format(radiusTimeout), "exit", "aaa group server radius {}".format(radiusGroup), "server name {}".format(radiusGroup), "exit",
+        "aaa authentication login {0} group {1}".format(methodList, radiusGroup), "dot11 ssid {}".format(ssid), "vlan {}".format(vlan),
+        "authentication open eap {}".format(methodList), "authentication network-eap {}".format(methodList),
+        "authentication key-management wpa version 2", "exit"] + \
+        ssidInterfaces(band, vlan, bridgeGroup, radioSub, gigaSub) + \
+        ["interface {}".format(radioInterfaces[band]), "ssid {}".format(ssid), "end"]
+
+def deleteSsid(band, ssid, vlan, radioSub, gigaSub):
+    '''
+    Remove an SSID (and its sub-interfaces) from the 2.4GHz ("24")
+    or 5GHz ("5") radio.
+    '''
+    radio = radioInterfaces[band]
+    return ["configure terminal", "interface {}".format(radio), "no ssid {}".format(ssid), "no encryption vlan {}".format(vlan), "exit",
+        "no interface {0}.{1}".format(radio, radioSub), "no interface GigabitEthernet0.{}".format(gigaSub), "no dot11 ssid {}".format(ssid), "end"]
+
+def writeMemory():
+    '''
+    Save the running configuration to NVRAM.
+    '''
+    return ["copy running-config startup-config"]
+
+def fetchInfo():
+    '''
+    Show commands whose output feeds parseFetchInfo().
+    '''
+    return ["show version", "show interfaces GigabitEthernet0", "show dot11 associations", "show snmp location"]
+
+def parseFetchInfo(version, interface, associations, location):
+    '''
+    Parse fetchInfo() output into the same positional list scout's fetcher
+    returns: [mac, bandwidth, iosInfo, uptime, serial, model, clients, location].
+    '''
+    def search(pattern, text, default=""):
+        match = re.search(pattern, text, re.MULTILINE)
+        return match.group(1).strip() if match else default
+
+    macAddr = search(r"address is ([0-9a-fA-F\.]+)", interface)
+    bandwidth = "{}Mbps".format(int(search(r"BW (\d+) Kbit", interface, "0")) // 1000)
+    iosInfo = search(r"^(Cisco IOS Software.*)$", version)
+    uptime = search(r"uptime is (.*)$", version)
+    serial = search(r"^(?:Top Assembly|System) [Ss]erial [Nn]umber\s*:\s*(\S+)", version)
+    model = search(r"^Product/Model [Nn]umber\s*:\s*(\S+)", version) or search(r"^cisco (\S+)", version)
+    clients = len(re.findall(r"^[0-9a-fA-F]{4}\.[0-9a-fA-F]{4}\.[0-9a-fA-F]{4}\s", associations, re.MULTILINE))
+    apLocation = "\n".join(line for line in location.splitlines()[1:-1]).strip()
+
+    return [macAddr, bandwidth, iosInfo, uptime, serial, model, clients, apLocation]
@@ -28,120 +28,167 @@ SOFTWARE.
 
 import json
 import MySQLdb
-import multiprocessing
-import os
-from configparser import ConfigParser
+import hashlib
+import time
+import uuid
+from cardinal.system.settings import cardinalSettings
+from cardinal.system.sqlpool import cardinalSqlPool
 from cryptography.fernet import Fernet
+from cryptography.fernet import MultiFernet
+from datetime import timedelta
+from flask import g
+from flask import has_app_context
 from redis import Redis
+from redis import WatchError
 from rq import Queue
 from rq import Retry
-from scout import info
-from scout import ssid
-from scout import sys
+from rq.registry import FailedJobRegistry
+from rq.registry import ScheduledJobRegistry
+from rq.registry import StartedJobRegistry
+from rq.exceptions import InvalidJobOperation
+from rq.job import Job
+from rq.utils import utcnow
 from flask_login import UserMixin
 
-class CardinalEnv():
-    '''
-    Object that defines how Cardinal ultimately
-    behaves. CardinalEnv() will return a dict()
-    with configuration options, which will be ingested
-    on invocation.
-    '''
-    def __init__(self):
+# Process-wide Redis client. See CardinalEnv.redis().
+cardinalRedis = None
 
-        # Ingest values from config file at CARDINALCONFIG
+# Process-wide (keys, MultiFernet) pair. See CardinalEnv.cipherSuite().
+cardinalCipherSuite = None
 
-        self.cardinalConfig = ConfigParser()
-        try:
-            cardinalConfigFile = os.environ['CARDINALCONFIG']
-        except:
-            cardinalConfigFile = "/opt/cardinal.ini"
+# rq job states after which a job will not run again.
+rqFinishedStates = ("finished", "failed", "stopped", "canceled")
 
-        self.cardinalConfig.read(cardinalConfigFile)
-        # Create a dict() to hold tuning values
-        self.tunings = dict()
+# rq job states in which an identical job may be shared instead of enqueued
+# again (it hasn't started yet).
+rqQueuedStates = ("queued", "deferred", "scheduled")
 
-        # Establish default behavior. If values are not defined
-        # in CARDINALCONFIG, we'll try to handle accordingly.
+# rq job states of a job that has yet to finish.
+rqPendingStates = rqQueuedStates + ("started",)
 
-        if self.cardinalConfig.has_option('cardinal', 'dbServer'):
-            self.tunings['dbServer'] = self.cardinalConfig.get('cardinal', 'dbServer')
-        else:
-            self.tunings['dbServer'] = '127.0.0.1'
+# rq job states in which a dispatched (or shared) job counts as accepted.
+rqAcceptedStates = rqPendingStates + ("finished",)
 
-        if self.cardinalConfig.has_option('cardinal', 'dbUsername'):
-            self.tunings['dbUsername'] = self.cardinalConfig.get('cardinal', 'dbUsername')
-        else:
-            self.tunings['dbUsername'] = 'root'
+# Timeouts (in seconds) for asynchronous work, by function name. Anything
+# not listed here runs under the jobTimeout tuning.
+jobTimeouts = dict(fetchInfo=60, changeIp=60, changeHostname=60, manageHttp=60, manageSnmp=60, tftpBackup=300, writeMemory=120, \
+    deploy24GhzSsid=120, deploy5GhzSsid=120, deploy24GhzRadiusSsid=120, deploy5GhzRadiusSsid=120, remove24GhzSsid=120, \
+    remove5GhzSsid=120, remove24GhzRadiusSsid=120, remove5GhzRadiusSsid=120, plan=600, ping=60, traceroute=120, dig=30, \
+    curl=60, reencryptSecrets=3600)
 
-        if self.cardinalConfig.has_option('cardinal', 'dbPassword'):
-            self.tunings['dbPassword'] = self.cardinalConfig.get('cardinal', 'dbPassword')
-        else:
-            self.tunings['dbPassword'] = ''
+# Asynchronous work (by function or operation name) that identical requests
+# may share. Only read-only work qualifies: state changes (e.g. disable then
+# enable HTTP) must each reach the access point, in order.
+coalescedJobs = ("fetchInfo", "tftpBackup")
 
-        if self.cardinalConfig.has_option('cardinal', 'dbName'):
-            self.tunings['dbName'] = self.cardinalConfig.get('cardinal', 'dbName')
-        else:
-            self.tunings['dbName'] = 'cardinal'
+# Job priority classes, mapped to the rq queue serving each class. Workers
+# drain the queues in this order (see entrypoint.sh). Telemetry polling has
+# a queue (and worker) of its own, so a long poll cycle never holds up
+# other work.
+jobPriorities = dict(interactive="high", bulk="default", background="low", telemetry="poller")
 
-        if self.cardinalConfig.has_option('cardinal', 'dbPort'):
-            self.tunings['dbPort'] = int(self.cardinalConfig.get('cardinal', 'dbPort'))
-        else:
-            self.tunings['dbPort'] = 3306
+class JobCancelled(Exception):
+    '''
+    Raised inside a job once cancellation has been
+    requested through RqJob.cancel().
+    '''
+    # Exceptions with retryable = False fail a job without rq retries
+    retryable = False
 
+class CardinalEnv():
+    '''
+    Object that defines how Cardinal ultimately
+    behaves. CardinalEnv() exposes the process-wide
+    configuration snapshot as a dict()-like object.
+    '''
+    @property
+    def tunings(self):
+        '''
+        Process-wide tunings snapshot. Configuration is parsed
+        once per process by CardinalSettings() rather than every
+        time a CardinalEnv() object is created.
+        '''
+        return cardinalSettings.snapshot()
 
-        if self.cardinalConfig.has_option('cardinal', 'flaskKey'):
-            self.tunings['flaskKey'] = self.cardinalConfig.get('cardinal', 'flaskKey')
-        else:
-            self.tunings['flaskKey'] = '1eb88eb6c196cbbe488dfb3a128bc8230263aad7f32ec050da35d037cc1727c2'
+    def sqlPool(self):
+        '''
+        Return the process-wide SqlPool() object shared
+        by every CardinalEnv() object.
+        '''
+        return cardinalSqlPool
 
-        if self.cardinalConfig.has_option('cardinal', 'encryptKey'):
-            self.tunings['encryptKey'] = self.cardinalConfig.get('cardinal', 'encryptKey')
-        else:
-            self.tunings['encryptKey'] = 'rFLoNiCTwoOa6o8QOXBy-9WK2-IdSTT8HKiiIzQFHVVZ='
+    def redis(self):
+        '''
+        Return the process-wide Redis client. redis-py keeps its own
+        connection pool (and resets it after fork), so one client is
+        shared by every CardinalEnv() object.
+        '''
+        global cardinalRedis
 
-        if self.cardinalConfig.has_option('cardinal', 'workers'):
-            self.tunings['workers'] = int(self.cardinalConfig.get('cardinal', 'workers'))
-        else:
-            self.tunings['workers'] = 1
+        if cardinalRedis is None:
+            cardinalRedis = Redis(host=self.tunings["redisServer"], port=self.tunings["redisPort"])
 
-        if self.cardinalConfig.has_option('cardinal', 'sessionTimeout'):
-            self.tunings['sessionTimeout'] = int(self.cardinalConfig.get('cardinal', 'sessionTimeout'))
-        else:
-            self.tunings['sessionTimeout'] = 1000
+        return cardinalRedis
 
-        if self.cardinalConfig.has_option('cardinal', 'redisServer'):
-            self.tunings['redisServer'] = self.cardinalConfig.get('cardinal', 'redisServer')
-        else:
-            self.tunings['redisServer'] = "localhost"
+    def sql(self):
+        '''
+        Connection object for MySQLdb transactions. Within a Flask
+        request, one pooled connection is shared by every object for the
+        lifetime of the request and handed back by releaseSql() in the
+        teardown hook. Outside of Flask (rq workers), the connection is
+        bound to the calling thread.
+        '''
+        if has_app_context():
+            if "sqlConn" not in g:
+                g.sqlConn = self.sqlPool().acquire()
+            return g.sqlConn
 
-        if self.cardinalConfig.has_option('cardinal', 'redisPort'):
-            self.tunings['redisPort'] = int(self.cardinalConfig.get('cardinal', 'redisPort'))
-        else:
-            self.tunings['redisPort'] = 6379
+        return self.sqlPool().threadConnection()
 
-        if self.cardinalConfig.has_option('cardinal', 'jobRetry'):
-            self.tunings['jobRetry'] = int(self.cardinalConfig.get('cardinal', 'jobRetry'))
+    def releaseSql(self):
+        '''
+        Return the request (or thread) scoped MySQL
+        connection to the pool.
+        '''
+        if has_app_context():
+            self.sqlPool().release(g.pop("sqlConn", None))
         else:
-            self.tunings['jobRetry'] = 3
+            self.sqlPool().releaseThreadConnection()
 
+    def releaseWorkerSql(self):
+        '''
+        Outside of Flask requests, return the calling thread's
+        MySQL connection to the pool once a unit of work has read what
+        it needs. Engine threads outnumber dbPoolSize, so they must not
+        hold a connection across SSH I/O. sql() checks a connection out
+        again if the thread needs one later.
+        '''
+        if not has_app_context():
+            self.sqlPool().releaseThreadConnection()
 
-    def sql(self):
+    def cipherSuite(self):
         '''
-        Connection object for MySQLdb transactions.
+        Return the process-wide MultiFernet object used by
+        encryption(). The first key (encryptKey) encrypts, while
+        retired keys listed in encryptKeyPrevious can still decrypt.
+        The object is rebuilt only when the configured keys change.
         '''
-        conn = MySQLdb.connect(host=self.tunings['dbServer'], user=self.tunings['dbUsername'], port=self.tunings['dbPort'], passwd=self.tunings['dbPassword'], db=self.tunings['dbName'])
+        global cardinalCipherSuite
+
+        cipherKeys = (self.tunings['encryptKey'],) + tuple(key.strip() for key in self.tunings['encryptKeyPrevious'].split(",") if key.strip())
 
-        return conn
+        if cardinalCipherSuite is None or cardinalCipherSuite[0] != cipherKeys:
+            cipherSuite = MultiFernet([Fernet(bytes(key, 'utf-8')) for key in cipherKeys])
+            cardinalCipherSuite = (cipherKeys, cipherSuite)
+
+        return cardinalCipherSuite[1]
 
     def encryption(self, input, action):
         '''
         Encrypt/decrypt a sensitive value in Cardinal
         using Fernet.
         '''
-        encryptKey = self.tunings['encryptKey']
-        bytesKey = bytes(encryptKey, 'utf-8')
-        cipherSuite = Fernet(bytesKey)
+        cipherSuite = self.cipherSuite()
 
         if action == "encrypt":
             # Encrypt the value using cipherSuite
@@ -321,12 +368,253 @@ class ScoutJob(CardinalEnv):
         else:
             return list(toolkitJobInfo)
 
+class JobCoalescer(CardinalEnv):
+    '''
+    Object that hands out idempotency keys for asynchronous work.
+    A key is derived from a job's name and arguments and points at
+    the job currently doing that work, so identical requests can
+    share one job instead of each touching the access point.
+    '''
+    def __init__(self):
+        '''
+        Default constructor for JobCoalescer() object.
+        '''
+        super().__init__()
+
+    def key(self, name, args):
+        '''
+        Redis key (idempotency key) for a job name and its arguments.
+        '''
+        digest = hashlib.sha256(json.dumps([name, args], sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        return "cardinal:job_key:{}".format(digest)
+
+    def claim(self, name, args, jobId, shareable):
+        '''
+        Point the idempotency key for name/args at jobId, unless the
+        job it already points at can be shared. shareable is called
+        with that job's id and returns the object to share (or None).
+        Returns the shared object, or None if the caller should go
+        ahead and start jobId.
+        '''
+        key = self.key(name, args)
+
+        with self.redis().pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    existingId = pipe.get(key)
+                    if existingId is not None:
+                        shared = shareable(existingId.decode('utf-8'))
+                        if shared is not None:
+                            return shared
+
+                    pipe.multi()
+                    pipe.set(key, jobId, ex=self.tunings['jobKeyTtl'])
+                    pipe.execute()
+                    return None
+                except WatchError:
+                    # Someone else claimed the key first; look at their job instead
+                    continue
+
+class RqJob(CardinalEnv):
+    '''
+    Object that reports on individual rq jobs (by id). Live jobs
+    are read from Redis; results of finished jobs are persisted
+    to rqworker_results in batches so they outlive rq's result_ttl.
+    '''
+    def __init__(self):
+        '''
+        Default constructor for RqJob() object.
+        '''
+        super().__init__()
+
+    def key(self, suffix):
+        '''
+        Redis key for the rqworker_results write buffer.
+        '''
+        return "cardinal:rq_results:{}".format(suffix)
+
+    def describe(self, job):
+        '''
+        Return a dict() object describing an rq job.
+        '''
+        jobInfo = dict(job_id=job.id, status=job.get_status(refresh=False), func=job.func_name, priority=jobPriorityOf(job.origin))
+
+        for field in ("enqueued_at", "started_at", "ended_at"):
+            value = getattr(job, field)
+            jobInfo[field] = value.isoformat() if value is not None else None
+
+        if jobInfo["status"] == "failed" and job.exc_info:
+            jobInfo["result"] = "ERROR: {}".format(job.exc_info.strip().splitlines()[-1])
+        else:
+            jobInfo["result"] = json.loads(json.dumps(job.result, default=str))
+
+        return jobInfo
+
+    def persisted(self, jobIds):
+        '''
+        Return results stored in rqworker_results for jobIds as a
+        dict() object of job id -> job description. Failed jobs are
+        stored with an "ERROR: " prefixed result.
+        '''
+        conn = self.sql()
+
+        try:
+            rqResultCursor = conn.cursor(MySQLdb.cursors.DictCursor)
+            rqResultCursor.execute("SELECT job_id, result, created FROM rqworker_results WHERE job_id IN ({})".format(", ".join(["%s"] * len(jobIds))), jobIds)
+            rqResults = rqResultCursor.fetchall()
+            rqResultCursor.close()
+        except Exception:
+            return dict()
+
+        jobInfo = dict()
+        for rqResult in rqResults:
+            try:
+                result = json.loads(rqResult["result"])
+            except ValueError:
+                result = rqResult["result"]
+
+            status = "failed" if isinstance(result, str) and result.startswith("ERROR:") else "finished"
+            jobInfo[rqResult["job_id"]] = dict(job_id=rqResult["job_id"], status=status, result=result, \
+                ended_at=rqResult["created"].isoformat() if rqResult["created"] is not None else None)
+
+        return jobInfo
+
+    def status(self, jobIds):
+        '''
+        Return a list of job descriptions (or None for unknown
+        jobs) for jobIds. Every job is fetched from Redis through a
+        single pipeline; jobs rq already expired are looked up in
+        rqworker_results with a single query.
+        '''
+        jobs = Job.fetch_many(jobIds, connection=self.redis())
+        jobInfo = [self.describe(job) if job is not None else None for job in jobs]
+
+        missingIds = [jobId for jobId, job in zip(jobIds, jobs) if job is None]
+        if missingIds:
+            persistedInfo = self.persisted(missingIds)
+            jobInfo = [info if info is not None else persistedInfo.get(jobId) for jobId, info in zip(jobIds, jobInfo)]
+
+        return jobInfo
+
+    def wait(self, jobIds, timeout):
+        '''
+        Long-poll jobIds until every known job has finished (or
+        timeout seconds, capped at jobWaitMax, have passed) and
+        return their descriptions. No MySQL connection is held
+        while waiting.
+        '''
+        deadline = time.time() + min(timeout, self.tunings['jobWaitMax'])
+
+        while True:
+            jobInfo = self.status(jobIds)
+            pending = [info for info in jobInfo if info is not None and info["status"] not in rqFinishedStates]
+            remaining = deadline - time.time()
+
+            if not pending or remaining <= 0:
+                return jobInfo
+
+            # Includes the request's connection (taken by login_required)
+            self.releaseSql()
+            time.sleep(min(self.tunings['jobPollInterval'], remaining))
+
+    def cancel(self, jobIds):
+        '''
+        Cancel rq jobs. Queued (or scheduled) jobs are taken off their
+        queue; running jobs are flagged and stop at their next
+        cancellation check (see JobContext()). Returns a dict() object
+        of job id -> "canceled", "stopping", the state of a job that
+        already finished, or None for unknown jobs.
+        '''
+        jobs = Job.fetch_many(jobIds, connection=self.redis())
+        outcomes = dict()
+
+        for jobId, job in zip(jobIds, jobs):
+            if job is None:
+                outcomes[jobId] = None
+                continue
+
+            status = job.get_status(refresh=False)
+            if status in rqFinishedStates:
+                outcomes[jobId] = status
+                continue
+
+            # Flag the job first, in case a worker picks it up meanwhile
+            timeout = job.timeout if job.timeout is not None and job.timeout > 0 else self.tunings['jobKeyTtl']
+            self.redis().set(jobCancelKey(jobId), 1, ex=int(timeout) + self.tunings['jobKeyTtl'])
+
+            if status == "started":
+                outcomes[jobId] = "stopping"
+            else:
+                try:
+                    job.cancel()
+                except InvalidJobOperation:
+                    pass
+                outcomes[jobId] = "canceled"
+
+        return outcomes
+
+    def buffer(self, jobId, result):
+        '''
+        Queue a finished job's result for rqworker_results. Results
+        are flushed once jobResultBatch of them are buffered, or
+        jobResultFlushInterval seconds after the first one was.
+        '''
+        with self.redis().pipeline() as pipe:
+            pipe.rpush(self.key("pending"), json.dumps(dict(job_id=jobId, result=json.dumps(result, default=str))))
+            pipe.set(self.key("scheduled"), 1, nx=True, ex=self.tunings['jobResultFlushInterval'] * 10)
+            buffered, scheduled = pipe.execute()
+
+        if buffered >= self.tunings['jobResultBatch']:
+            self.flush()
+        elif scheduled:
+            AsyncOpsManager().runIn(func="cardinal.system.common.flushRqJobResults", args=dict(), delay=self.tunings['jobResultFlushInterval'])
+
+    def flush(self):
+        '''
+        Drain the write buffer into rqworker_results, one multi-row
+        INSERT per jobResultBatch results. Returns the number of
+        results written.
+        '''
+        batchSize = self.tunings['jobResultBatch']
+        written = 0
+
+        while True:
+            with self.redis().pipeline() as pipe:
+                pipe.lrange(self.key("pending"), 0, batchSize - 1)
+                pipe.ltrim(self.key("pending"), batchSize, -1)
+                entries, _ = pipe.execute()
+
+            if not entries:
+                self.redis().delete(self.key("scheduled"))
+                return written
+
+            rows = [(entry["job_id"], entry["result"]) for entry in map(json.loads, entries)]
+            conn = self.sql()
+
+            try:
+                rqResultCursor = conn.cursor()
+                rqResultCursor.executemany("INSERT INTO rqworker_results (job_id, result) VALUES (%s, %s)", rows)
+                rqResultCursor.close()
+            except Exception as e:
+                # Put the batch back so the next flush can retry it
+                self.redis().lpush(self.key("pending"), *reversed(entries))
+                self.redis().delete(self.key("scheduled"))
+                return "ERROR: {}".format(e)
+            else:
+                conn.commit()
+                written += len(rows)
+
 # SYSTEM MESSAGES/UTILITIES
 
 class AsyncOpsManager(CardinalEnv):
     '''
     Object that defines how asynchronous work
-    is handled within Cardinal.
+    is handled within Cardinal. Work is routed to one
+    rq queue per priority class (see jobPriorities):
+    interactive (single access point operations), bulk
+    (group operations), background (housekeeping) and
+    telemetry (the telemetry poller).
     '''
     def __init__(self):
         '''
@@ -334,19 +622,208 @@ class AsyncOpsManager(CardinalEnv):
         '''
         super().__init__()
 
-        # Initiate connection to Redis backend
-        conn = Redis(host=self.tunings["redisServer"], port=self.tunings["redisPort"])
+        # Establish one Redis queue per priority class for asynchronous work
+        self.asyncQueues = {priority: Queue(queueName, connection=self.redis()) for priority, queueName in jobPriorities.items()}
+
+    def queue(self, priority):
+        '''
+        Return the rq queue serving a priority class.
+        '''
+        if priority not in self.asyncQueues:
+            raise ValueError("Unsupported job priority {}. Please choose from the following: {}".format(priority, ", ".join(jobPriorities)))
+
+        return self.asyncQueues[priority]
 
-        # Establish Redis queue for asynchronous work
-        self.asyncQueue = Queue('cardinal', connection=conn)
+    def metricsKey(self):
+        '''
+        Redis key for per priority class queue metrics.
+        '''
+        return "cardinal:queue_metrics"
+
+    def timeoutFor(self, name):
+        '''
+        Timeout (in seconds) for asynchronous work by
+        function (or operation) name. See jobTimeouts.
+        '''
+        return jobTimeouts.get(name.rsplit(".", 1)[-1], self.tunings['jobTimeout'])
 
-    def run(self, func, args):
+    def run(self, func, args, timeout=None, freshness=0, priority="interactive"):
         '''
-        Run an unit of asynchronous work (by function)
+        Run an unit of asynchronous work (by function). timeout (in
+        seconds) defaults to the function's entry in jobTimeouts. The
+        job's result is recorded in rqworker_results (see RqJob()).
+
+        For read-only work (see coalescedJobs), an identical job
+        (same function and args) that is still queued is returned
+        instead of enqueuing another one. freshness (in seconds) also
+        lets a job that finished that recently be shared, result
+        included.
         '''
-        asyncResult = self.asyncQueue.enqueue(func, kwargs=args, retry=Retry(max=self.tunings["jobRetry"]))
+        asyncQueue = self.queue(priority)
+        jobId = str(uuid.uuid4())
+
+        if timeout is None:
+            timeout = self.timeoutFor(jobName(func))
+
+        if jobName(func).rsplit(".", 1)[-1] in coalescedJobs:
+            sharedJob = JobCoalescer().claim(jobName(func), args, jobId, lambda existingId: self.shareable(existingId, freshness))
+            if sharedJob is not None:
+                return sharedJob
+
+        asyncResult = asyncQueue.enqueue(func, kwargs=args, job_timeout=timeout, job_id=jobId, retry=Retry(max=self.tunings["jobRetry"]), \
+            on_success=rqJobSucceeded, on_failure=rqJobFailed)
+        self.redis().hincrby(self.metricsKey(), "{}:enqueued".format(priority), 1)
         return asyncResult
 
+    def shareable(self, jobId, freshness):
+        '''
+        Return the rq job jobId if it can stand in for a new, identical
+        job (still queued, or finished less than freshness seconds ago),
+        otherwise None. A job that has started may have read the access
+        point before the new request was made.
+        '''
+        job = Job.fetch_many([jobId], connection=self.redis())[0]
+        if job is None:
+            return None
+
+        status = job.get_status(refresh=False)
+        if status in rqQueuedStates:
+            return job
+        elif status == "finished" and job.ended_at is not None and (utcnow() - job.ended_at).total_seconds() < freshness:
+            return job
+
+        return None
+
+    def runIn(self, func, args, delay, priority="background", timeout=None):
+        '''
+        Run an unit of asynchronous work (by function, or dotted
+        function path) after delay seconds. Requires an rq worker
+        started with --with-scheduler. Used for housekeeping, so
+        results are not recorded in rqworker_results.
+        '''
+        if timeout is None:
+            timeout = self.timeoutFor(jobName(func))
+
+        asyncResult = self.queue(priority).enqueue_in(timedelta(seconds=delay), func, kwargs=args, job_timeout=timeout, \
+            retry=Retry(max=self.tunings["jobRetry"]))
+        self.redis().hincrby(self.metricsKey(), "{}:enqueued".format(priority), 1)
+        return asyncResult
+
+    def runMany(self, func, argsList, meta=None, priority="bulk", timeout=None):
+        '''
+        Run many units of asynchronous work (by function), one per
+        dict() in argsList. Every job is enqueued through a single
+        Redis pipeline rather than one round trip per job.
+        '''
+        asyncQueue = self.queue(priority)
+
+        if timeout is None:
+            timeout = self.timeoutFor(jobName(func))
+
+        jobData = [Queue.prepare_data(func, kwargs=args, meta=meta, timeout=timeout, retry=Retry(max=self.tunings["jobRetry"]), \
+            on_success=rqJobSucceeded, on_failure=rqJobFailed) for args in argsList]
+
+        with self.redis().pipeline() as pipe:
+            asyncResults = asyncQueue.enqueue_many(jobData, pipeline=pipe)
+            pipe.hincrby(self.metricsKey(), "{}:enqueued".format(priority), len(asyncResults))
+            pipe.execute()
+
+        return asyncResults
+
+    def recordWait(self, job):
+        '''
+        Account for the time a job spent queued
+        before a worker picked it up.
+        '''
+        priority = jobPriorityOf(job.origin)
+        if priority is None or job.enqueued_at is None or job.started_at is None:
+            return
+
+        with self.redis().pipeline() as pipe:
+            pipe.hincrby(self.metricsKey(), "{}:started".format(priority), 1)
+            pipe.hincrbyfloat(self.metricsKey(), "{}:wait".format(priority), max((job.started_at - job.enqueued_at).total_seconds(), 0))
+            pipe.execute()
+
+    def metrics(self):
+        '''
+        Return queue depth and wait time for every priority
+        class as a dict() object.
+        '''
+        with self.redis().pipeline() as pipe:
+            for asyncQueue in self.asyncQueues.values():
+                pipe.llen(asyncQueue.key)
+                pipe.zcard(StartedJobRegistry(queue=asyncQueue).key)
+                pipe.zcard(ScheduledJobRegistry(queue=asyncQueue).key)
+                pipe.zcard(FailedJobRegistry(queue=asyncQueue).key)
+            pipe.hgetall(self.metricsKey())
+            results = pipe.execute()
+
+        counters = {field.decode('utf-8'): float(value) for field, value in results.pop().items()}
+        queueMetrics = dict()
+
+        for index, (priority, asyncQueue) in enumerate(self.asyncQueues.items()):
+            queued, started, scheduled, failed = results[index * 4:index * 4 + 4]
+            waited = counters.get("{}:started".format(priority), 0)
+            queueMetrics[priority] = dict(queue=asyncQueue.name, queued=queued, started=started, scheduled=scheduled, failed=failed, \
+                enqueued=int(counters.get("{}:enqueued".format(priority), 0)), average_wait=round(counters.get("{}:wait".format(priority), 0) / waited, 3) if waited else 0.0)
+
+        return queueMetrics
+
+def jobName(func):
+    '''
+    Fully qualified name of a function (or bound method)
+    run as asynchronous work.
+    '''
+    if isinstance(func, str):
+        return func
+
+    return "{0}.{1}".format(func.__module__, func.__qualname__)
+
+def jobCancelKey(jobId):
+    '''
+    Redis key flagging an rq job for cancellation.
+    '''
+    return "cardinal:job_cancel:{}".format(jobId)
+
+def jobPriorityOf(queueName):
+    '''
+    Priority class served by an rq queue, or None.
+    '''
+    for priority, priorityQueue in jobPriorities.items():
+        if priorityQueue == queueName:
+            return priority
+
+    return None
+
+def rqJobSucceeded(job, connection, result, *args, **kwargs):
+    '''
+    rq success callback. Buffers the job's result
+    for rqworker_results.
+    '''
+    AsyncOpsManager().recordWait(job)
+    RqJob().buffer(job.id, result)
+
+def rqJobFailed(job, connection, type, value, traceback):
+    '''
+    rq failure callback. Only the final attempt of a
+    retried job is recorded in rqworker_results.
+    '''
+    AsyncOpsManager().recordWait(job)
+
+    # Cancelled jobs (or those that can only fail the same way again) are not retried
+    if not getattr(value, "retryable", True):
+        job.retries_left = 0
+
+    if not job.retries_left:
+        RqJob().buffer(job.id, "ERROR: {}".format(value))
+
+def flushRqJobResults():
+    '''
+    Function that drains buffered rq job results into
+    rqworker_results (runs as a scheduled rq job).
+    '''
+    return RqJob().flush()
+
 def jsonResponse(level, message, **kwargs):
     '''
     Temporary way of getting some simple logging
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+
+import os
+import threading
+from cardinal.system.jobcontext import currentJobContext
+from cardinal.system.jobcontext import jobContext
+from cardinal.system.settings import cardinalSettings
+from cardinal.system.sqlpool import cardinalSqlPool
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+
+class TaskEngine():
+    '''
+    Long-lived, bounded thread pool used to fan work out within
+    a single uwsgi/rq process. The pool is created on first use,
+    sized by a Cardinal tuning, and rebuilt after fork() or when
+    the tuning changes.
+    '''
+    def __init__(self, name, sizeTuning):
+        '''
+        Default constructor for TaskEngine() object.
+        '''
+        self.name = name
+        self.sizeTuning = sizeTuning
+        self.lock = threading.Lock()
+        self.pool = None
+        self.poolSize = None
+        self.pid = None
+
+    def size(self):
+        '''
+        Number of worker threads for this engine.
+        '''
+        return max(1, int(cardinalSettings.snapshot()[self.sizeTuning]))
+
+    def executor(self):
+        '''
+        Return the ThreadPoolExecutor() backing this engine.
+        '''
+        size = self.size()
+
+        with self.lock:
+            if self.pool is None or self.pid != os.getpid() or self.poolSize != size:
+                if self.pool is not None and self.pid == os.getpid():
+                    # Let in-flight work finish on the old pool
+                    self.pool.shutdown(wait=False)
+                self.pool = ThreadPoolExecutor(max_workers=size, thread_name_prefix="cardinal-{}".format(self.name))
+                self.poolSize = size
+                self.pid = os.getpid()
+
+            return self.pool
+
+    def task(self, func, args, context=None):
+        '''
+        Run one unit of work on an engine thread, under the
+        JobContext() of the thread that submitted it (deadline and
+        cancellation). Engine threads are reused, so the thread's
+        MySQL connection goes back to the pool once the work is done.
+        '''
+        try:
+            with jobContext(context if context is not None else currentJobContext()):
+                return func(*args)
+        finally:
+            cardinalSqlPool.releaseThreadConnection()
+
+    def submit(self, func, *args):
+        '''
+        Submit one unit of work and return its Future() object.
+        '''
+        return self.executor().submit(self.task, func, args, currentJobContext())
+
+    def stream(self, func, argsList, window=None):
+        '''
+        Run func(*args) for every entry in argsList and yield
+        (index, args, result, error) tuples as they complete, rather than
+        waiting for the whole batch. At most window units of work (twice
+        the pool size by default) are queued at any one time.
+        '''
+        if window is None:
+            window = self.size() * 2
+
+        pending = dict()
+        argsIterator = iter(enumerate(argsList))
+        exhausted = False
+
+        while True:
+            while not exhausted and len(pending) < window:
+                try:
+                    index, args = next(argsIterator)
+                except StopIteration:
+                    exhausted = True
+                else:
+                    pending[self.submit(func, *args)] = (index, args)
+
+            if not pending:
+                return
+
+            done, notDone = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, args = pending.pop(future)
+                error = future.exception()
+                if error is None:
+                    yield index, args, future.result(), None
+                else:
+                    yield index, args, None, error
+
+# Shared engine for this process. scoutEngine runs I/O-bound scout calls and
+# is sized by scoutWorkers.
+scoutEngine = TaskEngine("scout", "scoutWorkers")
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+
+import json
+import threading
+import time
+import uuid
+from cardinal.system.common import CardinalEnv
+from cardinal.system.common import RqJob
+
+# Event streams (see GroupJob.events()) served by this process, each
+# holding a uwsgi thread. See GroupJob.claimStream().
+sseStreams = 0
+sseStreamsLock = threading.Lock()
+
+class GroupJob(CardinalEnv):
+    '''
+    Object that tracks a group operation (one unit of work
+    per access point) under a single group job id. Progress
+    is kept in Redis so any uwsgi/rq process can report on it.
+    '''
+    def __init__(self):
+        '''
+        Default constructor for GroupJob() object.
+        '''
+        super().__init__()
+
+    def key(self, groupJobId, suffix):
+        '''
+        Redis key for a group job element.
+        '''
+        return "cardinal:group_job:{0}:{1}".format(groupJobId, suffix)
+
+    def create(self, operation, apIds, groupJobId=None, **kwargs):
+        '''
+        Register a new group job covering apIds and
+        return its id (groupJobId, if given).
+        '''
+        if groupJobId is None:
+            groupJobId = str(uuid.uuid4())
+        ttl = self.tunings['groupJobTtl']
+
+        meta = dict(group_job_id=groupJobId, operation=operation, total=len(apIds), created=time.time(), state="queued")
+        meta.update(kwargs)
+
+        with self.redis().pipeline() as pipe:
+            pipe.set(self.key(groupJobId, "meta"), json.dumps(meta), ex=ttl)
+            if apIds:
+                pipe.hset(self.key(groupJobId, "aps"), mapping={apId: json.dumps(dict(state="queued", updated=meta["created"])) for apId in apIds})
+                pipe.expire(self.key(groupJobId, "aps"), ttl)
+            pipe.execute()
+
+        return groupJobId
+
+    def attach(self, groupJobId, jobs):
+        '''
+        Record which rq job is handling each access point.
+        jobs is a dict() of apId -> rq job id.
+        '''
+        if jobs:
+            with self.redis().pipeline() as pipe:
+                pipe.hset(self.key(groupJobId, "jobs"), mapping=jobs)
+                pipe.expire(self.key(groupJobId, "jobs"), self.tunings['groupJobTtl'])
+                pipe.execute()
+
+    def update(self, groupJobId, apId, state, detail=None):
+        '''
+        Record the state (queued, started, retrying, succeeded,
+        failed, aborted) of one access point within a group job.
+        '''
+        apState = dict(state=state, updated=time.time())
+        if detail is not None:
+            apState["detail"] = str(detail)
+
+        # Subscribers of events() get every transition as it happens
+        with self.redis().pipeline() as pipe:
+            pipe.hset(self.key(groupJobId, "aps"), apId, json.dumps(apState))
+            pipe.publish(self.key(groupJobId, "events"), json.dumps(dict(apState, ap_id=int(apId))))
+            pipe.execute()
+
+    def annotate(self, groupJobId, **kwargs):
+        '''
+        Merge extra fields (e.g. why a rollout was aborted)
+        into a group job's metadata.
+        '''
+        metaKey = self.key(groupJobId, "meta")
+        meta = self.redis().get(metaKey)
+        if meta is not None:
+            meta = json.loads(meta)
+            meta.update(kwargs)
+            self.redis().set(metaKey, json.dumps(meta), keepttl=True)
+
+    def steps(self, groupJobId, apId, stepResults):
+        '''
+        Record per-step results of an operation plan
+        for one access point.
+        '''
+        with self.redis().pipeline() as pipe:
+            pipe.hset(self.key(groupJobId, "steps"), apId, json.dumps(stepResults, default=str))
+            pipe.expire(self.key(groupJobId, "steps"), self.tunings['groupJobTtl'])
+            pipe.execute()
+
+    def summarize(self, meta, apStates):
+        '''
+        Compute counts per state, overall state and throughput
+        (finished access points per second) of a group job.
+        '''
+        counts = dict(queued=0, started=0, retrying=0, succeeded=0, failed=0, aborted=0)
+        lastUpdate = meta["created"]
+
+        for apState in apStates:
+            counts[apState["state"]] = counts.get(apState["state"], 0) + 1
+            lastUpdate = max(lastUpdate, apState["updated"])
+
+        finished = counts["succeeded"] + counts["failed"] + counts["aborted"]
+
+        if finished == meta["total"]:
+            state = "aborted" if counts["aborted"] else "finished"
+            elapsed = lastUpdate - meta["created"]
+        else:
+            state = "started" if counts["queued"] < meta["total"] else "queued"
+            elapsed = time.time() - meta["created"]
+
+        return dict(state=state, counts=counts, elapsed=round(elapsed, 3), throughput=round(finished / elapsed, 3) if elapsed > 0 else 0.0)
+
+    def cancel(self, groupJobId):
+        '''
+        Cancel every rq job of a group job. Access points whose job
+        never started are marked aborted; running ones stop at their
+        next cancellation check. Returns False if the group job
+        doesn't exist.
+        '''
+        with self.redis().pipeline() as pipe:
+            pipe.get(self.key(groupJobId, "meta"))
+            pipe.hgetall(self.key(groupJobId, "aps"))
+            pipe.hgetall(self.key(groupJobId, "jobs"))
+            meta, aps, jobs = pipe.execute()
+
+        if meta is None:
+            return False
+
+        self.annotate(groupJobId, cancelled=True)
+
+        jobIds = {jobId.decode('utf-8') for jobId in jobs.values()}
+        outcomes = RqJob().cancel(list(jobIds))
+
+        for apId, apState in aps.items():
+            apJobId = jobs.get(apId)
+            if json.loads(apState)["state"] == "queued" and apJobId is not None and outcomes.get(apJobId.decode('utf-8')) == "canceled":
+                self.update(groupJobId, int(apId), "aborted", detail="Cancelled")
+
+        return True
+
+    def shareable(self, groupJobId, freshness):
+        '''
+        Return groupJobId if the group job can stand in for a new,
+        identical one (still queued, or finished without failures
+        less than freshness seconds ago), otherwise None.
+        '''
+        groupStatus = self.status(groupJobId)
+        if groupStatus is None or groupStatus.get("cancelled"):
+            return None
+
+        if groupStatus["state"] == "queued":
+            return groupJobId
+
+        finishedAt = groupStatus["created"] + groupStatus["elapsed"]
+        if groupStatus["counts"]["succeeded"] == groupStatus["total"] and time.time() - finishedAt < freshness:
+            return groupJobId
+
+        return None
+
+    def claimStream(self):
+        '''
+        Claim one of the sseMaxStreams event streams this process
+        may serve at once. Returns False when every one is taken.
+        '''
+        global sseStreams
+
+        with sseStreamsLock:
+            if sseStreams >= self.tunings['sseMaxStreams']:
+                return False
+            sseStreams += 1
+            return True
+
+    def releaseStream(self):
+        '''
+        Give back an event stream claimed with claimStream().
+        '''
+        global sseStreams
+
+        with sseStreamsLock:
+            sseStreams -= 1
+
+    def events(self, groupJobId):
+        '''
+        Generator of Server-Sent Events for a group job: a "status"
+        event with the current progress, a "progress" event for every
+        access point transition (with running counts and throughput),
+        and a final "finished" (or "timeout", after sseTimeout seconds)
+        event. Comment lines are sent every
+        sseKeepalive seconds to keep the connection open. Streams are
+        kept short; after "timeout" the client reconnects and starts
+        over from a fresh "status" event.
+        '''
+        pubsub = self.redis().pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.key(groupJobId, "events"))
+
+        try:
+            # Subscribe before the snapshot so no transition is missed
+            groupStatus = self.status(groupJobId)
+            if groupStatus is None:
+                return
+
+            apStates = {apState["ap_id"]: apState for apState in groupStatus.pop("access_points")}
+            yield serverSentEvent("status", groupStatus)
+
+            deadline = time.time() + self.tunings['sseTimeout']
+
+            while groupStatus["state"] not in ("finished", "aborted") and time.time() < deadline:
+                message = pubsub.get_message(timeout=self.tunings['sseKeepalive'])
+                if message is None:
+                    yield ": keepalive\n\n"
+                    continue
+
+                apState = json.loads(message["data"])
+                previous = apStates.get(apState["ap_id"])
+                if previous is not None and previous["updated"] > apState["updated"]:
+                    continue
+
+                apStates[apState["ap_id"]] = apState
+                groupStatus.update(self.summarize(groupStatus, apStates.values()))
+                yield serverSentEvent("progress", dict(apState, counts=groupStatus["counts"], throughput=groupStatus["throughput"]))
+
+            yield serverSentEvent("finished" if groupStatus["state"] in ("finished", "aborted") else "timeout", groupStatus)
+        finally:
+            pubsub.close()
+
+    def status(self, groupJobId):
+        '''
+        Return progress for a group job as a dict() object,
+        or None if the group job doesn't exist (or has expired).
+        '''
+        with self.redis().pipeline() as pipe:
+            pipe.get(self.key(groupJobId, "meta"))
+            pipe.hgetall(self.key(groupJobId, "aps"))
+            pipe.hgetall(self.key(groupJobId, "jobs"))
+            pipe.hgetall(self.key(groupJobId, "steps"))
+            meta, aps, jobs, steps = pipe.execute()
+
+        if meta is None:
+            return None
+
+        groupStatus = json.loads(meta)
+        accessPoints = []
+
+        for apId, apState in aps.items():
+            apState = json.loads(apState)
+            apState["ap_id"] = int(apId)
+            apJobId = jobs.get(apId)
+            if apJobId is not None:
+                apState["job_id"] = apJobId.decode('utf-8')
+            apSteps = steps.get(apId)
+            if apSteps is not None:
+                apState["steps"] = json.loads(apSteps)
+            accessPoints.append(apState)
+
+        accessPoints.sort(key=lambda apState: apState["ap_id"])
+
+        groupStatus.update(self.summarize(groupStatus, accessPoints))
+        groupStatus["access_points"] = accessPoints
+
+        return groupStatus
+
+def serverSentEvent(event, data):
+    '''
+    Format one Server-Sent Event.
+    '''
+    return "event: {0}\ndata: {1}\n\n".format(event, json.dumps(data, default=str))
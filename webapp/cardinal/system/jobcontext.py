@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+
+import threading
+import time
+from cardinal.system.common import CardinalEnv
+from cardinal.system.common import JobCancelled
+from cardinal.system.common import jobCancelKey
+from contextlib import contextmanager
+from rq import get_current_job
+from rq import Queue
+from rq.utils import utcnow
+
+class DeadlineExceeded(TimeoutError):
+    '''
+    Raised when work runs past the deadline of
+    the job it belongs to.
+    '''
+    pass
+
+class JobContext(CardinalEnv):
+    '''
+    Deadline and cancellation state of the rq job a thread is
+    working for. Blocking calls (e.g. SSH connects and reads) clamp
+    their timeouts with remaining() and call check() while they wait,
+    so a job never outlives its timeout and can be interrupted.
+    '''
+    def __init__(self, jobId=None, deadline=None):
+        '''
+        Default constructor for JobContext() object. deadline
+        is an absolute time.time() value, or None.
+        '''
+        super().__init__()
+        self.jobId = jobId
+        self.deadline = deadline
+        self.lastCheck = 0
+
+    def child(self, timeout):
+        '''
+        Return a JobContext() for the same job whose deadline is
+        at most timeout seconds away (e.g. a per-host timeout).
+        '''
+        deadline = time.time() + timeout
+        if self.deadline is not None:
+            deadline = min(deadline, self.deadline)
+
+        return JobContext(jobId=self.jobId, deadline=deadline)
+
+    def remaining(self, timeout):
+        '''
+        Clamp timeout (in seconds) to what is left before the
+        deadline. Raises DeadlineExceeded once the deadline passed.
+        '''
+        if self.deadline is None:
+            return timeout
+
+        left = self.deadline - time.time()
+        if left <= 0:
+            raise DeadlineExceeded("Deadline exceeded{}".format(" for job {}".format(self.jobId) if self.jobId is not None else ""))
+
+        return min(timeout, left) if timeout is not None else left
+
+    def cancelled(self):
+        '''
+        Check whether cancellation was requested for this job.
+        '''
+        return self.jobId is not None and bool(self.redis().exists(jobCancelKey(self.jobId)))
+
+    def check(self):
+        '''
+        Raise DeadlineExceeded or JobCancelled if the job should stop.
+        Redis is asked at most once every jobCancelPoll seconds.
+        '''
+        self.remaining(None)
+
+        now = time.time()
+        if now - self.lastCheck >= self.tunings['jobCancelPoll']:
+            self.lastCheck = now
+            if self.cancelled():
+                raise JobCancelled("Job {} was cancelled".format(self.jobId))
+
+    def call(self, func, **kwargs):
+        '''
+        Make a blocking call that takes no timeout of its own (e.g.
+        scout) within the job. The call runs on a separate thread while
+        this thread waits no longer than the deadline, checking for
+        cancellation every jobCancelPoll seconds. A call still running
+        by then is abandoned with DeadlineExceeded or JobCancelled.
+        Outside of a job, func is simply called.
+        '''
+        self.check()
+        if self.jobId is None and self.deadline is None:
+            return func(**kwargs)
+
+        outcome = dict()
+
+        def target():
+            try:
+                with jobContext(self):
+                    outcome["result"] = func(**kwargs)
+            except BaseException as e:
+                outcome["error"] = e
+
+        thread = threading.Thread(target=target, name="cardinal-call-{}".format(self.jobId), daemon=True)
+        thread.start()
+
+        while True:
+            thread.join(self.remaining(max(self.tunings['jobCancelPoll'], 0.05)))
+            if not thread.is_alive():
+                break
+            self.check()
+
+        if "error" in outcome:
+            raise outcome["error"]
+
+        return outcome.get("result")
+
+# Per-thread JobContext() stack. See jobContext().
+jobContextLocal = threading.local()
+
+def currentJobContext():
+    '''
+    Return the JobContext() of the calling thread. Outside of an
+    explicit jobContext() block, the context is derived from the rq
+    job the thread is running (its deadline being started_at plus the
+    job timeout), or is an unbounded context outside of rq.
+    '''
+    context = getattr(jobContextLocal, "context", None)
+    if context is not None:
+        return context
+
+    job = get_current_job()
+    if job is None:
+        return JobContext()
+
+    cached = getattr(jobContextLocal, "jobContext", None)
+    if cached is None or cached.jobId != job.id:
+        timeout = job.timeout if job.timeout is not None else Queue.DEFAULT_TIMEOUT
+        elapsed = (utcnow() - job.started_at).total_seconds() if job.started_at is not None else 0
+        # A timeout of -1 means the job may run forever
+        cached = JobContext(jobId=job.id, deadline=time.time() + timeout - elapsed if timeout > 0 else None)
+        jobContextLocal.jobContext = cached
+
+    return cached
+
+@contextmanager
+def jobContext(context):
+    '''
+    Run a block of work (e.g. on a pool thread) under
+    context, restoring the previous context afterwards.
+    '''
+    previous = getattr(jobContextLocal, "context", None)
+    jobContextLocal.context = context
+    try:
+        yield context
+    finally:
+        jobContextLocal.context = previous
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+
+import time
+from cardinal.system.common import CardinalEnv
+from cryptography.fernet import Fernet
+from cryptography.fernet import InvalidToken
+
+# Encrypted columns in the Cardinal backend, as (table, primary key, columns)
+encryptedColumns = (
+    ("access_points", "ap_id", ("ap_ssh_password", "ap_enable_password", "ap_snmp")),
+    ("ssids_24ghz", "ap_ssid_id", ("ap_ssid_wpa2",)),
+    ("ssids_5ghz", "ap_ssid_id", ("ap_ssid_wpa2",)),
+    ("ssids_24ghz_radius", "ap_ssid_id", ("ap_ssid_radius_secret",)),
+    ("ssids_5ghz_radius", "ap_ssid_id", ("ap_ssid_radius_secret",)),
+)
+
+class SecretRotation(CardinalEnv):
+    '''
+    Object that re-encrypts every secret stored by Cardinal
+    with the current encryptKey. Retired keys must be listed in
+    encryptKeyPrevious until the rotation has completed.
+    '''
+    def __init__(self):
+        '''
+        Default constructor for SecretRotation() object.
+        '''
+        super().__init__()
+
+    def current(self, token):
+        '''
+        Check whether a token is already encrypted with
+        the current encryptKey.
+        '''
+        try:
+            self.primaryKey.decrypt(bytes(token, 'utf-8'))
+        except InvalidToken:
+            return False
+        else:
+            return True
+
+    def rotateChunk(self, conn, table, primaryKey, columns, lastId, chunkSize):
+        '''
+        Re-encrypt one chunk of rows in a single transaction.
+        Returns the last primary key seen (None when the table
+        is exhausted) and the number of rows rewritten.
+        '''
+        cipherSuite = self.cipherSuite()
+
+        conn.begin()
+        try:
+            rotateCursor = conn.cursor()
+            rotateCursor.execute("SELECT {0}, {1} FROM {2} WHERE {0} > %s ORDER BY {0} LIMIT %s FOR UPDATE".format(primaryKey, ", ".join(columns), table), \
+                (lastId, chunkSize))
+            rows = rotateCursor.fetchall()
+
+            updates = []
+            for row in rows:
+                values = []
+                changed = False
+                for token in row[1:]:
+                    if token and not self.current(token):
+                        token = cipherSuite.rotate(bytes(token, 'utf-8')).decode('utf-8')
+                        changed = True
+                    values.append(token)
+                if changed:
+                    updates.append(tuple(values) + (row[0],))
+
+            if updates:
+                rotateCursor.executemany("UPDATE {0} SET {1} WHERE {2} = %s".format(table, ", ".join("{} = %s".format(column) for column in columns), primaryKey), updates)
+
+            rotateCursor.close()
+        except Exception:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+
+        if len(rows) < chunkSize:
+            return None, len(updates)
+
+        return rows[-1][0], len(updates)
+
+    def run(self, chunkSize=None):
+        '''
+        Walk every encrypted column in primary key order and
+        rotate tokens chunk by chunk. Returns a dict() with the number
+        of rows rewritten per table.
+        '''
+        if chunkSize is None:
+            chunkSize = self.tunings['encryptChunkSize']
+
+        self.primaryKey = Fernet(bytes(self.tunings['encryptKey'], 'utf-8'))
+
+        conn = self.sql()
+        startTime = time.time()
+        rotated = dict()
+
+        try:
+            for table, primaryKey, columns in encryptedColumns:
+                rotated[table] = 0
+                lastId = 0
+                while lastId is not None:
+                    lastId, count = self.rotateChunk(conn, table, primaryKey, columns, lastId, int(chunkSize))
+                    rotated[table] += count
+        except Exception as e:
+            return "ERROR: {}".format(e)
+        finally:
+            self.releaseSql()
+
+        return dict(rotated=rotated, duration=time.time() - startTime)
+
+def reencryptSecrets(chunkSize=None):
+    '''
+    Function that re-encrypts every stored secret with
+    the current encryptKey (runs as an rq job).
+    '''
+    return SecretRotation().run(chunkSize=chunkSize)
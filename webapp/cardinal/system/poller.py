@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+
+import json
+import random
+import time
+from cardinal.system.common import AsyncOpsManager
+from cardinal.system.common import CardinalEnv
+from cardinal.system.executor import scoutEngine
+from cardinal.system.scheduler import SiteScheduler
+
+# Source of poll order and scheduling jitter
+pollRandom = random.SystemRandom()
+
+class TelemetryPoller(CardinalEnv):
+    '''
+    Fleet-wide telemetry poller. Every tick() seconds a background
+    rq job runs fetchInfo() against every access point that is due,
+    with at most pollConcurrency polls in flight. Polls start in random
+    order, paced evenly over pollSpread (a ratio) of the tick, so
+    load on the fleet stays flat instead of spiking every cycle.
+
+    With pollAdaptive off, every access point is due every pollInterval
+    seconds. With pollAdaptive on, every access point has its own polling
+    interval between pollIntervalMin and pollIntervalMax: halved when
+    its client count or bandwidth moved by pollVolatility (a ratio)
+    or more since the last poll, and stretched by a quarter when it
+    didn't. Either way, access points polled (e.g. on demand) within
+    pollFreshness seconds are skipped. At most pollBudget polls run per
+    minute; the most overdue access points go first and the rest wait
+    for the next tick.
+    '''
+    def __init__(self):
+        '''
+        Default constructor for TelemetryPoller() object.
+        '''
+        super().__init__()
+        self.lastCheck = 0
+
+    def key(self, suffix):
+        '''
+        Redis key for a poller element.
+        '''
+        return "cardinal:telemetry:{}".format(suffix)
+
+    def enabled(self):
+        '''
+        The poller is off when pollInterval is 0.
+        '''
+        return self.tunings['pollInterval'] > 0
+
+    def adaptive(self):
+        '''
+        True when every access point is polled at its own,
+        volatility-driven interval (pollAdaptive tuning).
+        '''
+        return self.tunings['pollAdaptive'] == "on"
+
+    def tick(self):
+        '''
+        Seconds between poll cycles. Adaptive polling needs a
+        cycle at least as often as the shortest interval.
+        '''
+        return self.tunings['pollIntervalMin'] if self.adaptive() else self.tunings['pollInterval']
+
+    def horizon(self):
+        '''
+        Longest interval an access point may go unpolled.
+        '''
+        return self.tunings['pollIntervalMax'] if self.adaptive() else self.tunings['pollInterval']
+
+    def markPolled(self, apId, apInfo=None):
+        '''
+        Record that an access point was just polled successfully
+        (by the poller or on demand) and, given its fetchInfo()
+        output, adapt its polling interval.
+        '''
+        self.redis().zadd(self.key("polled"), {apId: time.time()})
+
+        if apInfo is not None and self.adaptive():
+            self.adapt(apId, apInfo)
+
+    def adapt(self, apId, apInfo):
+        '''
+        Shorten an access point's polling interval if its client count
+        or bandwidth changed by pollVolatility or more since the last
+        poll, otherwise lengthen it. Returns the new interval.
+        '''
+        try:
+            clients = int(apInfo[6] or 0)
+            bandwidth = int(str(apInfo[1]).strip("Mbps") or 0)
+        except (TypeError, ValueError, IndexError):
+            return None
+
+        stateKey = self.key("ap:{}".format(apId))
+        previousClients, previousBandwidth, interval = self.redis().hmget(stateKey, "clients", "bandwidth", "interval")
+        interval = float(interval) if interval is not None else float(self.tunings['pollInterval'])
+
+        if previousClients is not None:
+            # Small client counts are noisy, so measure change against at least 10
+            change = max(abs(clients - int(previousClients)) / max(int(previousClients), 10), \
+                abs(bandwidth - int(previousBandwidth)) / max(int(previousBandwidth), 1))
+            interval = interval / 2 if change >= self.tunings['pollVolatility'] else interval * 1.25
+
+        interval = min(max(interval, self.tunings['pollIntervalMin']), self.tunings['pollIntervalMax'])
+
+        with self.redis().pipeline() as pipe:
+            pipe.hset(stateKey, mapping=dict(clients=clients, bandwidth=bandwidth, interval=interval))
+            pipe.expire(stateKey, self.tunings['pollIntervalMax'] * 4)
+            pipe.execute()
+
+        return interval
+
+    def intervals(self, apIds):
+        '''
+        Return the polling interval of every access point
+        in apIds as a dict() object of apId -> seconds.
+        '''
+        if not self.adaptive():
+            return {apId: self.tunings['pollInterval'] for apId in apIds}
+
+        with self.redis().pipeline() as pipe:
+            for apId in apIds:
+                pipe.hget(self.key("ap:{}".format(apId)), "interval")
+            results = pipe.execute()
+
+        return {apId: min(max(float(interval) if interval is not None else self.tunings['pollInterval'], self.tunings['pollIntervalMin']), \
+            self.tunings['pollIntervalMax']) for apId, interval in zip(apIds, results)}
+
+    def fleet(self):
+        '''
+        Return the id of every access point.
+        '''
+        conn = self.sql()
+
+        try:
+            fleetCursor = conn.cursor()
+            fleetCursor.execute("SELECT ap_id FROM access_points")
+            apIds = [i[0] for i in fleetCursor.fetchall()]
+            fleetCursor.close()
+        except Exception as e:
+            return "ERROR: {}".format(e)
+        else:
+            return apIds
+
+    def ensureScheduled(self):
+        '''
+        Start the poll cycle chain unless it's already running.
+        Safe to call from every process (and often); Redis is only
+        asked once a minute and only one chain ever exists.
+        '''
+        now = time.time()
+        if not self.enabled() or now - self.lastCheck < 60:
+            return
+
+        self.lastCheck = now
+        if self.redis().set(self.key("scheduled"), 1, nx=True, ex=self.tick() * 3):
+            self.schedule(pollRandom.uniform(0, min(self.tick(), 60)))
+
+    def schedule(self, delay):
+        '''
+        Schedule a poll cycle delay seconds from now and make it
+        the current link of the chain (see current()).
+        '''
+        interval = self.tick()
+        asyncResult = AsyncOpsManager().runIn(func="cardinal.system.accesspoints.runTelemetryCycle", args=dict(), delay=max(delay, 1), \
+            timeout=max(interval * 2, self.tunings['jobTimeout']), priority="telemetry")
+        self.redis().set(self.key("scheduled"), asyncResult.id, ex=interval * 3)
+
+        return asyncResult
+
+    def current(self, jobId):
+        '''
+        Check whether the poll cycle job jobId is the current link
+        of the chain. Retries of a cycle (e.g. one killed at its
+        timeout) and leftovers of an expired chain are not.
+        '''
+        scheduled = self.redis().get(self.key("scheduled"))
+        return scheduled is not None and scheduled.decode('utf-8') == jobId
+
+    def scheduleNext(self):
+        '''
+        Schedule the next poll cycle one tick from now, give or
+        take pollJitter seconds. Called before a cycle polls anything,
+        so the chain survives a cycle that is killed at its timeout.
+        '''
+        return self.schedule(self.tick() + pollRandom.uniform(-1, 1) * self.tunings['pollJitter'])
+
+    def coverage(self, total):
+        '''
+        Ratio of access points polled successfully within
+        the last two (longest) poll intervals.
+        '''
+        if not total:
+            return 1.0
+
+        covered = self.redis().zcount(self.key("polled"), time.time() - self.horizon() * 2, "+inf")
+        return round(min(covered / total, 1.0), 3)
+
+    def cycle(self, poll, batch=None):
+        '''
+        Run one poll cycle, calling poll(apId) for every access point
+        that is due. If given, batch(apIds) first polls every due access
+        point at once and returns the ones it covered (e.g. over SNMP);
+        poll() is then only called for the rest. Returns the cycle's
+        statistics as a dict() object, or None if another cycle is
+        still running.
+        '''
+        interval = self.tick()
+        if not self.redis().set(self.key("lock"), 1, nx=True, ex=max(interval * 2, self.tunings['jobTimeout'])):
+            return None
+
+        try:
+            startTime = time.time()
+            apIds = self.fleet()
+            if isinstance(apIds, str):
+                raise RuntimeError(apIds)
+
+            lastPolled = {int(apId): score for apId, score in self.redis().zrange(self.key("polled"), 0, -1, withscores=True)}
+            apIntervals = self.intervals(apIds)
+
+            # Due if it would come due before the next tick, unless polled very recently
+            freshness = self.tunings['pollFreshness']
+            due = [apId for apId in apIds if lastPolled.get(apId, 0) <= startTime - freshness \
+                and lastPolled.get(apId, 0) + apIntervals[apId] <= startTime + interval]
+
+            # Keep within pollBudget polls per minute, most overdue first
+            budget = int(self.tunings['pollBudget'] * interval / 60) if self.tunings['pollBudget'] > 0 else len(due)
+            due.sort(key=lambda apId: (startTime - lastPolled.get(apId, 0)) / apIntervals[apId], reverse=True)
+            deferred = due[budget:]
+            due = due[:budget]
+            pollRandom.shuffle(due)
+
+            batched = batch(due) if batch is not None and due else dict()
+            remaining = [apId for apId in due if apId not in batched]
+
+            # Pace poll starts evenly over the spread window, pollConcurrency at a time
+            spread = interval * self.tunings['pollSpread']
+            scheduler = SiteScheduler(concurrency=self.tunings['pollConcurrency'], rate=len(remaining) / spread if spread > 0 and remaining else 0, burst=1, engine=scoutEngine)
+            entries = [(index, (apId,), 1, "fleet") for index, apId in enumerate(remaining)]
+
+            succeeded = len(batched)
+            failed = 0
+            for index, args, result, error in scheduler.stream(poll, entries, window=self.tunings['pollConcurrency']):
+                if error is None and not (isinstance(result, str) and result.startswith("ERROR")):
+                    succeeded += 1
+                else:
+                    failed += 1
+
+            finishTime = time.time()
+            cycleStats = dict(started=startTime, finished=finishTime, duration=round(finishTime - startTime, 3), total=len(apIds), \
+                due=len(due), skipped=len(apIds) - len(due) - len(deferred), deferred=len(deferred), batched=len(batched), succeeded=succeeded, \
+                failed=failed, coverage=self.coverage(len(apIds)), interval_avg=round(sum(apIntervals.values()) / len(apIntervals), 1) if apIntervals else None)
+            self.redis().set(self.key("cycle"), json.dumps(cycleStats))
+
+            # Forget access points that no longer exist
+            self.redis().zremrangebyscore(self.key("polled"), "-inf", startTime - self.horizon() * 10)
+        finally:
+            self.redis().delete(self.key("lock"))
+
+        return cycleStats
+
+    def status(self):
+        '''
+        Return the statistics of the last poll cycle and the
+        current coverage as a dict() object.
+        '''
+        with self.redis().pipeline() as pipe:
+            pipe.get(self.key("cycle"))
+            pipe.zcard(self.key("polled"))
+            pipe.exists(self.key("lock"))
+            lastCycle, tracked, running = pipe.execute()
+
+        lastCycle = json.loads(lastCycle) if lastCycle is not None else None
+        total = lastCycle["total"] if lastCycle is not None else tracked
+
+        return dict(enabled=self.enabled(), adaptive=self.adaptive(), interval=self.tick(), running=bool(running), \
+            coverage=self.coverage(total), last_cycle=lastCycle)
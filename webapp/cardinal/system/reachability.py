@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+
+import asyncio
+import time
+from cardinal.system.settings import cardinalSettings
+
+class ReachabilityCheck():
+    '''
+    Pre-flight TCP reachability check for a group fan-out. Opens
+    non-blocking connections to every access point's SSH port from a
+    single event loop (up to precheckConcurrency at once, each bounded
+    by precheckTimeout), so unreachable access points are known in
+    seconds rather than after a full SSH connect timeout each.
+    '''
+    def __init__(self, timeout=None, concurrency=None):
+        '''
+        Default constructor for ReachabilityCheck() object.
+        '''
+        tunings = cardinalSettings.snapshot()
+        self.timeout = timeout if timeout is not None else tunings['precheckTimeout']
+        self.concurrency = concurrency if concurrency is not None else tunings['precheckConcurrency']
+
+    async def probe(self, semaphore, ip, port):
+        '''
+        Coroutine that opens (and closes) one TCP connection.
+        Returns None if the port answered, otherwise the reason.
+        '''
+        async with semaphore:
+            try:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, int(port or 22)), self.timeout)
+            except asyncio.TimeoutError:
+                return "TCP port {0} on {1} did not answer within {2} seconds".format(port or 22, ip, self.timeout)
+            except OSError as e:
+                return "TCP port {0} on {1} is unreachable: {2}".format(port or 22, ip, e.strerror or e)
+
+            writer.close()
+            return None
+
+    async def gather(self, targets):
+        '''
+        Coroutine that probes every (ip, port) in targets and
+        returns the results in the same order.
+        '''
+        semaphore = asyncio.Semaphore(self.concurrency)
+        return await asyncio.gather(*[self.probe(semaphore, ip, port) for ip, port in targets])
+
+    def run(self, targets):
+        '''
+        Probe targets, a dict() object of apId -> (ip, port). Returns
+        a (reachable, unreachable, duration) tuple: the reachable apIds
+        in the order given, a dict() object of apId -> reason, and how
+        long the check took.
+        '''
+        startTime = time.time()
+        apIds = list(targets)
+        results = asyncio.run(self.gather([targets[apId] for apId in apIds])) if apIds else []
+
+        reachable = [apId for apId, reason in zip(apIds, results) if reason is None]
+        unreachable = {apId: reason for apId, reason in zip(apIds, results) if reason is not None}
+
+        return reachable, unreachable, time.time() - startTime
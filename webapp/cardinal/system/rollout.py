@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+
+from cardinal.system.common import JobCancelled
+from cardinal.system.executor import scoutEngine
+from cardinal.system.scheduler import SiteScheduler
+from cardinal.system.settings import cardinalSettings
+
+class Rollout():
+    '''
+    Canary/rolling rollout of a unit of work across many access
+    points. The first canary access points run on their own and must
+    all succeed. The rest run in batches of batchSize, with at most
+    maxInFlight access points in progress at once (and within the
+    per-site limits of SiteScheduler()). Once more than
+    failureThreshold (a ratio, 0-1) of completed access points have
+    failed, no further work is started and the remainder is aborted.
+    The ratio is only judged after minSample access points (or all of
+    them, if fewer) have completed.
+    '''
+    def __init__(self, canary=None, batchSize=None, maxInFlight=None, failureThreshold=None, minSample=None, engine=None):
+        '''
+        Default constructor for Rollout() object. Unset values
+        come from the rollout* tunings.
+        '''
+        tunings = cardinalSettings.snapshot()
+
+        self.canary = max(0, int(canary if canary is not None else tunings['rolloutCanary']))
+        self.batchSize = max(1, int(batchSize if batchSize is not None else tunings['rolloutBatchSize']))
+        self.maxInFlight = max(1, int(maxInFlight if maxInFlight is not None else tunings['rolloutMaxInFlight']))
+        self.failureThreshold = float(failureThreshold if failureThreshold is not None else tunings['rolloutFailureThreshold'])
+        self.minSample = max(1, int(minSample if minSample is not None else tunings['rolloutMinSample']))
+        self.engine = engine if engine is not None else scoutEngine
+
+    def policy(self):
+        '''
+        Return the rollout settings as a dict() object.
+        '''
+        return dict(canary=self.canary, batchSize=self.batchSize, maxInFlight=self.maxInFlight, failureThreshold=self.failureThreshold, \
+            minSample=self.minSample)
+
+    def batches(self, argsList):
+        '''
+        Split argsList into the canary batch followed by
+        regular batches, as lists of (index, args).
+        '''
+        indexed = list(enumerate(argsList))
+        batches = []
+
+        if self.canary:
+            batches.append(indexed[:self.canary])
+            indexed = indexed[self.canary:]
+
+        for i in range(0, len(indexed), self.batchSize):
+            batches.append(indexed[i:i + self.batchSize])
+
+        return [batch for batch in batches if batch]
+
+    def exceeded(self, failed, completed, canary, total=None):
+        '''
+        Check whether the failure budget has been spent. Any
+        failure during the canary batch aborts the rollout. Otherwise
+        the failure ratio needs at least minSample completions (capped
+        at total, the size of the rollout) before it counts.
+        '''
+        if canary:
+            return failed > 0
+
+        sample = min(self.minSample, total) if total is not None else self.minSample
+        return completed >= max(sample, 1) and failed / completed > self.failureThreshold
+
+    def run(self, func, argsList, onComplete=None, sites=None, cost=1):
+        '''
+        Run func(*args) for every entry in argsList under the rollout
+        policy. onComplete(index, args, result, error) is invoked as each
+        access point finishes. sites (parallel to argsList) and cost feed
+        the per-site limits of SiteScheduler(). Returns a dict() with the
+        outcomes in completion order and the (index, args) entries that
+        were aborted.
+        '''
+        scheduler = SiteScheduler(engine=self.engine)
+        outcomes = []
+        aborted = []
+        failed = 0
+        batches = self.batches(argsList)
+        total = sum(len(batch) for batch in batches)
+        state = dict(reason=None)
+
+        for batchNumber, batch in enumerate(batches):
+            canary = self.canary > 0 and batchNumber == 0
+
+            if state["reason"] is not None:
+                aborted += batch
+                continue
+
+            entries = [(index, args, cost, sites[index] if sites is not None else None) for index, args in batch]
+            finished = set()
+
+            # In-flight work is always drained, even after an abort
+            for outcome in scheduler.stream(func, entries, window=self.maxInFlight, stop=lambda: state["reason"] is not None):
+                outcomes.append(outcome)
+                finished.add(outcome[0])
+                if isinstance(outcome[3], JobCancelled):
+                    # Stop rolling out, without counting against the failure budget
+                    if state["reason"] is None:
+                        state["reason"] = "Cancelled"
+                elif outcome[3] is not None:
+                    failed += 1
+                if onComplete is not None:
+                    onComplete(*outcome)
+
+                if state["reason"] is None and self.exceeded(failed, len(outcomes), canary, total):
+                    state["reason"] = "{0} of {1} access points failed{2}".format(failed, len(outcomes), " during the canary batch" if canary else "")
+
+            aborted += [(index, args) for index, args in batch if index not in finished]
+
+        return dict(outcomes=outcomes, aborted=aborted, reason=state["reason"])
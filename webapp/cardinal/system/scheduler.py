@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+
+import asyncio
+import ipaddress
+import time
+from cardinal.system.executor import scoutEngine
+from cardinal.system.settings import cardinalSettings
+from collections import Counter
+from collections import OrderedDict
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import wait
+
+# Relative cost of one run of an operation against a site's token bucket.
+# Operations not listed cost 1.
+operationCosts = dict(tftpBackup=5, fetchInfo=2)
+
+def operationCost(operation, kwargs=None):
+    '''
+    Token cost of running operation once. An operation plan
+    costs the sum of its steps.
+    '''
+    if operation == "plan":
+        return sum(operationCost(step["operation"]) for step in (kwargs or dict()).get("steps", []))
+    return operationCosts.get(operation, 1)
+
+def siteOf(ip, subnetMask=None):
+    '''
+    Site key for an access point: the network it sits on, from
+    ap_ip/ap_subnetmask. A non-zero sitePrefix tuning groups access
+    points by that prefix length instead of their own mask.
+    '''
+    tunings = cardinalSettings.snapshot()
+
+    if tunings['siteGrouping'] == "off":
+        return None
+
+    try:
+        if tunings['sitePrefix'] or not subnetMask:
+            return str(ipaddress.ip_interface("{0}/{1}".format(ip, tunings['sitePrefix'] or 24)).network)
+        return str(ipaddress.ip_interface("{0}/{1}".format(ip, subnetMask)).network)
+    except ValueError:
+        return str(ip)
+
+class TokenBucket():
+    '''
+    Token bucket refilled at rate tokens per second up to burst
+    tokens. A rate of 0 disables the bucket.
+    '''
+    def __init__(self, rate, burst):
+        '''
+        Default constructor for TokenBucket() object.
+        '''
+        self.rate = float(rate)
+        self.burst = max(float(burst), 1.0)
+        self.tokens = self.burst
+        self.last = time.monotonic()
+
+    def refill(self):
+        '''
+        Add the tokens earned since the last refill.
+        '''
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+    def take(self, cost):
+        '''
+        Take cost tokens if available. Costs above the burst size
+        are capped so they can still run.
+        '''
+        if self.rate <= 0:
+            return True
+
+        self.refill()
+        cost = min(cost, self.burst)
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return True
+        return False
+
+    def delay(self, cost):
+        '''
+        Seconds until cost tokens will be available.
+        '''
+        if self.rate <= 0:
+            return 0
+
+        self.refill()
+        return max(min(cost, self.burst) - self.tokens, 0) / self.rate
+
+class SiteScheduler():
+    '''
+    Admission control for fan-out across many sites. Each site gets
+    its own concurrency limit (siteConcurrency) and token bucket
+    (siteRate tokens per second, siteBurst deep) so a thin WAN link
+    is never flooded, while work for other sites keeps running up to
+    the global parallelism of the engine.
+    '''
+    def __init__(self, concurrency=None, rate=None, burst=None, engine=None):
+        '''
+        Default constructor for SiteScheduler() object. Unset values
+        come from the site* tunings.
+        '''
+        tunings = cardinalSettings.snapshot()
+
+        self.concurrency = int(concurrency if concurrency is not None else tunings['siteConcurrency'])
+        self.rate = float(rate if rate is not None else tunings['siteRate'])
+        self.burst = float(burst if burst is not None else tunings['siteBurst'])
+        self.engine = engine if engine is not None else scoutEngine
+        self.buckets = dict()
+        self.inFlight = Counter()
+
+    def bucket(self, site):
+        '''
+        Token bucket for a site.
+        '''
+        if site not in self.buckets:
+            self.buckets[site] = TokenBucket(self.rate, self.burst)
+        return self.buckets[site]
+
+    def admit(self, site, cost):
+        '''
+        Start one unit of work for a site if its concurrency
+        limit and token bucket allow it.
+        '''
+        if site is not None:
+            if self.concurrency > 0 and self.inFlight[site] >= self.concurrency:
+                return False
+            if not self.bucket(site).take(cost):
+                return False
+
+        self.inFlight[site] += 1
+        return True
+
+    def release(self, site):
+        '''
+        Finish one unit of work for a site.
+        '''
+        self.inFlight[site] -= 1
+
+    def delay(self, queues):
+        '''
+        Seconds until the next site with queued work may start
+        on token grounds alone.
+        '''
+        delays = [self.bucket(site).delay(queue[0][2]) for site, queue in queues.items() \
+            if site is not None and (self.concurrency <= 0 or self.inFlight[site] < self.concurrency)]
+        return min(delays) if delays else None
+
+    def stream(self, func, entries, window=None, stop=None):
+        '''
+        Run func(*args) for each (index, args, cost, site) entry and
+        yield (index, args, result, error) tuples as work completes.
+        Sites are served round-robin; at most window units of work are
+        in flight overall. Once stop() returns True no new work starts,
+        and in-flight work is drained.
+        '''
+        if window is None:
+            window = self.engine.size() * 2
+
+        queues = OrderedDict()
+        for index, args, cost, site in entries:
+            queues.setdefault(site, deque()).append((index, args, cost))
+
+        pending = dict()
+
+        while True:
+            stopped = stop is not None and stop()
+
+            admitted = True
+            while not stopped and admitted and len(pending) < window:
+                admitted = False
+                for site in list(queues):
+                    if len(pending) >= window:
+                        break
+                    index, args, cost = queues[site][0]
+                    if not self.admit(site, cost):
+                        continue
+                    queues[site].popleft()
+                    if not queues[site]:
+                        del queues[site]
+                    else:
+                        # Next pass starts with the site after this one
+                        queues.move_to_end(site)
+                    pending[self.engine.submit(func, *args)] = (index, args, site)
+                    admitted = True
+
+            if not pending:
+                if stopped or not queues:
+                    return
+                # Every site with queued work is waiting on its bucket
+                time.sleep(self.delay(queues) or 0.05)
+                continue
+
+            timeout = None if stopped or not queues or len(pending) >= window else self.delay(queues)
+            done, notDone = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, args, site = pending.pop(future)
+                self.release(site)
+                error = future.exception()
+                if error is None:
+                    yield index, args, future.result(), None
+                else:
+                    yield index, args, None, error
+
+    async def acquire(self, site, cost):
+        '''
+        Coroutine that waits until a site may start one unit
+        of work (for AsyncBackend()).
+        '''
+        while not self.admit(site, cost):
+            await asyncio.sleep(self.bucket(site).delay(cost) or 0.05)
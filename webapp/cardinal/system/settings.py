@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+
+import os
+import signal
+import threading
+import time
+from configparser import ConfigParser
+from types import MappingProxyType
+
+# Tunings understood by Cardinal, as (name, type, default). If a value is
+# not defined in CARDINALCONFIG (or overridden through the environment),
+# the default is used.
+cardinalTunings = (
+    ("dbServer", str, "127.0.0.1"),
+    ("dbUsername", str, "root"),
+    ("dbPassword", str, ""),
+    ("dbName", str, "cardinal"),
+    ("dbPort", int, 3306),
+    ("flaskKey", str, "1eb88eb6c196cbbe488dfb3a128bc8230263aad7f32ec050da35d037cc1727c2"),
+    ("encryptKey", str, "rFLoNiCTwoOa6o8QOXBy-9WK2-IdSTT8HKiiIzQFHVVZ="),
+    ("encryptKeyPrevious", str, ""),
+    ("encryptChunkSize", int, 500),
+    ("scoutWorkers", int, 16),
+    ("groupBackend", str, "rq"),
+    ("asyncConcurrency", int, 256),
+    ("asyncHostTimeout", int, 120),
+    ("sshSessionReuse", str, "on"),
+    ("sshTimeout", int, 30),
+    ("sshKeepalive", int, 30),
+    ("sshIdleTimeout", int, 300),
+    ("sshMaxSessions", int, 64),
+    ("sshKeyPolicy", str, "WarningPolicy"),
+    ("breakerThreshold", int, 3),
+    ("breakerCooldown", int, 300),
+    ("groupPrecheck", str, "on"),
+    ("precheckTimeout", float, 2.0),
+    ("precheckConcurrency", int, 500),
+    ("pollInterval", int, 300),
+    ("pollConcurrency", int, 16),
+    ("pollSpread", float, 0.8),
+    ("pollFreshness", int, 60),
+    ("pollJitter", int, 15),
+    ("pollAdaptive", str, "on"),
+    ("pollIntervalMin", int, 60),
+    ("pollIntervalMax", int, 1800),
+    ("pollVolatility", float, 0.2),
+    ("pollBudget", int, 600),
+    ("telemetrySource", str, "snmp"),
+    ("snmpPort", int, 161),
+    ("snmpTimeout", float, 1.0),
+    ("snmpRetries", int, 1),
+    ("snmpConcurrency", int, 500),
+    ("snmpMaxRepetitions", int, 25),
+    ("telemetryBatch", int, 200),
+    ("telemetryFlushInterval", int, 10),
+    ("telemetryRetentionRaw", int, 2),
+    ("telemetryRetention5m", int, 14),
+    ("telemetryRetention1h", int, 90),
+    ("telemetryRetention1d", int, 730),
+    ("apInfoBatch", int, 200),
+    ("apInfoFlushInterval", int, 5),
+    ("apInfoTelemetryInterval", int, 300),
+    ("apInfoSnapshotTtl", int, 86400),
+    ("writeMemoryDebounce", int, 30),
+    ("writeMemoryTimeout", int, 120),
+    ("rolloutCanary", int, 1),
+    ("rolloutBatchSize", int, 25),
+    ("rolloutMaxInFlight", int, 10),
+    ("rolloutFailureThreshold", float, 0.2),
+    ("rolloutMinSample", int, 5),
+    ("siteGrouping", str, "subnet"),
+    ("sitePrefix", int, 0),
+    ("siteConcurrency", int, 8),
+    ("siteRate", float, 0.0),
+    ("siteBurst", float, 10.0),
+    ("sessionTimeout", int, 1000),
+    ("sseTimeout", int, 60),
+    ("sseKeepalive", int, 15),
+    ("sseMaxStreams", int, 4),
+    ("redisServer", str, "localhost"),
+    ("redisPort", int, 6379),
+    ("jobRetry", int, 3),
+    ("groupJobTtl", int, 86400),
+    ("jobWaitMax", int, 60),
+    ("jobPollInterval", float, 0.5),
+    ("jobLookupLimit", int, 500),
+    ("jobResultBatch", int, 50),
+    ("jobResultFlushInterval", int, 5),
+    ("jobKeyTtl", int, 3600),
+    ("jobTimeout", int, 180),
+    ("jobCancelPoll", float, 1.0),
+    ("fetchInfoFreshness", int, 30),
+    ("dbPoolSize", int, 10),
+    ("dbPoolTimeout", int, 30),
+    ("dbPoolRecycle", int, 3600),
+    ("dbPoolPingInterval", int, 30),
+    ("dbConnectTimeout", int, 10),
+    ("configCheckInterval", int, 5),
+)
+
+class CardinalSettings():
+    '''
+    Process-wide, immutable snapshot of Cardinal tunings. The INI
+    file at CARDINALCONFIG is parsed once per process and the snapshot
+    is swapped atomically on SIGHUP or when the file's mtime changes.
+
+    Any tuning may be overridden with an environment variable named
+    CARDINAL_<TUNING> (e.g. CARDINAL_DBSERVER=mariadb).
+    '''
+    def __init__(self):
+        '''
+        Default constructor for CardinalSettings() object.
+        '''
+        self.lock = threading.Lock()
+        self.current = None
+        self.mtime = None
+        self.lastCheck = 0
+        self.reloadRequested = False
+        self.previousHandler = None
+
+    def path(self):
+        '''
+        Location of the Cardinal configuration file.
+        '''
+        return os.environ.get('CARDINALCONFIG', "/opt/cardinal.ini")
+
+    def fileMtime(self):
+        '''
+        Return the mtime of CARDINALCONFIG, or None
+        if it doesn't exist.
+        '''
+        try:
+            return os.stat(self.path()).st_mtime
+        except OSError:
+            return None
+
+    def parse(self):
+        '''
+        Build a new tunings dict() from CARDINALCONFIG
+        and the environment.
+        '''
+        cardinalConfig = ConfigParser()
+        cardinalConfig.read(self.path())
+
+        tunings = dict()
+
+        for name, cast, default in cardinalTunings:
+            envName = "CARDINAL_{}".format(name.upper())
+            if envName in os.environ:
+                tunings[name] = cast(os.environ[envName])
+            elif cardinalConfig.has_option('cardinal', name):
+                tunings[name] = cast(cardinalConfig.get('cardinal', name))
+            else:
+                tunings[name] = default
+
+        return tunings
+
+    def load(self):
+        '''
+        Parse configuration and atomically replace the current
+        snapshot. A broken file keeps the previous snapshot in place.
+        '''
+        mtime = self.fileMtime()
+        try:
+            tunings = self.parse()
+        except Exception:
+            if self.current is None:
+                raise
+            return self.current
+
+        self.current = MappingProxyType(tunings)
+        self.mtime = mtime
+        self.lastCheck = time.time()
+        return self.current
+
+    def handleSighup(self, signum, frame):
+        '''
+        Signal handler for SIGHUP. Only flags a reload; the reload
+        itself happens on the next call to snapshot().
+        '''
+        self.reloadRequested = True
+        if callable(self.previousHandler):
+            self.previousHandler(signum, frame)
+
+    def installSighup(self):
+        '''
+        Reload configuration on SIGHUP (e.g. in rq workers). Under uwsgi,
+        SIGHUP is the graceful reload signal, so no handler is installed
+        and changes are picked up through the mtime check instead. Handlers
+        can only be installed from the main thread, and SIGHUP is left alone
+        if it is ignored or handled outside of Python.
+        '''
+        if not hasattr(signal, "SIGHUP") or threading.current_thread() is not threading.main_thread():
+            return
+
+        try:
+            import uwsgi # noqa: F401
+            return
+        except ImportError:
+            pass
+
+        try:
+            previousHandler = signal.getsignal(signal.SIGHUP)
+            if previousHandler is None or previousHandler == signal.SIG_IGN:
+                return
+            self.previousHandler = previousHandler
+            signal.signal(signal.SIGHUP, self.handleSighup)
+        except (ValueError, OSError):
+            pass
+
+    def snapshot(self):
+        '''
+        Return the current, read-only tunings mapping.
+        '''
+        if self.current is None:
+            with self.lock:
+                if self.current is None:
+                    self.load()
+                    self.installSighup()
+            return self.current
+
+        now = time.time()
+        if self.reloadRequested or now - self.lastCheck >= self.current["configCheckInterval"]:
+            with self.lock:
+                self.lastCheck = now
+                if self.reloadRequested or self.fileMtime() != self.mtime:
+                    self.reloadRequested = False
+                    self.load()
+
+        return self.current
+
+# Shared CardinalSettings() object for this process
+cardinalSettings = CardinalSettings()
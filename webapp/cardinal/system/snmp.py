@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+
+import asyncio
+import itertools
+import random
+import socket
+import time
+from cardinal.system.settings import cardinalSettings
+
+# SNMP PDU types (RFC 3416)
+snmpGet = 0xa0
+snmpResponse = 0xa2
+snmpGetBulk = 0xa5
+
+# Scalar MIB objects read by SnmpCollector()
+snmpScalars = dict(sysDescr="1.3.6.1.2.1.1.1.0", sysUpTime="1.3.6.1.2.1.1.3.0", sysLocation="1.3.6.1.2.1.1.6.0", \
+    serial="1.3.6.1.2.1.47.1.1.1.1.11.1", model="1.3.6.1.2.1.47.1.1.1.1.13.1")
+
+# Table columns walked by SnmpCollector(): IF-MIB ifDescr, ifSpeed and
+# ifPhysAddress, and CISCO-DOT11-ASSOCIATION-MIB cDot11ActiveWirelessClients
+snmpColumns = dict(ifDescr="1.3.6.1.2.1.2.2.1.2", ifSpeed="1.3.6.1.2.1.2.2.1.5", ifPhysAddress="1.3.6.1.2.1.2.2.1.6", \
+    clients="1.3.6.1.4.1.9.9.273.1.1.2.1.1")
+
+# Source of SNMP request ids
+snmpRandom = random.SystemRandom()
+
+class SnmpError(Exception):
+    '''
+    Raised when an access point doesn't answer an
+    SNMP request or answers with an error.
+    '''
+    pass
+
+def berEncode(tag, value):
+    '''
+    Encode a BER type-length-value element.
+    '''
+    if len(value) < 0x80:
+        return bytes([tag, len(value)]) + value
+
+    length = len(value).to_bytes((len(value).bit_length() + 7) // 8, "big")
+    return bytes([tag, 0x80 | len(length)]) + length + value
+
+def berInteger(value, tag=0x02):
+    '''
+    Encode a BER INTEGER (or application integer type, e.g. TimeTicks).
+    '''
+    return berEncode(tag, value.to_bytes(value.bit_length() // 8 + 1, "big", signed=True))
+
+def berOid(oid):
+    '''
+    Encode a dotted OBJECT IDENTIFIER.
+    '''
+    parts = [int(i) for i in oid.strip(".").split(".")]
+    body = bytearray([parts[0] * 40 + parts[1]])
+
+    for part in parts[2:]:
+        chunk = [part & 0x7f]
+        part >>= 7
+        while part:
+            chunk.insert(0, 0x80 | (part & 0x7f))
+            part >>= 7
+        body.extend(chunk)
+
+    return berEncode(0x06, bytes(body))
+
+def berDecode(data, offset=0):
+    '''
+    Decode the BER element at offset. Returns a
+    (tag, value, nextOffset) tuple.
+    '''
+    tag = data[offset]
+    length = data[offset + 1]
+    offset += 2
+
+    if length & 0x80:
+        count = length & 0x7f
+        length = int.from_bytes(data[offset:offset + count], "big")
+        offset += count
+
+    if offset + length > len(data):
+        raise ValueError("Truncated BER element")
+
+    return tag, data[offset:offset + length], offset + length
+
+def berSequence(data):
+    '''
+    Decode the elements of a BER SEQUENCE as a
+    list of (tag, value) tuples.
+    '''
+    elements = []
+    offset = 0
+
+    while offset < len(data):
+        tag, value, offset = berDecode(data, offset)
+        elements.append((tag, value))
+
+    return elements
+
+def decodeOid(value):
+    '''
+    Decode a BER OBJECT IDENTIFIER to dotted form.
+    '''
+    parts = [value[0] // 40, value[0] % 40]
+    part = 0
+
+    for byte in value[1:]:
+        part = (part << 7) | (byte & 0x7f)
+        if not byte & 0x80:
+            parts.append(part)
+            part = 0
+
+    return ".".join(str(i) for i in parts)
+
+def decodeValue(tag, value):
+    '''
+    Decode a varbind value. NULL and the noSuchObject,
+    noSuchInstance and endOfMibView exceptions decode to None.
+    '''
+    if tag == 0x02:
+        return int.from_bytes(value, "big", signed=True)
+    elif tag in (0x41, 0x42, 0x43, 0x46):
+        # Counter32, Gauge32, TimeTicks and Counter64
+        return int.from_bytes(value, "big")
+    elif tag == 0x06:
+        return decodeOid(value)
+    elif tag == 0x40:
+        return ".".join(str(i) for i in value)
+    elif tag in (0x05, 0x80, 0x81, 0x82):
+        return None
+    else:
+        return bytes(value)
+
+def snmpMessage(community, pduType, requestId, varbinds, errorStatus=0, errorIndex=0):
+    '''
+    Encode an SNMPv2c message. varbinds is a list of (oid, value)
+    tuples, where value is a BER-encoded element or None (NULL).
+    For GetBulkRequest, errorStatus and errorIndex carry
+    non-repeaters and max-repetitions.
+    '''
+    varbindList = b"".join(berEncode(0x30, berOid(oid) + (value if value is not None else berEncode(0x05, b""))) for oid, value in varbinds)
+    pdu = berEncode(pduType, berInteger(requestId) + berInteger(errorStatus) + berInteger(errorIndex) + berEncode(0x30, varbindList))
+
+    return berEncode(0x30, berInteger(1) + berEncode(0x04, community.encode()) + pdu)
+
+def parseSnmpMessage(data):
+    '''
+    Decode an SNMPv2c message as a dict() object.
+    '''
+    tag, message, offset = berDecode(data)
+    version, community, (pduType, pdu) = berSequence(message)
+    requestId, errorStatus, errorIndex, varbindList = berSequence(pdu)
+
+    varbinds = []
+    for tag, varbind in berSequence(varbindList[1]):
+        (oidTag, oid), (valueTag, value) = berSequence(varbind)
+        varbinds.append((decodeOid(oid), decodeValue(valueTag, value)))
+
+    return dict(community=bytes(community[1]).decode(errors="replace"), pduType=pduType, requestId=decodeValue(*requestId), \
+        errorStatus=decodeValue(*errorStatus), errorIndex=decodeValue(*errorIndex), varbinds=varbinds)
+
+def formatMac(value):
+    '''
+    Format a raw ifPhysAddress the way IOS does (0011.2233.4455).
+    '''
+    digits = bytes(value or b"").hex()
+    return ".".join(digits[i:i + 4] for i in range(0, len(digits), 4))
+
+def formatUptime(ticks):
+    '''
+    Format sysUpTime (hundredths of a second) the way
+    "show version" does (e.g. 1 week, 2 days, 3 hours, 4 minutes).
+    '''
+    minutes = (ticks or 0) // 6000
+    units = []
+
+    for name, size in (("year", 525600), ("week", 10080), ("day", 1440), ("hour", 60), ("minute", 1)):
+        count, minutes = divmod(minutes, size)
+        if count or (name == "minute" and not units):
+            units.append("{0} {1}{2}".format(count, name, "" if count == 1 else "s"))
+
+    return ", ".join(units)
+
+class SnmpProtocol(asyncio.DatagramProtocol):
+    '''
+    UDP endpoint shared by every request of an SnmpCollector()
+    run. Responses are matched to requests by request id.
+    '''
+    def __init__(self):
+        '''
+        Default constructor for SnmpProtocol() object.
+        '''
+        self.transport = None
+        self.pending = dict()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, address):
+        try:
+            response = parseSnmpMessage(data)
+        except (IndexError, ValueError):
+            return
+
+        target, future = self.pending.get(response["requestId"], (None, None))
+        if future is not None and not future.done() and address[:2] == target and response["pduType"] == snmpResponse:
+            future.set_result(response)
+
+    def error_received(self, exc):
+        # Requests to unreachable access points simply time out
+        pass
+
+class SnmpCollector():
+    '''
+    SNMPv2c telemetry collector. Reads the same fields fetchInfo()
+    scrapes over SSH (MAC, bandwidth, IOS version, uptime, serial,
+    model, client count and location) from many access points at
+    once, using non-blocking UDP requests from a single event loop
+    (up to snmpConcurrency access points in flight).
+    '''
+    def __init__(self, timeout=None, retries=None, concurrency=None, port=None):
+        '''
+        Default constructor for SnmpCollector() object.
+        '''
+        tunings = cardinalSettings.snapshot()
+        self.timeout = timeout if timeout is not None else tunings['snmpTimeout']
+        self.retries = retries if retries is not None else tunings['snmpRetries']
+        self.concurrency = concurrency if concurrency is not None else tunings['snmpConcurrency']
+        self.port = port if port is not None else tunings['snmpPort']
+        self.maxRepetitions = tunings['snmpMaxRepetitions']
+        self.requestIds = itertools.count(snmpRandom.randint(1, 2 ** 30))
+
+    async def request(self, protocol, ip, community, pduType, oids, nonRepeaters=0, maxRepetitions=0):
+        '''
+        Coroutine that sends one request (retrying up to snmpRetries
+        times) and returns the response varbinds.
+        '''
+        target = (ip, self.port)
+
+        for attempt in range(self.retries + 1):
+            requestId = next(self.requestIds) % 2 ** 31
+            future = asyncio.get_running_loop().create_future()
+            protocol.pending[requestId] = (target, future)
+
+            try:
+                protocol.transport.sendto(snmpMessage(community, pduType, requestId, [(oid, None) for oid in oids], \
+                    nonRepeaters, maxRepetitions), target)
+                response = await asyncio.wait_for(future, self.timeout)
+            except asyncio.TimeoutError:
+                continue
+            finally:
+                protocol.pending.pop(requestId, None)
+
+            if response["errorStatus"]:
+                raise SnmpError("SNMP error status {0} from {1}".format(response["errorStatus"], ip))
+
+            return response["varbinds"]
+
+        raise SnmpError("No SNMP response from {0} after {1} attempts".format(ip, self.retries + 1))
+
+    async def walk(self, protocol, ip, community, columns):
+        '''
+        Coroutine that walks table columns with GetBulkRequest.
+        Returns a dict() object of column -> {index: value}.
+        '''
+        tables = {column: dict() for column in columns}
+        active = {column: column for column in columns}
+
+        while active:
+            order = list(active)
+            varbinds = await self.request(protocol, ip, community, snmpGetBulk, list(active.values()), 0, self.maxRepetitions)
+            if not varbinds:
+                break
+
+            # Repetitions are interleaved, one varbind per requested column
+            for position, (oid, value) in enumerate(varbinds):
+                column = order[position % len(order)]
+                if column not in active:
+                    continue
+
+                if value is None or not oid.startswith(column + ".") or oid in tables[column]:
+                    del active[column]
+                    continue
+
+                tables[column][oid[len(column) + 1:]] = value
+                active[column] = oid
+
+        return tables
+
+    async def collect(self, protocol, semaphore, ip, community):
+        '''
+        Coroutine that collects telemetry from one access point. Returns
+        the same positional list as parseFetchInfo(): [mac, bandwidth,
+        iosInfo, uptime, serial, model, clients, location].
+        '''
+        async with semaphore:
+            scalars = dict(await self.request(protocol, ip, community, snmpGet, list(snmpScalars.values())))
+            tables = await self.walk(protocol, ip, community, list(snmpColumns.values()))
+
+        def text(value):
+            return value.decode(errors="replace").strip() if isinstance(value, bytes) else ""
+
+        interfaces = tables[snmpColumns["ifDescr"]]
+        ifIndex = next((index for index, name in interfaces.items() if text(name) == "GigabitEthernet0"), None)
+        descr = text(scalars.get(snmpScalars["sysDescr"])).splitlines()
+
+        macAddr = formatMac(tables[snmpColumns["ifPhysAddress"]].get(ifIndex))
+        bandwidth = "{}Mbps".format((tables[snmpColumns["ifSpeed"]].get(ifIndex) or 0) // 1000000)
+        iosInfo = next((line.strip() for line in descr if line.startswith("Cisco IOS Software")), descr[0] if descr else "")
+        uptime = formatUptime(scalars.get(snmpScalars["sysUpTime"]))
+        serial = text(scalars.get(snmpScalars["serial"]))
+        model = text(scalars.get(snmpScalars["model"]))
+        clients = sum(i for i in tables[snmpColumns["clients"]].values() if isinstance(i, int))
+        apLocation = text(scalars.get(snmpScalars["sysLocation"]))
+
+        return [macAddr, bandwidth, iosInfo, uptime, serial, model, clients, apLocation]
+
+    async def gather(self, targets):
+        '''
+        Coroutine that collects telemetry from every (ip, community)
+        in targets and returns the results (or exceptions) in the
+        same order.
+        '''
+        transport, protocol = await asyncio.get_running_loop().create_datagram_endpoint(SnmpProtocol, family=socket.AF_INET)
+
+        try:
+            semaphore = asyncio.Semaphore(self.concurrency)
+            return await asyncio.gather(*[self.collect(protocol, semaphore, ip, community) for ip, community in targets], \
+                return_exceptions=True)
+        finally:
+            transport.close()
+
+    def run(self, targets):
+        '''
+        Collect telemetry from targets, a dict() object of apId ->
+        (ip, community). Returns a (collected, failed, duration) tuple:
+        a dict() object of apId -> telemetry list, a dict() object of
+        apId -> reason, and how long the collection took.
+        '''
+        startTime = time.time()
+        apIds = list(targets)
+        results = asyncio.run(self.gather([targets[apId] for apId in apIds])) if apIds else []
+
+        collected = {apId: result for apId, result in zip(apIds, results) if not isinstance(result, BaseException)}
+        failed = {apId: str(result) for apId, result in zip(apIds, results) if isinstance(result, BaseException)}
+
+        return collected, failed, time.time() - startTime
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+
+import MySQLdb
+import os
+import threading
+import time
+from cardinal.system.settings import cardinalSettings
+
+class SqlPoolExhausted(Exception):
+    '''
+    Raised when no MySQL connection could be checked
+    out of SqlPool() before dbPoolTimeout expired.
+    '''
+    pass
+
+class SqlPool():
+    '''
+    Bounded, process-wide pool of MySQLdb connections.
+    A single SqlPool() is shared by every CardinalEnv()
+    object living in the same uwsgi/rq process.
+    '''
+    def __init__(self, settings):
+        '''
+        Default constructor for SqlPool() object.
+        '''
+        self.settings = settings
+        self.lock = threading.Condition()
+        self.reset()
+
+    @property
+    def tunings(self):
+        '''
+        Current tunings snapshot from CardinalSettings().
+        '''
+        return self.settings.snapshot()
+
+    def reset(self):
+        '''
+        (Re)initialize pool state. Called on construction and
+        whenever we detect that we're running inside a forked
+        child (e.g. an rq work horse).
+        '''
+        # Connections inherited across fork() share their socket with the
+        # parent. Keep references to them so they are never closed (and
+        # never send COM_QUIT) from the child.
+        self.inherited = [conn for conn, lastUsed in getattr(self, "idle", [])] + list(getattr(self, "busy", set()))
+        self.pid = os.getpid()
+        self.idle = []
+        self.busy = set()
+        self.pending = 0
+        self.local = threading.local()
+        self.stats = dict(created=0, reused=0, recycled=0, discarded=0, waits=0, timeouts=0)
+
+    def connect(self):
+        '''
+        Open a new MySQLdb connection using Cardinal tunings.
+        '''
+        conn = MySQLdb.connect(host=self.tunings['dbServer'], user=self.tunings['dbUsername'], port=self.tunings['dbPort'], \
+            passwd=self.tunings['dbPassword'], db=self.tunings['dbName'], connect_timeout=self.tunings['dbConnectTimeout'])
+
+        # Every Cardinal statement is committed on its own, so run pooled
+        # connections in autocommit mode. This also keeps long-lived worker
+        # connections from reading through a stale REPEATABLE READ snapshot.
+        conn.autocommit(True)
+        return conn
+
+    def discard(self, conn):
+        '''
+        Close a connection that is no longer usable.
+        '''
+        with self.lock:
+            self.stats["discarded"] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def healthy(self, conn, lastUsed):
+        '''
+        Verify a pooled connection before handing it out.
+        Connections idle longer than dbPoolRecycle are dropped,
+        and connections idle longer than dbPoolPingInterval are pinged.
+        Called without the pool lock, as a ping is a round trip.
+        '''
+        idleTime = time.time() - lastUsed
+
+        if idleTime > self.tunings['dbPoolRecycle']:
+            with self.lock:
+                self.stats["recycled"] += 1
+            return False
+
+        if idleTime > self.tunings['dbPoolPingInterval']:
+            try:
+                conn.ping()
+            except MySQLdb.Error:
+                return False
+
+        return True
+
+    def acquire(self):
+        '''
+        Check a connection out of the pool, blocking for up
+        to dbPoolTimeout seconds if the pool is exhausted.
+        '''
+        if os.getpid() != self.pid:
+            self.reset()
+
+        deadline = time.time() + self.tunings['dbPoolTimeout']
+
+        while True:
+            conn = None
+
+            with self.lock:
+                while True:
+                    if self.idle:
+                        # Counts as busy while it's verified outside the lock
+                        conn, lastUsed = self.idle.pop()
+                        self.busy.add(conn)
+                        break
+
+                    if len(self.busy) + self.pending < self.tunings['dbPoolSize']:
+                        # Reserve a slot before releasing the lock to connect
+                        self.pending += 1
+                        break
+
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        self.stats["timeouts"] += 1
+                        raise SqlPoolExhausted("No MySQL connection available after {} seconds".format(self.tunings['dbPoolTimeout']))
+
+                    self.stats["waits"] += 1
+                    self.lock.wait(remaining)
+
+            if conn is None:
+                break
+
+            if self.healthy(conn, lastUsed):
+                with self.lock:
+                    self.stats["reused"] += 1
+                return conn
+
+            with self.lock:
+                self.busy.discard(conn)
+                self.lock.notify()
+            self.discard(conn)
+
+        try:
+            conn = self.connect()
+        except Exception:
+            with self.lock:
+                self.pending -= 1
+                self.lock.notify()
+            raise
+
+        with self.lock:
+            self.pending -= 1
+            self.busy.add(conn)
+            self.stats["created"] += 1
+
+        return conn
+
+    def release(self, conn):
+        '''
+        Return a connection to the pool. Any uncommitted work
+        is rolled back so the next borrower starts clean.
+        '''
+        if conn is None or os.getpid() != self.pid:
+            return
+
+        try:
+            conn.rollback()
+            reusable = True
+        except MySQLdb.Error:
+            reusable = False
+
+        with self.lock:
+            self.busy.discard(conn)
+            pooled = reusable and len(self.idle) < self.tunings['dbPoolSize']
+            if pooled:
+                self.idle.append((conn, time.time()))
+            self.lock.notify()
+
+        if not pooled:
+            self.discard(conn)
+
+    def threadConnection(self):
+        '''
+        Return the connection bound to the calling thread, checking
+        one out of the pool if needed. Used outside of Flask requests
+        (e.g. rq workers), where a thread runs one unit of work at a time.
+        '''
+        if os.getpid() != self.pid:
+            self.reset()
+
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.acquire()
+            self.local.conn = conn
+
+        return conn
+
+    def releaseThreadConnection(self):
+        '''
+        Return the connection bound to the calling thread (if any)
+        to the pool.
+        '''
+        conn = getattr(self.local, "conn", None)
+        if conn is not None:
+            self.local.conn = None
+            self.release(conn)
+
+    def info(self):
+        '''
+        Return pool statistics as a dict() object.
+        '''
+        with self.lock:
+            poolStats = dict(self.stats)
+            poolStats["size"] = self.tunings['dbPoolSize']
+            poolStats["busy"] = len(self.busy) + self.pending
+            poolStats["idle"] = len(self.idle)
+            poolStats["pid"] = self.pid
+
+        return poolStats
+
+# Process-wide MySQL connection pool shared by every CardinalEnv() object.
+# Connections are only opened on demand; see CardinalEnv.sql() for how
+# they are scoped.
+cardinalSqlPool = SqlPool(cardinalSettings)
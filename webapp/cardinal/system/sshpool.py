@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+
+import hashlib
+import os
+import paramiko
+import re
+import threading
+import time
+from cardinal.system.circuitbreaker import CircuitBreaker
+from cardinal.system.jobcontext import currentJobContext
+from cardinal.system.settings import cardinalSettings
+from contextlib import contextmanager
+
+# Matches an IOS exec or config prompt at the end of the buffer
+iosPrompt = re.compile(r"[\r\n]?[\w\-\.\(\)/]+[>#]\s*$")
+
+# Matches interactive questions (e.g. "Destination filename [startup-config]?")
+# that are answered by accepting the default
+confirmPrompt = re.compile(r"(\]\?|\[confirm\])\s*$")
+
+class SshCommandError(Exception):
+    '''
+    Raised when an access point rejects a command.
+    '''
+    pass
+
+class ApSession():
+    '''
+    Authenticated SSH session (interactive IOS shell) to
+    a single access point.
+    '''
+    def __init__(self, apId, ip, port, username, password, timeout, enablePassword=None):
+        '''
+        Default constructor for ApSession() object. Opens the
+        connection and leaves the shell at a privileged prompt,
+        entering enablePassword (the SSH password if None) when
+        the login lands at an unprivileged one.
+        '''
+        tunings = cardinalSettings.snapshot()
+
+        self.apId = apId
+        self.fingerprint = ApSession.fingerprintFor(ip, port, username, password)
+        self.lock = threading.Lock()
+        self.created = time.time()
+        self.lastUsed = self.created
+
+        self.client = paramiko.SSHClient()
+        self.client.set_missing_host_key_policy(getattr(paramiko, tunings['sshKeyPolicy'])())
+        self.client.connect(ip, port=int(port or 22), username=username, password=password, timeout=timeout, \
+            banner_timeout=timeout, auth_timeout=timeout, look_for_keys=False, allow_agent=False)
+        self.client.get_transport().set_keepalive(tunings['sshKeepalive'])
+
+        self.shell = self.client.invoke_shell()
+        prompt = self.read(timeout)
+
+        if prompt.rstrip().endswith(">"):
+            self.shell.send("enable\n")
+            self.read(timeout, prompts=(re.compile(r"[Pp]assword:\s*$"),))
+            self.shell.send("{}\n".format(enablePassword if enablePassword is not None else password))
+            if not self.read(timeout).rstrip().endswith("#"):
+                self.close()
+                raise paramiko.AuthenticationException("Access point {} rejected the enable password".format(apId))
+
+        self.send(["terminal length 0"], timeout)
+
+    @staticmethod
+    def fingerprintFor(ip, port, username, password):
+        '''
+        Identify the connection parameters of a session so a
+        changed IP or credential forces a new session.
+        '''
+        return hashlib.sha256("{0}|{1}|{2}|{3}".format(ip, port, username, password).encode('utf-8')).hexdigest()
+
+    def alive(self):
+        '''
+        Check whether the underlying SSH transport is
+        still usable.
+        '''
+        transport = self.client.get_transport()
+        return transport is not None and transport.is_active() and not self.shell.closed
+
+    def read(self, timeout, prompts=(iosPrompt,)):
+        '''
+        Read from the shell until one of prompts matches or
+        timeout expires (whichever of timeout and the job's
+        deadline comes first). Raises JobCancelled if the job
+        is cancelled while waiting.
+        '''
+        # Never wait past the deadline of the job we're running for
+        context = currentJobContext()
+        timeout = context.remaining(timeout)
+
+        output = ""
+        deadline = time.time() + timeout
+
+        while time.time() < deadline:
+            context.check()
+            if self.shell.recv_ready():
+                output += self.shell.recv(65535).decode('utf-8', errors='replace')
+                if any(prompt.search(output) for prompt in prompts):
+                    return output
+            elif self.shell.closed:
+                break
+            else:
+                time.sleep(0.05)
+
+        raise TimeoutError("No prompt from access point {0} after {1} seconds".format(self.apId, timeout))
+
+    def send(self, commands, timeout=None):
+        '''
+        Send IOS commands one line at a time and return the combined
+        output. Raises SshCommandError if IOS rejects a line.
+        '''
+        if timeout is None:
+            timeout = cardinalSettings.snapshot()['sshTimeout']
+
+        output = ""
+
+        for command in commands:
+            self.shell.send("{}\n".format(command))
+            commandOutput = self.read(timeout, prompts=(iosPrompt, confirmPrompt))
+            while confirmPrompt.search(commandOutput):
+                self.shell.send("\n")
+                commandOutput += self.read(timeout, prompts=(iosPrompt, confirmPrompt))
+            if "% Invalid" in commandOutput or "% Incomplete" in commandOutput or "% Ambiguous" in commandOutput:
+                raise SshCommandError("{0}: {1}".format(command, commandOutput.strip()))
+            output += commandOutput
+
+        self.lastUsed = time.time()
+        return output
+
+    def recover(self, timeout=None):
+        '''
+        Leave configuration mode after a rejected command and
+        check the shell is back at a privileged exec prompt. Returns
+        False if it isn't, so the session can be discarded.
+        '''
+        if timeout is None:
+            timeout = cardinalSettings.snapshot()['sshTimeout']
+
+        try:
+            self.shell.send("end\n")
+            output = self.read(timeout)
+        except Exception:
+            return False
+
+        # "end" is rejected at an exec prompt, so only the prompt itself is checked
+        prompt = output.strip().splitlines()[-1] if output.strip() else ""
+        return prompt.endswith("#") and "(config" not in prompt
+
+    def close(self):
+        '''
+        Close the session.
+        '''
+        try:
+            self.client.close()
+        except Exception:
+            pass
+
+class SshSessionPool():
+    '''
+    Per-process pool of authenticated SSH sessions keyed by access
+    point id. Back-to-back operations on one access point reuse the same
+    session. Idle sessions expire after sshIdleTimeout seconds and no more
+    than sshMaxSessions sessions are kept open.
+    '''
+    def __init__(self, settings):
+        '''
+        Default constructor for SshSessionPool() object.
+        '''
+        self.settings = settings
+        self.lock = threading.Lock()
+        self.reset()
+
+    @property
+    def tunings(self):
+        '''
+        Current tunings snapshot from CardinalSettings().
+        '''
+        return self.settings.snapshot()
+
+    def reset(self):
+        '''
+        (Re)initialize pool state, e.g. after fork(). Inherited
+        sessions share sockets with the parent and are left alone.
+        '''
+        self.inherited = list(getattr(self, "sessions", dict()).values())
+        self.pid = os.getpid()
+        self.sessions = dict()
+        self.stats = dict(opened=0, reused=0, expired=0, evicted=0, broken=0)
+
+    def expire(self):
+        '''
+        Close idle sessions older than sshIdleTimeout. Caller
+        must hold self.lock.
+        '''
+        now = time.time()
+        for apId, session in list(self.sessions.items()):
+            if not session.lock.locked() and now - session.lastUsed > self.tunings['sshIdleTimeout']:
+                del self.sessions[apId]
+                session.close()
+                self.stats["expired"] += 1
+
+    def evict(self):
+        '''
+        Make room for one more session by closing the least recently
+        used idle session. Caller must hold self.lock. Returns False when
+        every session is busy.
+        '''
+        idle = [session for session in self.sessions.values() if not session.lock.locked()]
+        if not idle:
+            return False
+
+        session = min(idle, key=lambda session: session.lastUsed)
+        del self.sessions[session.apId]
+        session.close()
+        self.stats["evicted"] += 1
+        return True
+
+    def connect(self, apId, ip, port, username, password, timeout, enablePassword=None):
+        '''
+        Open a new ApSession() through the access point's
+        CircuitBreaker(). Raises CircuitOpen without connecting
+        while the access point is known to be unreachable.
+        '''
+        with CircuitBreaker().guard(apId):
+            return ApSession(apId, ip, port, username, password, timeout, enablePassword=enablePassword)
+
+    def checkout(self, apId, ip, port, username, password, timeout=None, pooled=True, enablePassword=None):
+        '''
+        Return a locked ApSession() for an access point, reusing
+        a pooled session when possible. Unless pooled, a new session
+        is opened that is closed again at checkin().
+        '''
+        if timeout is None:
+            timeout = self.tunings['sshTimeout']
+
+        # Connect (and wait for a busy session) no longer than the job may still run
+        timeout = currentJobContext().remaining(timeout)
+
+        if os.getpid() != self.pid:
+            self.reset()
+
+        if not pooled:
+            session = self.connect(apId, ip, port, username, password, timeout, enablePassword=enablePassword)
+            session.pooled = False
+            session.lock.acquire()
+            self.stats["opened"] += 1
+            return session
+
+        fingerprint = ApSession.fingerprintFor(ip, port, username, password)
+
+        with self.lock:
+            self.expire()
+            session = self.sessions.get(apId)
+
+        if session is not None:
+            if not session.lock.acquire(timeout=timeout):
+                raise TimeoutError("Session to access point {} is busy".format(apId))
+            if session.fingerprint == fingerprint and session.alive():
+                self.stats["reused"] += 1
+                return session
+            # Stale session (connection dropped, or IP/credentials changed)
+            session.lock.release()
+            with self.lock:
+                if self.sessions.get(apId) is session:
+                    del self.sessions[apId]
+            session.close()
+            self.stats["broken"] += 1
+
+        session = self.connect(apId, ip, port, username, password, timeout, enablePassword=enablePassword)
+        session.lock.acquire()
+        self.stats["opened"] += 1
+
+        with self.lock:
+            if apId not in self.sessions and (len(self.sessions) < self.tunings['sshMaxSessions'] or self.evict()):
+                self.sessions[apId] = session
+            else:
+                # Pool is full of busy sessions; use this one once and close it
+                session.pooled = False
+
+        return session
+
+    def checkin(self, session, broken=False):
+        '''
+        Return a session to the pool. Broken or unpooled
+        sessions are closed.
+        '''
+        session.lastUsed = time.time()
+
+        if broken or not getattr(session, "pooled", True) or os.getpid() != self.pid:
+            with self.lock:
+                if self.sessions.get(session.apId) is session:
+                    del self.sessions[session.apId]
+            session.close()
+
+        session.lock.release()
+
+    @contextmanager
+    def session(self, apId, ip, port, username, password, timeout=None, pooled=True, enablePassword=None):
+        '''
+        Context manager around checkout()/checkin(). A session
+        that raised anything other than a rejected command is
+        discarded rather than reused. After a rejected command the
+        session is only reused once it's back at an exec prompt.
+        '''
+        session = self.checkout(apId, ip, port, username, password, timeout=timeout, pooled=pooled, enablePassword=enablePassword)
+        try:
+            yield session
+        except SshCommandError:
+            self.checkin(session, broken=not session.recover())
+            raise
+        except Exception:
+            self.checkin(session, broken=True)
+            raise
+        else:
+            self.checkin(session)
+
+    def discard(self, apId):
+        '''
+        Close the pooled session for an access point (e.g. after
+        its IP address changed).
+        '''
+        with self.lock:
+            session = self.sessions.pop(apId, None)
+
+        if session is not None:
+            with session.lock:
+                session.close()
+
+    def info(self):
+        '''
+        Return pool statistics as a dict() object.
+        '''
+        with self.lock:
+            poolStats = dict(self.stats)
+            poolStats["open"] = len(self.sessions)
+            poolStats["busy"] = len([session for session in self.sessions.values() if session.lock.locked()])
+            poolStats["max"] = self.tunings['sshMaxSessions']
+            poolStats["pid"] = self.pid
+
+        return poolStats
+
+# Process-wide SSH session pool shared by every AccessPoint() object
+cardinalSshPool = SshSessionPool(cardinalSettings)
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+
+import json
+import re
+import time
+from cardinal.system.common import AsyncOpsManager
+from cardinal.system.common import CardinalEnv
+
+# Rollup resolutions as (name, resolution in seconds, source), finest first.
+# Each resolution is aggregated from the one before it, and 5 minute
+# buckets from raw samples.
+telemetryResolutions = (("5m", 300, None), ("1h", 3600, "5m"), ("1d", 86400, "1h"))
+telemetryBuckets = {name: resolution for name, resolution, source in telemetryResolutions}
+
+# Uptime units used by "show version"
+uptimeUnits = dict(year=31536000, week=604800, day=86400, hour=3600, minute=60, second=1)
+
+def uptimeSeconds(uptime):
+    '''
+    Convert an IOS uptime (e.g. 1 week, 2 days, 3 hours, 4 minutes)
+    to seconds. Returns None if nothing could be parsed.
+    '''
+    units = re.findall(r"(\d+)\s+(year|week|day|hour|minute|second)s?", uptime or "")
+    if not units:
+        return None
+
+    return sum(int(count) * uptimeUnits[unit] for count, unit in units)
+
+class TelemetryStore(CardinalEnv):
+    '''
+    Time-series store for access point telemetry. Samples are
+    buffered in Redis and appended to ap_telemetry in batches;
+    rollup() aggregates them into 5 minute, hourly and daily
+    buckets in ap_telemetry_rollups, which charts read from.
+    Every resolution is pruned after its own retention period.
+    '''
+    def __init__(self):
+        '''
+        Default constructor for TelemetryStore() object.
+        '''
+        super().__init__()
+
+    def key(self, suffix):
+        '''
+        Redis key for a telemetry store element.
+        '''
+        return "cardinal:telemetry_store:{}".format(suffix)
+
+    def retention(self, name):
+        '''
+        Retention (in seconds) of a resolution, or of
+        raw samples if name is None.
+        '''
+        return self.tunings['telemetryRetention{}'.format(name or "Raw")] * 86400
+
+    def record(self, apId, apInfo, timestamp=None):
+        '''
+        Buffer one sample from fetchInfo() output. Samples are
+        flushed once telemetryBatch of them are buffered, or
+        telemetryFlushInterval seconds after the first one was.
+        '''
+        try:
+            sample = [int(apId), int(timestamp or time.time()), int(apInfo[6] or 0), int(str(apInfo[1]).strip("Mbps") or 0), \
+                uptimeSeconds(apInfo[3])]
+        except (TypeError, ValueError, IndexError):
+            return
+
+        with self.redis().pipeline() as pipe:
+            pipe.rpush(self.key("pending"), json.dumps(sample))
+            pipe.set(self.key("scheduled"), 1, nx=True, ex=self.tunings['telemetryFlushInterval'] * 10)
+            buffered, scheduled = pipe.execute()
+
+        if buffered >= self.tunings['telemetryBatch']:
+            self.flush()
+        elif scheduled:
+            AsyncOpsManager().runIn(func="cardinal.system.telemetry.flushTelemetry", args=dict(), delay=self.tunings['telemetryFlushInterval'])
+
+    def flush(self):
+        '''
+        Drain the sample buffer into ap_telemetry, one multi-row
+        INSERT per telemetryBatch samples. Returns the number of
+        samples written.
+        '''
+        batchSize = self.tunings['telemetryBatch']
+        written = 0
+
+        while True:
+            with self.redis().pipeline() as pipe:
+                pipe.lrange(self.key("pending"), 0, batchSize - 1)
+                pipe.ltrim(self.key("pending"), batchSize, -1)
+                entries, _ = pipe.execute()
+
+            if not entries:
+                self.redis().delete(self.key("scheduled"))
+                return written
+
+            rows = [tuple(json.loads(entry)) for entry in entries]
+            conn = self.sql()
+
+            try:
+                telemetryCursor = conn.cursor()
+                telemetryCursor.executemany("INSERT IGNORE INTO ap_telemetry (ap_id, ts, clients, bandwidth, uptime) VALUES (%s, %s, %s, %s, %s)", rows)
+                telemetryCursor.close()
+            except Exception as e:
+                # Put the batch back so the next flush can retry it
+                self.redis().lpush(self.key("pending"), *reversed(entries))
+                self.redis().delete(self.key("scheduled"))
+                return "ERROR: {}".format(e)
+            else:
+                conn.commit()
+                written += len(rows)
+
+    def rollup(self, now=None):
+        '''
+        Aggregate every complete bucket not rolled up yet, finest
+        resolution first. The last bucket of each previous run is
+        recomputed to pick up late samples. Returns the number of
+        buckets written per resolution as a dict() object.
+        '''
+        now = now or time.time()
+        sourceEnd = int(now) - self.tunings['telemetryFlushInterval'] * 2
+        rolledUp = dict()
+        conn = self.sql()
+
+        for name, resolution, source in telemetryResolutions:
+            end = sourceEnd - sourceEnd % resolution
+            watermark = self.redis().hget(self.key("rollups"), name)
+            start = max(int(watermark) - resolution if watermark is not None else end - self.retention(source), 0)
+            sourceEnd = end
+
+            if start >= end:
+                rolledUp[name] = 0
+                continue
+
+            try:
+                rollupCursor = conn.cursor()
+                if source is None:
+                    rollupCursor.execute("INSERT INTO ap_telemetry_rollups (resolution, ap_id, bucket, samples, clients_avg, clients_max, bandwidth_avg, bandwidth_max) "
+                    "SELECT %s, ap_id, ts - MOD(ts, %s) AS b, COUNT(*), AVG(clients), MAX(clients), AVG(bandwidth), MAX(bandwidth) FROM ap_telemetry "
+                    "WHERE ts >= %s AND ts < %s GROUP BY ap_id, b ON DUPLICATE KEY UPDATE samples = VALUES(samples), clients_avg = VALUES(clients_avg), "
+                    "clients_max = VALUES(clients_max), bandwidth_avg = VALUES(bandwidth_avg), bandwidth_max = VALUES(bandwidth_max)", (resolution, resolution, start, end))
+                else:
+                    rollupCursor.execute("INSERT INTO ap_telemetry_rollups (resolution, ap_id, bucket, samples, clients_avg, clients_max, bandwidth_avg, bandwidth_max) "
+                    "SELECT %s, ap_id, bucket - MOD(bucket, %s) AS b, SUM(samples), SUM(clients_avg * samples) / SUM(samples), MAX(clients_max), "
+                    "SUM(bandwidth_avg * samples) / SUM(samples), MAX(bandwidth_max) FROM ap_telemetry_rollups WHERE resolution = %s AND bucket >= %s AND bucket < %s "
+                    "GROUP BY ap_id, b ON DUPLICATE KEY UPDATE samples = VALUES(samples), clients_avg = VALUES(clients_avg), clients_max = VALUES(clients_max), "
+                    "bandwidth_avg = VALUES(bandwidth_avg), bandwidth_max = VALUES(bandwidth_max)", (resolution, resolution, telemetryBuckets[source], start, end))
+                rolledUp[name] = rollupCursor.rowcount
+                rollupCursor.close()
+            except Exception as e:
+                return "ERROR: {}".format(e)
+            else:
+                conn.commit()
+                self.redis().hset(self.key("rollups"), name, end)
+
+        return rolledUp
+
+    def prune(self, now=None):
+        '''
+        Delete raw samples and buckets older than their retention,
+        telemetryBatch rows per statement so long deletes don't hold
+        locks. Returns the number of rows deleted.
+        '''
+        now = now or time.time()
+        batchSize = self.tunings['telemetryBatch']
+        statements = [("DELETE FROM ap_telemetry WHERE ts < %s LIMIT %s", (int(now - self.retention(None)), batchSize))]
+        statements += [("DELETE FROM ap_telemetry_rollups WHERE resolution = %s AND bucket < %s LIMIT %s", (resolution, int(now - self.retention(name)), batchSize)) \
+            for name, resolution, source in telemetryResolutions]
+
+        deleted = 0
+        conn = self.sql()
+
+        try:
+            pruneCursor = conn.cursor()
+            for statement, args in statements:
+                while True:
+                    pruneCursor.execute(statement, args)
+                    conn.commit()
+                    deleted += pruneCursor.rowcount
+                    if pruneCursor.rowcount < batchSize:
+                        break
+            pruneCursor.close()
+        except Exception as e:
+            return "ERROR: {}".format(e)
+        else:
+            return deleted
+
+    def series(self, name, start, end=None, apId=None):
+        '''
+        Return the buckets of a resolution between start and end
+        (epoch seconds) as a list of dict() objects, for one access
+        point or, if apId is None, summed across the fleet.
+        '''
+        resolution = telemetryBuckets[name]
+        end = end or time.time()
+        conn = self.sql()
+
+        try:
+            seriesCursor = conn.cursor()
+            if apId is not None:
+                seriesCursor.execute("SELECT bucket, samples, clients_avg, clients_max, bandwidth_avg, bandwidth_max FROM ap_telemetry_rollups "
+                "WHERE resolution = %s AND ap_id = %s AND bucket >= %s AND bucket < %s ORDER BY bucket", (resolution, apId, int(start), int(end)))
+            else:
+                seriesCursor.execute("SELECT bucket, SUM(samples), SUM(clients_avg), SUM(clients_max), SUM(bandwidth_avg), SUM(bandwidth_max) FROM ap_telemetry_rollups "
+                "WHERE resolution = %s AND bucket >= %s AND bucket < %s GROUP BY bucket ORDER BY bucket", (resolution, int(start), int(end)))
+            buckets = [dict(bucket=i[0], samples=int(i[1]), clients_avg=round(float(i[2]), 2), clients_max=int(i[3]), bandwidth_avg=round(float(i[4]), 2), \
+                bandwidth_max=int(i[5])) for i in seriesCursor.fetchall()]
+            seriesCursor.close()
+        except Exception as e:
+            return "ERROR: {}".format(e)
+        else:
+            return buckets
+
+def flushTelemetry():
+    '''
+    Function that drains buffered telemetry samples into
+    ap_telemetry (runs as a scheduled rq job).
+    '''
+    return TelemetryStore().flush()
+
+def runTelemetryRollup():
+    '''
+    Function that rolls up and prunes telemetry (runs as
+    a scheduled rq job, see runTelemetryCycle()).
+    '''
+    telemetryStore = TelemetryStore()
+
+    try:
+        return dict(flushed=telemetryStore.flush(), rolled_up=telemetryStore.rollup(), pruned=telemetryStore.prune())
+    finally:
+        telemetryStore.releaseSql()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+
+from cardinal.system.common import AsyncOpsManager
+from cardinal.system.common import CardinalEnv
+from redis.exceptions import RedisError
+
+# access_points columns written from fetchInfo() results
+apInfoColumns = ("ap_mac_addr", "ap_bandwidth", "ap_ios_info", "ap_uptime", "ap_serial", "ap_model", "ap_total_clients", "ap_location")
+
+# Columns that change on nearly every poll. Changes limited to these are
+# written behind at the slower apInfoTelemetryInterval.
+apVolatileColumns = ("ap_bandwidth", "ap_uptime", "ap_total_clients")
+
+class ApInfoCache(CardinalEnv):
+    '''
+    Redis write-behind cache for fetchInfo() results. The latest
+    values of every access point are kept in a Redis hash, which
+    API reads are served from (see latest()). Only changed columns
+    are staged for MySQL and flushed to access_points as one
+    multi-row CASE UPDATE per apInfoBatch access points: soon
+    (apInfoFlushInterval) for inventory changes such as a new IOS
+    version, and at the slower apInfoTelemetryInterval for client
+    count, bandwidth and uptime.
+    '''
+    def __init__(self):
+        '''
+        Default constructor for ApInfoCache() object.
+        '''
+        super().__init__()
+
+    def key(self, suffix):
+        '''
+        Redis key for a write-behind element.
+        '''
+        return "cardinal:ap_info:{}".format(suffix)
+
+    def interval(self, lane):
+        '''
+        Flush interval (in seconds) of a write-behind lane.
+        '''
+        return self.tunings['apInfoFlushInterval'] if lane == "inventory" else self.tunings['apInfoTelemetryInterval']
+
+    def stage(self, apId, values):
+        '''
+        Cache values (a dict() object of column -> value) as the
+        latest for apId and stage the columns that changed. Returns
+        the number of changed columns.
+        '''
+        values = {column: str(value) for column, value in values.items() if column in apInfoColumns}
+        snapshotKey = self.key("snapshot:{}".format(apId))
+        previous = self.redis().hmget(snapshotKey, list(values))
+
+        changed = {column: value for (column, value), seen in zip(values.items(), previous) if seen is None or seen.decode() != value}
+        if not changed:
+            return 0
+
+        lane = "telemetry" if all(column in apVolatileColumns for column in changed) else "inventory"
+
+        with self.redis().pipeline() as pipe:
+            pipe.hset(snapshotKey, mapping=changed)
+            pipe.expire(snapshotKey, self.tunings['apInfoSnapshotTtl'])
+            pipe.hset(self.key("staged:{}".format(apId)), mapping=changed)
+            pipe.sadd(self.key("dirty:{}".format(lane)), apId)
+            pipe.scard(self.key("dirty:{}".format(lane)))
+            pipe.set(self.key("scheduled:{}".format(lane)), 1, nx=True, ex=self.interval(lane) * 10)
+            dirty, scheduled = pipe.execute()[-2:]
+
+        # Telemetry is only ever written on its timer, however much piles up
+        if lane == "inventory" and dirty >= self.tunings['apInfoBatch']:
+            self.flush(lane)
+        elif scheduled:
+            AsyncOpsManager().runIn(func="cardinal.system.writebehind.flushApInfo", args=dict(lane=lane), delay=self.interval(lane))
+
+        return len(changed)
+
+    def restage(self, staged, lane):
+        '''
+        Put changes that could not be flushed back, unless
+        newer values were staged in the meantime.
+        '''
+        with self.redis().pipeline() as pipe:
+            for apId, changed in staged.items():
+                for column, value in changed.items():
+                    pipe.hsetnx(self.key("staged:{}".format(apId)), column, value)
+                pipe.sadd(self.key("dirty:{}".format(lane)), apId)
+            pipe.execute()
+
+    def flush(self, lane="inventory"):
+        '''
+        Write every change staged for the access points of a lane
+        to access_points, apInfoBatch access points per UPDATE.
+        Returns the number of access points written.
+        '''
+        batchSize = self.tunings['apInfoBatch']
+        written = 0
+
+        while True:
+            apIds = self.redis().spop(self.key("dirty:{}".format(lane)), batchSize)
+            if not apIds:
+                self.redis().delete(self.key("scheduled:{}".format(lane)))
+                return written
+
+            with self.redis().pipeline() as pipe:
+                for apId in apIds:
+                    pipe.hgetall(self.key("staged:{}".format(int(apId))))
+                    pipe.delete(self.key("staged:{}".format(int(apId))))
+                results = pipe.execute()[::2]
+
+            staged = {int(apId): {column.decode(): value.decode() for column, value in changed.items()} for apId, changed in zip(apIds, results) if changed}
+            if not staged:
+                continue
+
+            # One CASE per changed column; access points without a change keep their value
+            assignments = []
+            args = []
+            for column in apInfoColumns:
+                changedIds = [apId for apId in staged if column in staged[apId]]
+                if changedIds:
+                    assignments.append("{0} = CASE ap_id {1} ELSE {0} END".format(column, " ".join(["WHEN %s THEN %s"] * len(changedIds))))
+                    args += [i for apId in changedIds for i in (apId, staged[apId][column])]
+
+            conn = self.sql()
+
+            try:
+                apInfoCursor = conn.cursor()
+                apInfoCursor.execute("UPDATE access_points SET {0} WHERE ap_id IN ({1})".format(", ".join(assignments), ", ".join(["%s"] * len(staged))), \
+                    args + list(staged))
+                apInfoCursor.close()
+            except Exception as e:
+                self.restage(staged, lane)
+                self.redis().delete(self.key("scheduled:{}".format(lane)))
+                return "ERROR: {}".format(e)
+            else:
+                conn.commit()
+                written += len(staged)
+
+    def latest(self, apInfo):
+        '''
+        Overlay the cached values on AccessPoint().info() rows, so
+        reads are as fresh as the last poll even before MySQL is
+        written. Rows are returned unchanged if Redis is unavailable.
+        '''
+        if isinstance(apInfo, str) or not apInfo:
+            return apInfo
+
+        try:
+            with self.redis().pipeline() as pipe:
+                for ap in apInfo:
+                    pipe.hgetall(self.key("snapshot:{}".format(ap["ap_id"])))
+                snapshots = pipe.execute()
+        except RedisError:
+            return apInfo
+
+        for ap, snapshot in zip(apInfo, snapshots):
+            ap.update({column.decode(): value.decode() for column, value in snapshot.items() if column.decode() in ap})
+
+        return apInfo
+
+    def forget(self, apId):
+        '''
+        Drop the cached values of an access point, so the
+        next result is written in full.
+        '''
+        self.redis().delete(self.key("snapshot:{}".format(apId)))
+
+def flushApInfo(lane="inventory"):
+    '''
+    Function that writes staged fetchInfo() results to
+    access_points (runs as a scheduled rq job).
+    '''
+    return ApInfoCache().flush(lane)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2023 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+
+import time
+from cardinal.system.common import AsyncOpsManager
+from cardinal.system.common import CardinalEnv
+from redis.exceptions import WatchError
+
+class WriteMemory(CardinalEnv):
+    '''
+    Coalesces NVRAM saves (copy run start) on access points.
+    Configuration changes mark an access point "dirty" and a single
+    deferred save runs once no further change has arrived for
+    writeMemoryDebounce seconds. State lives in Redis so every
+    uwsgi/rq process shares it.
+    '''
+    def __init__(self):
+        '''
+        Default constructor for WriteMemory() object.
+        '''
+        super().__init__()
+
+    def key(self, apId, suffix):
+        '''
+        Redis key for an access point's write memory state.
+        '''
+        return "cardinal:write_memory:{0}:{1}".format(apId, suffix)
+
+    def scheduleTtl(self):
+        '''
+        Lifetime of the "save scheduled" marker. It outlives
+        the deferred job so a lost job doesn't block future saves
+        for longer than this.
+        '''
+        return 2 * self.tunings['writeMemoryDebounce'] + self.tunings['writeMemoryTimeout']
+
+    def dirty(self, apId):
+        '''
+        Return when the access point was last changed without a save
+        (as a float timestamp), or None if it's clean.
+        '''
+        dirtySince = self.redis().get(self.key(apId, "dirty"))
+        return float(dirtySince) if dirtySince is not None else None
+
+    def markDirty(self, apId):
+        '''
+        Record an unsaved configuration change and make sure
+        a deferred save is scheduled.
+        '''
+        with self.redis().pipeline() as pipe:
+            pipe.set(self.key(apId, "dirty"), repr(time.time()))
+            pipe.set(self.key(apId, "scheduled"), 1, nx=True, ex=self.scheduleTtl())
+            dirtyResult, scheduled = pipe.execute()
+
+        if scheduled:
+            self.schedule(apId, self.tunings['writeMemoryDebounce'])
+
+    def schedule(self, apId, delay):
+        '''
+        Enqueue the deferred save for an access point.
+        '''
+        self.redis().expire(self.key(apId, "scheduled"), self.scheduleTtl() + int(delay))
+        AsyncOpsManager().runIn(func="cardinal.system.accesspoints.runDeferredSave", args=dict(apId=apId), delay=delay)
+
+    def remaining(self, dirtySince):
+        '''
+        Seconds left in the debounce window started by
+        the last change.
+        '''
+        return max(dirtySince + self.tunings['writeMemoryDebounce'] - time.time(), 0)
+
+    def clear(self, apId, dirtySince):
+        '''
+        Mark an access point clean after a save, unless it was changed
+        again after dirtySince. Returns True if it is now clean.
+        '''
+        with self.redis().pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(self.key(apId, "dirty"))
+                    current = pipe.get(self.key(apId, "dirty"))
+                    if current is not None and (dirtySince is None or float(current) > dirtySince):
+                        pipe.unwatch()
+                        return False
+                    pipe.multi()
+                    pipe.delete(self.key(apId, "dirty"))
+                    pipe.execute()
+                    return True
+                except WatchError:
+                    continue
+
+    def finish(self, apId):
+        '''
+        Drop the "save scheduled" marker once the access point is
+        clean. Returns False (leaving the marker in place) if a change
+        arrived meanwhile.
+        '''
+        with self.redis().pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(self.key(apId, "dirty"))
+                    if pipe.exists(self.key(apId, "dirty")):
+                        pipe.unwatch()
+                        return False
+                    pipe.multi()
+                    pipe.delete(self.key(apId, "scheduled"))
+                    pipe.execute()
+                    return True
+                except WatchError:
+                    continue
@@ -27,11 +27,14 @@ SOFTWARE.
 '''
 
 from cardinal.system.accesspoints import AccessPoint
+from cardinal.system.accesspoints import validatePlan
+from cardinal.system.circuitbreaker import CircuitBreaker
 from cardinal.system.common import AsyncOpsManager
 from cardinal.system.common import msgAuthFailed
 from cardinal.system.common import msgResourceAdded
 from cardinal.system.common import msgSpecifyValidAp
 from cardinal.system.common import jsonResponse
+from cardinal.system.common import rqAcceptedStates
 from flask import Blueprint
 from flask import render_template
 from flask import request
@@ -49,6 +52,20 @@ def before_request():
 # Establish connection to AsyncOpsManager()
 job = AsyncOpsManager()
 
+def withBreakerState(apInfo):
+    '''
+    Add the circuit breaker state (closed, open, half_open)
+    of every access point to an AccessPoint().info() result.
+    '''
+    if isinstance(apInfo, str):
+        return apInfo
+
+    breakerStates = CircuitBreaker().states([ap["ap_id"] for ap in apInfo])
+    for ap in apInfo:
+        ap["ap_circuit_breaker"] = breakerStates[ap["ap_id"]]
+
+    return apInfo
+
 @cardinal_ap.route("/api/v1/access_points", methods=["GET", "POST", "DELETE"])
 def accessPoints():
     '''
@@ -88,7 +105,7 @@ def accessPoints():
             else:
                 return jsonResponse(level="INFO", message="{} deleted successfully".format(apName)), 200
         else:
-            return AccessPoint().info()
+            return withBreakerState(AccessPoint().info())
 
     elif request.method == 'POST':
         apName = request.form["ap_name"]
@@ -97,6 +114,7 @@ def accessPoints():
         apSshPort = request.form["ssh_port"]
         sshUsername = request.form["ssh_username"]
         sshPassword = request.form["ssh_password"]
+        enablePassword = request.form.get("enable_password") or None
         community = request.form["community"]
 
         try:
@@ -105,11 +123,13 @@ def accessPoints():
                 if len(request.form["group_id"]) >= 1:
                     apGroupId = request.form["group_id"]
                     apCreationResult = AccessPoint().add(name=apName,ip=apIp,subnetMask=apSubnetMask,sshPort=apSshPort,username=sshUsername,\
-                    password=sshPassword,community=community,groupId=apGroupId)
+                    password=sshPassword,community=community,groupId=apGroupId,enablePassword=enablePassword)
                 else:
-                    apCreationResult = AccessPoint().add(name=apName,ip=apIp,subnetMask=apSubnetMask,sshPort=apSshPort,username=sshUsername,password=sshPassword,community=community)
+                    apCreationResult = AccessPoint().add(name=apName,ip=apIp,subnetMask=apSubnetMask,sshPort=apSshPort,username=sshUsername,password=sshPassword,community=community,\
+                    enablePassword=enablePassword)
             else:
-                apCreationResult = AccessPoint().add(name=apName,ip=apIp,subnetMask=apSubnetMask,sshPort=apSshPort,username=sshUsername,password=sshPassword,community=community)
+                apCreationResult = AccessPoint().add(name=apName,ip=apIp,subnetMask=apSubnetMask,sshPort=apSshPort,username=sshUsername,password=sshPassword,community=community,\
+                enablePassword=enablePassword)
 
             # Return an HTTP 400 if access point with specified name already exists
             if apCreationResult is not None:
@@ -163,7 +183,7 @@ def accessPointById(id):
         if len(apCheck) == 0:
             return jsonResponse(level="ERROR", message="Access point with specified id does not exist."), 404
         else:
-            return AccessPoint().info(id=id)
+            return withBreakerState(AccessPoint().info(id=id))
 
 
 @cardinal_ap.route("/api/v1/access_points/<int:id>/ops/change_ip", methods=["POST"])
@@ -188,7 +208,7 @@ def changeAccessPointIPById(id):
             # Send change access point IP job to Redis queue
             result = job.run(func=accessPoint.changeIp, args=dict(id=apId, newIp=newApIp, subnetMask=newApSubnetMask))
 
-            if result._status == 'queued':
+            if result._status in rqAcceptedStates:
                 return jsonResponse(level="INFO", message="Change access point IP job successfully dispatched", reference=result._id), 201
             else:
                 return jsonResponse(level="ERROR", message="Change access point IP job failed", reference=result._status), 409
@@ -215,7 +235,7 @@ def changeAccessPointNameById(id):
             # Send change access point IP job to Redis queue
             result = job.run(func=accessPoint.changeHostname, args=dict(id=id, hostname=hostname))
 
-            if result._status == 'queued':
+            if result._status in rqAcceptedStates:
                 return jsonResponse(level="INFO", message="Change access point hostname job successfully dispatched", reference=result._id), 201
             else:
                 return jsonResponse(level="ERROR", message="Change access point hostname job failed", reference=result._status), 409
@@ -239,9 +259,9 @@ def fetchAccessPointInfoById(id):
             return jsonResponse(level="ERROR", message="Access point with specified id does not exist."), 404
         else:
             # Send fetch AP info job to Redis queue
-            result = job.run(func=accessPoint.fetchInfo, args=dict(id=id))
+            result = job.run(func=accessPoint.fetchInfo, args=dict(id=id), freshness=job.tunings['fetchInfoFreshness'])
 
-            if result._status == 'queued':
+            if result._status in rqAcceptedStates:
                 return jsonResponse(level="INFO", message="Fetch AP info job successfully dispatched", reference=result._id), 201
             else:
                 return jsonResponse(level="ERROR", message="Fetch AP info job failed", reference=result._status), 409
@@ -267,7 +287,7 @@ def tftpBackupByApId(id):
             tftpIp = request.form["tftp_ip"]
             result = job.run(func=accessPoint.tftpBackup, args=dict(id=id, tftpIp=tftpIp))
 
-            if result._status == 'queued':
+            if result._status in rqAcceptedStates:
                 return jsonResponse(level="INFO", message="TFTP backup job successfully dispatched", reference=result._id), 201
             else:
                 return jsonResponse(level="ERROR", message="TFTP backup job failed", reference=result._status), 409
@@ -293,12 +313,12 @@ def manageHttpByApId(id, status):
             result = job.run(func=accessPoint.manageHttp, args=dict(id=id, status=status))
 
             if status == "enable":
-                if result._status == 'queued':
+                if result._status in rqAcceptedStates:
                     return jsonResponse(level="INFO", message="Enable HTTP job successfully dispatched", reference=result._id), 201
                 else:
                     return jsonResponse(level="ERROR", message="Enable HTTP job failed", reference=result._status), 409
             elif status == "disable":
-                if result._status == 'queued':
+                if result._status in rqAcceptedStates:
                     return jsonResponse(level="INFO", message="Disable HTTP job successfully dispatched", reference=result._id), 201
                 else:
                     return jsonResponse(level="ERROR", message="Disable HTTP job failed", reference=result._status), 409
@@ -326,12 +346,12 @@ def manageSnmpByApId(id, status):
             result = job.run(func=accessPoint.manageSnmp, args=dict(id=id, status=status))
 
             if status == "enable":
-                if result._status == 'queued':
+                if result._status in rqAcceptedStates:
                     return jsonResponse(level="INFO", message="Enable SNMP job successfully dispatched", reference=result._id), 201
                 else:
                     return jsonResponse(level="ERROR", message="Enable SNMP job failed", reference=result._status), 409
             elif status == "disable":
-                if result._status == 'queued':
+                if result._status in rqAcceptedStates:
                     return jsonResponse(level="INFO", message="Disable SNMP job successfully dispatched", reference=result._id), 201
                 else:
                     return jsonResponse(level="ERROR", message="Disable SNMP job failed", reference=result._status), 409
@@ -359,7 +379,7 @@ def deploySsid24GhzById(id):
             ssidId = request.form["ssid_id"]
             result = job.run(func=accessPoint.deploy24GhzSsid, args=dict(id=id, ssidId=ssidId))
 
-            if result._status == 'queued':
+            if result._status in rqAcceptedStates:
                 return jsonResponse(level="INFO", message="Deploy 2.4GHz SSID job successfully dispatched", reference=result._id), 201
             else:
                 return jsonResponse(level="ERROR", message="Deploy 2.4GHz SSID job failed", reference=result._status), 409
@@ -384,7 +404,7 @@ def deploySsid5GhzById(id):
             ssidId = request.form["ssid_id"]
             result = job.run(func=accessPoint.deploy5GhzSsid, args=dict(id=id, ssidId=ssidId))
 
-            if result._status == 'queued':
+            if result._status in rqAcceptedStates:
                 return jsonResponse(level="INFO", message="Deploy 5GHz SSID job successfully dispatched", reference=result._id), 201
             else:
                 return jsonResponse(level="ERROR", message="Deploy 5GHz SSID job failed", reference=result._status), 409
@@ -410,7 +430,7 @@ def deploySsid24RadiusGhzById(id):
             ssidId = request.form["ssid_id"]
             result = job.run(func=accessPoint.deploy24GhzRadiusSsid, args=dict(id=id, ssidId=ssidId))
 
-            if result._status == 'queued':
+            if result._status in rqAcceptedStates:
                 return jsonResponse(level="INFO", message="Deploy 2.4GHz 802.1x SSID job successfully dispatched", reference=result._id), 201
             else:
                 return jsonResponse(level="ERROR", message="Deploy 2.4GHz 802.1x SSID job failed", reference=result._status), 409
@@ -436,7 +456,7 @@ def deploySsid5GhzRadiusById(id):
             ssidId = request.form["ssid_id"]
             result = job.run(func=accessPoint.deploy5GhzRadiusSsid, args=dict(id=id, ssidId=ssidId))
 
-            if result._status == 'queued':
+            if result._status in rqAcceptedStates:
                 return jsonResponse(level="INFO", message="Deploy 5GHz 802.1x SSID job successfully dispatched", reference=result._id), 201
             else:
                 return jsonResponse(level="ERROR", message="Deploy 5GHz 802.1x SSID job failed", reference=result._status), 409
@@ -462,7 +482,7 @@ def removeSsid24GhzById(id):
             ssidId = request.form["ssid_id"]
             result = job.run(func=accessPoint.remove24GhzSsid, args=dict(id=id, ssidId=ssidId))
 
-            if result._status == 'queued':
+            if result._status in rqAcceptedStates:
                 return jsonResponse(level="INFO", message="Remove 2.4GHz SSID job successfully dispatched", reference=result._id), 201
             else:
                 return jsonResponse(level="ERROR", message="Remove 2.4GHz SSID job failed", reference=result._status), 409
@@ -488,7 +508,7 @@ def removeSsid5GhzById(id):
             ssidId = request.form["ssid_id"]
             result = job.run(func=accessPoint.remove5GhzSsid, args=dict(id=id, ssidId=ssidId))
 
-            if result._status == 'queued':
+            if result._status in rqAcceptedStates:
                 return jsonResponse(level="INFO", message="Remove 5GHz SSID job successfully dispatched", reference=result._id), 201
             else:
                 return jsonResponse(level="ERROR", message="Remove 5GHz SSID job failed", reference=result._status), 409
@@ -514,7 +534,7 @@ def removeSsid24GhzRadiusById(id):
             ssidId = request.form["ssid_id"]
             result = job.run(func=accessPoint.remove24GhzRadiusSsid, args=dict(id=id, ssidId=ssidId))
 
-            if result._status == 'queued':
+            if result._status in rqAcceptedStates:
                 return jsonResponse(level="INFO", message="Remove 2.4GHz 802.1x SSID job successfully dispatched", reference=result._id), 201
             else:
                 return jsonResponse(level="ERROR", message="Remove 2.4GHz 802.1x SSID job failed", reference=result._status), 409
@@ -540,7 +560,59 @@ def removeSsid5GhzRadiusById(id):
             ssidId = request.form["ssid_id"]
             result = job.run(func=accessPoint.remove5GhzRadiusSsid, args=dict(id=id, ssidId=ssidId))
 
-            if result._status == 'queued':
+            if result._status in rqAcceptedStates:
                 return jsonResponse(level="INFO", message="Remove 5GHz 802.1x SSID job successfully dispatched", reference=result._id), 201
             else:
                 return jsonResponse(level="ERROR", message="Remove 5GHz 802.1x SSID job failed", reference=result._status), 409
+
+@cardinal_ap.route("/api/v1/access_points/<int:id>/ops/write_memory", methods=["POST"])
+def writeMemoryById(id):
+    '''
+    /api/v1/access_points/<id>/ops/write_memory is an endpoint that
+    allows a Cardinal user to save an access point's running configuration
+    right away instead of waiting for the coalesced save.
+    '''
+    if request.method == 'POST':
+        # Initialize AccessPoint() object
+        accessPoint = AccessPoint()
+        apCheck = accessPoint.info(id=id)
+
+        if len(apCheck) == 0:
+            return jsonResponse(level="ERROR", message="Access point with specified id does not exist."), 404
+        else:
+            result = job.run(func=accessPoint.writeMemory, args=dict(id=id))
+
+            if result._status in rqAcceptedStates:
+                return jsonResponse(level="INFO", message="Write memory job successfully dispatched", reference=result._id), 201
+            else:
+                return jsonResponse(level="ERROR", message="Write memory job failed", reference=result._status), 409
+
+@cardinal_ap.route("/api/v1/access_points/<int:id>/ops/plan", methods=["POST"])
+def operationPlanById(id):
+    '''
+    /api/v1/access_points/<id>/ops/plan is an endpoint that allows
+    a Cardinal user to run an ordered list of operations against an
+    access point in one job and one SSH session. The JSON body holds
+    "steps" (e.g. [{"operation": "deploy24GhzSsid", "args": {"ssidId": 1}}])
+    and an optional "stop_on_error" (default true).
+    '''
+    if request.method == 'POST':
+        # Initialize AccessPoint() object
+        accessPoint = AccessPoint()
+        apCheck = accessPoint.info(id=id)
+
+        if len(apCheck) == 0:
+            return jsonResponse(level="ERROR", message="Access point with specified id does not exist."), 404
+        else:
+            planRequest = request.get_json(silent=True) or dict()
+            steps = planRequest.get("steps")
+            planError = validatePlan(steps)
+            if planError is not None:
+                return jsonResponse(level="ERROR", message=planError), 400
+
+            result = job.run(func=accessPoint.plan, args=dict(id=id, steps=steps, stopOnError=bool(planRequest.get("stop_on_error", True))))
+
+            if result._status in rqAcceptedStates:
+                return jsonResponse(level="INFO", message="Operation plan job successfully dispatched", reference=result._id), 201
+            else:
+                return jsonResponse(level="ERROR", message="Operation plan job failed", reference=result._status), 409
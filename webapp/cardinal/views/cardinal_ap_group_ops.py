@@ -26,12 +26,13 @@ SOFTWARE.
 
 '''
 
-import time
-#from cardinal.system.common import apGroupIterator
-from cardinal.system.common import printCompletionTime
-#from cardinal.system.common import cipherSuite
-#from cardinal.system.common import processor
-
+from cardinal.system.accesspoints import AccessPointGroup
+from cardinal.system.accesspoints import Ssid24Ghz
+from cardinal.system.accesspoints import Ssid24GhzRadius
+from cardinal.system.accesspoints import Ssid5Ghz
+from cardinal.system.accesspoints import Ssid5GhzRadius
+from cardinal.system.accesspoints import validatePlan
+from cardinal.system.common import jsonResponse
 from flask import Blueprint
 from flask import render_template
 from flask import request
@@ -39,7 +40,6 @@ from flask import redirect
 from flask import session
 from flask import url_for
 from flask_login import login_required
-from scout import sys
 
 cardinal_ap_group_ops = Blueprint('cardinal_ap_group_ops_bp', __name__)
 @cardinal_ap_group_ops.before_request
@@ -47,12 +47,207 @@ cardinal_ap_group_ops = Blueprint('cardinal_ap_group_ops_bp', __name__)
 def before_request():
     pass
 
+# Request fields that configure a rollout, as (field, Rollout() argument, type)
+rolloutFields = (
+    ("rollout_canary", "canary", int),
+    ("rollout_batch_size", "batchSize", int),
+    ("rollout_max_in_flight", "maxInFlight", int),
+    ("rollout_failure_threshold", "failureThreshold", float),
+    ("rollout_min_sample", "minSample", int),
+)
+
+def rolloutOptions():
+    '''
+    Rollout settings requested with mode=rollout (form field or
+    JSON key), or None for a regular group operation. Raises
+    ValueError for malformed settings.
+    '''
+    options = request.get_json(silent=True) or request.values
+    if options.get("mode") != "rollout":
+        return None
+
+    rollout = dict()
+    for field, name, cast in rolloutFields:
+        if options.get(field) not in (None, ""):
+            rollout[name] = cast(options[field])
+
+    return rollout
+
+def dispatchGroupOperation(apGroupId, operation, description, **kwargs):
+    '''
+    Dispatch a group operation and build the JSON
+    response returned by the group ops endpoints.
+    '''
+    apGroupCheck = AccessPointGroup().info(id=apGroupId, struct="dict")
+    if len(apGroupCheck) == 0 or apGroupCheck[0]["ap_group_id"] is None:
+        return jsonResponse(level="ERROR", message="Access point group with specified id does not exist."), 404
+
+    try:
+        rollout = rolloutOptions()
+    except ValueError:
+        return jsonResponse(level="ERROR", message="Invalid rollout settings. Please check {}.".format(", ".join(i[0] for i in rolloutFields))), 400
+
+    if rollout is not None:
+        kwargs.update(backend="rollout", rollout=rollout)
+
+    groupJobId = AccessPointGroup().dispatch(id=apGroupId, operation=operation, **kwargs)
+
+    if groupJobId.startswith("ERROR"):
+        return jsonResponse(level="ERROR", message="{} group job failed".format(description), reference=groupJobId), 409
+    else:
+        return jsonResponse(level="INFO", message="{} group job successfully dispatched".format(description), reference=groupJobId), 201
+
+@cardinal_ap_group_ops.route("/api/v1/access_point_groups/<int:id>/ops/tftp", methods=["POST"])
+def tftpBackupByApGroupId(id):
+    '''
+    /api/v1/access_point_groups/<id>/ops/tftp is an endpoint that
+    allows a Cardinal user to back up the configuration of every access
+    point in a group to a TFTP server. One job is dispatched per access
+    point and the group job id is returned immediately. Set
+    mode=rollout (with optional rollout_canary, rollout_batch_size,
+    rollout_max_in_flight, rollout_failure_threshold and
+    rollout_min_sample) on any group operation to run it as a
+    canary/rolling rollout instead.
+    '''
+    tftpIp = request.form["tftp_ip"]
+    return dispatchGroupOperation(id, "tftpBackup", "TFTP backup", tftpIp=tftpIp)
+
+@cardinal_ap_group_ops.route("/api/v1/access_point_groups/<int:id>/ops/http/<status>", methods=["POST"])
+def manageHttpByApGroupId(id, status):
+    '''
+    /api/v1/access_point_groups/<id>/ops/http/<status> is an endpoint
+    that allows a Cardinal user to enable or disable the HTTP server on
+    every access point in a group.
+    '''
+    if status == "enable":
+        return dispatchGroupOperation(id, "manageHttp", "Enable HTTP", status=status)
+    elif status == "disable":
+        return dispatchGroupOperation(id, "manageHttp", "Disable HTTP", status=status)
+    else:
+        return jsonResponse(level="ERROR", message="Invalid HTTP operation status. Please choose from the following: enable, disable"), 400
+
+@cardinal_ap_group_ops.route("/api/v1/access_point_groups/<int:id>/ops/snmp/<status>", methods=["POST"])
+def manageSnmpByApGroupId(id, status):
+    '''
+    /api/v1/access_point_groups/<id>/ops/snmp/<status> is an endpoint
+    that allows a Cardinal user to enable or disable SNMP on every
+    access point in a group.
+    '''
+    if status == "enable":
+        return dispatchGroupOperation(id, "manageSnmp", "Enable SNMP", status=status)
+    elif status == "disable":
+        return dispatchGroupOperation(id, "manageSnmp", "Disable SNMP", status=status)
+    else:
+        return jsonResponse(level="ERROR", message="Invalid SNMP operation status. Please choose from the following: enable, disable"), 400
+
+# Group SSID operations by URL band, as (AccessPoint() method, SSID class, description)
+deploySsidOperations = {
+    "24ghz": ("deploy24GhzSsid", Ssid24Ghz, "Deploy 2.4GHz SSID"),
+    "5ghz": ("deploy5GhzSsid", Ssid5Ghz, "Deploy 5GHz SSID"),
+    "24ghz_radius": ("deploy24GhzRadiusSsid", Ssid24GhzRadius, "Deploy 2.4GHz 802.1x SSID"),
+    "5ghz_radius": ("deploy5GhzRadiusSsid", Ssid5GhzRadius, "Deploy 5GHz 802.1x SSID"),
+}
+removeSsidOperations = {
+    "24ghz": ("remove24GhzSsid", Ssid24Ghz, "Remove 2.4GHz SSID"),
+    "5ghz": ("remove5GhzSsid", Ssid5Ghz, "Remove 5GHz SSID"),
+    "24ghz_radius": ("remove24GhzRadiusSsid", Ssid24GhzRadius, "Remove 2.4GHz 802.1x SSID"),
+    "5ghz_radius": ("remove5GhzRadiusSsid", Ssid5GhzRadius, "Remove 5GHz 802.1x SSID"),
+}
+
+def dispatchSsidOperation(apGroupId, ssidOperations, band):
+    '''
+    Validate the band and SSID of a group SSID request and
+    dispatch it through dispatchGroupOperation().
+    '''
+    if band not in ssidOperations:
+        return jsonResponse(level="ERROR", message="Invalid SSID type. Please choose from the following: {}".format(", ".join(ssidOperations))), 400
+
+    operation, ssidClass, description = ssidOperations[band]
+    ssidId = request.form["ssid_id"]
+
+    if len(ssidClass().info(id=ssidId)) == 0:
+        return jsonResponse(level="ERROR", message="SSID with specified id does not exist."), 404
+
+    return dispatchGroupOperation(apGroupId, operation, description, ssidId=ssidId)
+
+@cardinal_ap_group_ops.route("/api/v1/access_point_groups/<int:id>/ops/deploy_ssid/<band>", methods=["POST"])
+def deploySsidByApGroupId(id, band):
+    '''
+    /api/v1/access_point_groups/<id>/ops/deploy_ssid/<band> is an
+    endpoint that allows a Cardinal user to deploy an SSID (ssid_id) to
+    every access point in a group. band is one of 24ghz, 5ghz,
+    24ghz_radius or 5ghz_radius. The SSID is loaded and decrypted once
+    and access points are configured in parallel.
+    '''
+    return dispatchSsidOperation(id, deploySsidOperations, band)
+
+@cardinal_ap_group_ops.route("/api/v1/access_point_groups/<int:id>/ops/remove_ssid/<band>", methods=["POST"])
+def removeSsidByApGroupId(id, band):
+    '''
+    /api/v1/access_point_groups/<id>/ops/remove_ssid/<band> is an
+    endpoint that allows a Cardinal user to remove an SSID (ssid_id)
+    from every access point in a group. band is one of 24ghz, 5ghz,
+    24ghz_radius or 5ghz_radius.
+    '''
+    return dispatchSsidOperation(id, removeSsidOperations, band)
+
+@cardinal_ap_group_ops.route("/api/v1/access_point_groups/<int:id>/ops/write_memory", methods=["POST"])
+def writeMemoryByApGroupId(id):
+    '''
+    /api/v1/access_point_groups/<id>/ops/write_memory is an endpoint
+    that allows a Cardinal user to save the running configuration of
+    every access point in a group right away.
+    '''
+    return dispatchGroupOperation(id, "writeMemory", "Write memory")
+
+@cardinal_ap_group_ops.route("/api/v1/access_point_groups/<int:id>/ops/fetch_info", methods=["POST"])
+def fetchInfoByApGroupId(id):
+    '''
+    /api/v1/access_point_groups/<id>/ops/fetch_info is an endpoint
+    that allows a Cardinal user to refresh the information of every
+    access point in a group. A refresh of the same group that is in
+    progress (or finished less than fetchInfoFreshness seconds ago)
+    is shared instead of contacting the access points again.
+    '''
+    return dispatchGroupOperation(id, "fetchInfo", "Fetch AP info")
+
+@cardinal_ap_group_ops.route("/api/v1/access_point_groups/<int:id>/ops/plan", methods=["POST"])
+def operationPlanByApGroupId(id):
+    '''
+    /api/v1/access_point_groups/<id>/ops/plan is an endpoint that
+    allows a Cardinal user to run an ordered list of operations against
+    every access point in a group. Each access point gets one job that
+    runs all steps in one SSH session; per-step results are reported
+    under /api/v1/jobs/<group_job_id>. Takes the same JSON body as
+    /api/v1/access_points/<id>/ops/plan.
+    '''
+    planRequest = request.get_json(silent=True) or dict()
+    planError = validatePlan(planRequest.get("steps"))
+    if planError is not None:
+        return jsonResponse(level="ERROR", message=planError), 400
+
+    return dispatchGroupOperation(id, "plan", "Operation plan", steps=planRequest["steps"], stopOnError=bool(planRequest.get("stop_on_error", True)))
+
+def groupJobIdOrNone(groupJobId):
+    '''
+    Group job id to stream progress for on the group ops
+    forms, or None if dispatching failed.
+    '''
+    return None if groupJobId.startswith("ERROR") else groupJobId
+
+def groupOperationStatus(apGroupName, description, groupJobId):
+    '''
+    Status message shown by the group ops forms.
+    '''
+    if groupJobId.startswith("ERROR"):
+        return groupJobId
+    return "INFO: {0} for AP Group {1} Successfully Dispatched! (Group Job: {2})".format(description, apGroupName, groupJobId)
+
 @cardinal_ap_group_ops.route("/get-ap-group-tftp-backup", methods=["GET", "POST"])
 def configApTftpBackup():
     if request.method == 'GET':
         status = request.args.get('status')
-        completionTime = request.args.get('completionTime')
-        return render_template("config-ap-group-tftp-backup.html", status=status, completionTime=completionTime)
+        return render_template("config-ap-group-tftp-backup.html", status=status)
 
     elif request.method == 'POST':
         apGroupId = session.get("apGroupId")
@@ -60,20 +255,15 @@ def configApTftpBackup():
         if apGroupId is None:
             apGroupId = request.form["ap_group_id"]
         tftpIp = request.form["tftp_ip"]
-        apList = apGroupIterator(apGroupId=apGroupId, tftpIp=tftpIp)
-        startTime = time.time()
-        task = processor(operation=sys.scoutTftpBackup, apInfo=apList)
-        endTime = time.time() - startTime
-        status = "INFO: Config Backup for AP Group {} Successfully Initiated!".format(apGroupName)
-        completionTime = printCompletionTime(endTime)
-        return redirect(url_for('cardinal_ap_group_ops_bp.configApTftpBackup', status=status, completionTime=completionTime))
+        groupJobId = AccessPointGroup().dispatch(id=apGroupId, operation="tftpBackup", tftpIp=tftpIp)
+        status = groupOperationStatus(apGroupName, "Config Backup", groupJobId)
+        return redirect(url_for('cardinal_ap_group_ops_bp.configApTftpBackup', status=status, job_id=groupJobIdOrNone(groupJobId)))
 
 @cardinal_ap_group_ops.route("/config-ap-group-http", methods=["GET"])
 @login_required
 def configApHttp():
-    completionTime = request.args.get('completionTime')
     status = request.args.get('status')
-    return render_template("config-ap-group-http.html", status=status, completionTime=completionTime)
+    return render_template("config-ap-group-http.html", status=status)
 
 @cardinal_ap_group_ops.route("/enable-ap-group-http", methods=["POST"])
 @login_required
@@ -82,13 +272,9 @@ def enableApHttp():
     apGroupName = session.get('apGroupName')
     if apGroupId is None:
         apGroupId = request.form["ap_group_id"]
-    apList = apGroupIterator(apGroupId=apGroupId)
-    startTime = time.time()
-    task = processor(operation=sys.scoutEnableHttp, apInfo=apList)
-    endTime = time.time() - startTime
-    status = "INFO: HTTP Server for AP Group {} Successfully Enabled!".format(apGroupName)
-    completionTime = printCompletionTime(endTime)
-    return redirect(url_for('cardinal_ap_group_ops_bp.configApHttp', status=status, completionTime=completionTime))
+    groupJobId = AccessPointGroup().dispatch(id=apGroupId, operation="manageHttp", status="enable")
+    status = groupOperationStatus(apGroupName, "Enable HTTP Server", groupJobId)
+    return redirect(url_for('cardinal_ap_group_ops_bp.configApHttp', status=status, job_id=groupJobIdOrNone(groupJobId)))
 
 @cardinal_ap_group_ops.route("/disable-ap-group-http", methods=["POST"])
 @login_required
@@ -97,20 +283,15 @@ def disableApHttp():
     apGroupName = session.get('apGroupName')
     if apGroupId is None:
         apGroupId = request.form["ap_group_id"]
-    apList = apGroupIterator(apGroupId=apGroupId)
-    startTime = time.time()
-    task = processor(operation=sys.scoutDisableHttp, apInfo=apList)
-    endTime = time.time() - startTime
-    status = "INFO: HTTP Server for AP Group {} Successfully Disabled!".format(apGroupName)
-    completionTime = printCompletionTime(endTime)
-    return redirect(url_for('cardinal_ap_group_ops_bp.configApHttp', status=status, completionTime=completionTime))
+    groupJobId = AccessPointGroup().dispatch(id=apGroupId, operation="manageHttp", status="disable")
+    status = groupOperationStatus(apGroupName, "Disable HTTP Server", groupJobId)
+    return redirect(url_for('cardinal_ap_group_ops_bp.configApHttp', status=status, job_id=groupJobIdOrNone(groupJobId)))
 
 @cardinal_ap_group_ops.route("/config-ap-group-snmp", methods=["GET"])
 @login_required
 def configApSnmp():
-    completionTime = request.args.get('completionTime')
     status = request.args.get('status')
-    return render_template("config-ap-group-snmp.html", status=status, completionTime=completionTime)
+    return render_template("config-ap-group-snmp.html", status=status)
 
 @cardinal_ap_group_ops.route("/enable-ap-group-snmp", methods=["POST"])
 @login_required
@@ -119,13 +300,9 @@ def enableApSnmp():
     apGroupName = session.get('apGroupName')
     if apGroupId is None:
         apGroupId = request.form["ap_group_id"]
-    apList = apGroupIterator(apGroupId=apGroupId, snmp="True")
-    startTime = time.time()
-    task = processor(operation=sys.scoutEnableSnmp, apInfo=apList)
-    endTime = time.time() - startTime
-    status = "INFO: SNMP Server for AP Group {} Successfully Enabled!".format(apGroupName)
-    completionTime = printCompletionTime(endTime)
-    return redirect(url_for('cardinal_ap_group_ops_bp.configApSnmp', status=status, completionTime=completionTime))
+    groupJobId = AccessPointGroup().dispatch(id=apGroupId, operation="manageSnmp", status="enable")
+    status = groupOperationStatus(apGroupName, "Enable SNMP Server", groupJobId)
+    return redirect(url_for('cardinal_ap_group_ops_bp.configApSnmp', status=status, job_id=groupJobIdOrNone(groupJobId)))
 
 @cardinal_ap_group_ops.route("/disable-ap-group-snmp", methods=["POST"])
 @login_required
@@ -134,10 +311,61 @@ def disableApSnmp():
     apGroupName = session.get('apGroupName')
     if apGroupId is None:
         apGroupId = request.form["ap_group_id"]
-    apList = apGroupIterator(apGroupId=apGroupId)
-    startTime = time.time()
-    task = processor(operation=sys.scoutDisableSnmp, apInfo=apList)
-    endTime = time.time() - startTime
-    status = "INFO: SNMP Server for AP Group {} Successfully Disabled!".format(apGroupName)
-    completionTime = printCompletionTime(endTime)
-    return redirect(url_for('cardinal_ap_group_ops_bp.configApSnmp', status=status, completionTime=completionTime))
+    groupJobId = AccessPointGroup().dispatch(id=apGroupId, operation="manageSnmp", status="disable")
+    status = groupOperationStatus(apGroupName, "Disable SNMP Server", groupJobId)
+    return redirect(url_for('cardinal_ap_group_ops_bp.configApSnmp', status=status, job_id=groupJobIdOrNone(groupJobId)))
+
+def dispatchSsidGroupForm(ssidOperation, formView):
+    '''
+    Handle a deploy/remove SSID group form and redirect
+    back to it with the group job status.
+    '''
+    operation, ssidClass, description = ssidOperation
+    apGroupId = session.get('apGroupId')
+    apGroupName = session.get('apGroupName')
+    if apGroupId is None:
+        apGroupId = request.form["ap_group_id"]
+    ssidId = request.form["ssid_id"]
+    groupJobId = AccessPointGroup().dispatch(id=apGroupId, operation=operation, ssidId=ssidId)
+    status = groupOperationStatus(apGroupName, description, groupJobId)
+    return redirect(url_for(formView, status=status, job_id=groupJobIdOrNone(groupJobId)))
+
+@cardinal_ap_group_ops.route("/deploy-ssid-24ghz-group", methods=["POST"])
+@login_required
+def deployApGroupSsid24Ghz():
+    return dispatchSsidGroupForm(deploySsidOperations["24ghz"], 'cardinal_forms_bp.deploySsid24GhzGroup')
+
+@cardinal_ap_group_ops.route("/deploy-ssid-5ghz-group", methods=["POST"])
+@login_required
+def deployApGroupSsid5Ghz():
+    return dispatchSsidGroupForm(deploySsidOperations["5ghz"], 'cardinal_forms_bp.deploySsid5GhzGroup')
+
+@cardinal_ap_group_ops.route("/deploy-ssid-24ghz-radius-group", methods=["POST"])
+@login_required
+def deployApGroupSsid24GhzRadius():
+    return dispatchSsidGroupForm(deploySsidOperations["24ghz_radius"], 'cardinal_forms_bp.deploySsid24GhzGroupRadius')
+
+@cardinal_ap_group_ops.route("/deploy-ssid-5ghz-radius-group", methods=["POST"])
+@login_required
+def deployApGroupSsid5GhzRadius():
+    return dispatchSsidGroupForm(deploySsidOperations["5ghz_radius"], 'cardinal_forms_bp.deploySsid5GhzRadiusGroup')
+
+@cardinal_ap_group_ops.route("/remove-ssid-24ghz-group", methods=["POST"])
+@login_required
+def removeApGroupSsid24Ghz():
+    return dispatchSsidGroupForm(removeSsidOperations["24ghz"], 'cardinal_forms_bp.removeSsid24GhzGroup')
+
+@cardinal_ap_group_ops.route("/remove-ssid-5ghz-group", methods=["POST"])
+@login_required
+def removeApGroupSsid5Ghz():
+    return dispatchSsidGroupForm(removeSsidOperations["5ghz"], 'cardinal_forms_bp.removeSsid5GhzGroup')
+
+@cardinal_ap_group_ops.route("/remove-ssid-24ghz-radius-group", methods=["POST"])
+@login_required
+def removeApGroupSsid24GhzRadius():
+    return dispatchSsidGroupForm(removeSsidOperations["24ghz_radius"], 'cardinal_forms_bp.removeSsid24GhzRadiusGroup')
+
+@cardinal_ap_group_ops.route("/remove-ssid-5ghz-radius-group", methods=["POST"])
+@login_required
+def removeApGroupSsid5GhzRadius():
+    return dispatchSsidGroupForm(removeSsidOperations["5ghz_radius"], 'cardinal_forms_bp.removeSsid5GhzRadiusGroup')
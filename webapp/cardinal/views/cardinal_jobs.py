@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2019 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+
+from cardinal.system.common import RqJob
+from cardinal.system.common import jsonResponse
+from cardinal.system.groupjobs import GroupJob
+from flask import Blueprint
+from flask import Response
+from flask import request
+from flask import stream_with_context
+from flask_login import login_required
+
+cardinal_jobs = Blueprint('cardinal_jobs_bp', __name__)
+@cardinal_jobs.before_request
+@login_required
+def before_request():
+    pass
+
+def waitSeconds():
+    '''
+    Long-poll timeout (in seconds) requested with ?wait=,
+    or None.
+    '''
+    try:
+        wait = float(request.args.get('wait', 0))
+    except ValueError:
+        return None
+
+    return wait if wait > 0 else None
+
+@cardinal_jobs.route("/api/v1/jobs", methods=["GET"])
+def jobsByIds():
+    '''
+    /api/v1/jobs?ids=<id>,<id>,... is an endpoint that allows a
+    Cardinal user to check on many rq jobs at once. Every job is
+    fetched through a single Redis pipeline. With ?wait=<seconds>,
+    the request is held until every job has finished (or wait
+    seconds have passed).
+    '''
+    jobIds = [jobId for jobId in request.args.get('ids', "").split(",") if jobId]
+    rqJob = RqJob()
+
+    if not jobIds:
+        return jsonResponse(level="ERROR", message="Please specify one or more job ids."), 400
+    elif len(jobIds) > rqJob.tunings['jobLookupLimit']:
+        return jsonResponse(level="ERROR", message="Please specify at most {} job ids.".format(rqJob.tunings['jobLookupLimit'])), 400
+
+    wait = waitSeconds()
+    jobInfo = rqJob.wait(jobIds, wait) if wait else rqJob.status(jobIds)
+
+    return dict(jobs=[info if info is not None else dict(job_id=jobId, status="unknown") for jobId, info in zip(jobIds, jobInfo)])
+
+@cardinal_jobs.route("/api/v1/jobs/<jobId>", methods=["GET"])
+def jobById(jobId):
+    '''
+    /api/v1/jobs/<id> is an endpoint that allows a Cardinal
+    user to check on a group job, including per access point
+    progress, or on a single rq job (the reference returned when
+    a job is dispatched). With ?wait=<seconds>, the request for an
+    rq job is held until it finishes (or wait seconds have passed).
+    '''
+    groupStatus = GroupJob().status(jobId)
+    if groupStatus is not None:
+        return groupStatus
+
+    rqJob = RqJob()
+    wait = waitSeconds()
+    jobInfo = rqJob.wait([jobId], wait)[0] if wait else rqJob.status([jobId])[0]
+
+    if jobInfo is None:
+        return jsonResponse(level="ERROR", message="Job with specified id does not exist."), 404
+    else:
+        return jobInfo
+
+@cardinal_jobs.route("/api/v1/jobs/<jobId>", methods=["DELETE"])
+def cancelJobById(jobId):
+    '''
+    DELETE /api/v1/jobs/<id> is an endpoint that allows a Cardinal
+    user to cancel a group job or a single rq job. Queued work is
+    dropped; running work is interrupted at its next SSH read (or
+    before its next access point).
+    '''
+    if GroupJob().cancel(jobId):
+        return jsonResponse(level="INFO", message="Group job cancellation requested", reference=jobId), 202
+
+    outcome = RqJob().cancel([jobId])[jobId]
+
+    if outcome is None:
+        return jsonResponse(level="ERROR", message="Job with specified id does not exist."), 404
+    elif outcome == "canceled":
+        return jsonResponse(level="INFO", message="Job cancelled", reference=jobId), 200
+    elif outcome == "stopping":
+        return jsonResponse(level="INFO", message="Job cancellation requested", reference=jobId), 202
+    else:
+        return jsonResponse(level="ERROR", message="Job already {}".format(outcome), reference=jobId), 409
+
+@cardinal_jobs.route("/api/v1/jobs/<jobId>/events", methods=["GET"])
+def jobEventsById(jobId):
+    '''
+    /api/v1/jobs/<id>/events is a Server-Sent Events endpoint that
+    streams live progress of a group job (per access point state
+    changes and throughput) until the group job finishes, or for at
+    most sseTimeout seconds. At most sseMaxStreams streams are served
+    per uwsgi process at once; beyond that, an HTTP 503 is returned.
+    '''
+    groupJob = GroupJob()
+    if groupJob.status(jobId) is None:
+        return jsonResponse(level="ERROR", message="Job with specified id does not exist."), 404
+
+    # Every stream holds a uwsgi thread, so only a few may be open at once
+    if not groupJob.claimStream():
+        return jsonResponse(level="ERROR", message="Too many event streams open. Please poll /api/v1/jobs/{} instead.".format(jobId)), 503
+
+    # The stream only reads Redis, so don't hold a MySQL connection for sseTimeout seconds
+    groupJob.releaseSql()
+
+    response = Response(stream_with_context(groupJob.events(jobId)), mimetype="text/event-stream", \
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    response.call_on_close(groupJob.releaseStream)
+    return response
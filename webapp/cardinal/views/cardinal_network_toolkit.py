@@ -27,6 +27,7 @@ SOFTWARE.
 '''
 
 from cardinal.system.common import jsonResponse
+from cardinal.system.common import rqAcceptedStates
 
 from cardinal.system.common import ToolkitJob
 from cardinal.system.common import AsyncOpsManager
@@ -81,7 +82,7 @@ def doPing():
     # Send ping job to Redis queue
     result = job.run(func=ping, args=dict(hostname=hostname))
 
-    if result._status == 'queued':
+    if result._status in rqAcceptedStates:
         return jsonResponse(level="INFO", message="Toolkit job for ping command has been successfully dispatched", reference=result._id), 201
     else:
         return jsonResponse(level="ERROR", message="Toolkit job for ping command failed", reference=result._status), 409
@@ -93,7 +94,7 @@ def doTracert():
     # Send ping job to Redis queue
     result = job.run(func=traceroute, args=dict(hostname=hostname))
 
-    if result._status == 'queued':
+    if result._status in rqAcceptedStates:
         return jsonResponse(level="INFO", message="Toolkit job for traceroute command has been successfully dispatched", reference=result._id), 201
     else:
         return jsonResponse(level="ERROR", message="Toolkit job for traceroute command failed", reference=result._status), 409
@@ -105,7 +106,7 @@ def doDig():
     # Send ping job to Redis queue
     result = job.run(func=dig, args=dict(hostname=hostname))
 
-    if result._status == 'queued':
+    if result._status in rqAcceptedStates:
         return jsonResponse(level="INFO", message="Toolkit job for dig command has been successfully dispatched", reference=result._id), 201
     else:
         return jsonResponse(level="ERROR", message="Toolkit job for dig command failed", reference=result._status), 409
@@ -117,7 +118,7 @@ def doCurl():
     # Send ping job to Redis queue
     result = job.run(func=curl, args=dict(hostname=hostname))
 
-    if result._status == 'queued':
+    if result._status in rqAcceptedStates:
         return jsonResponse(level="INFO", message="Toolkit job for curl command has been successfully dispatched", reference=result._id), 201
     else:
         return jsonResponse(level="ERROR", message="Toolkit job for curl command failed", reference=result._status), 409
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+''' Cardinal - An Open Source Cisco Wireless Access Point Controller
+
+MIT License
+
+Copyright © 2019 Cardinal Contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+'''
+
+from cardinal.system.common import AsyncOpsManager
+from cardinal.system.common import CardinalEnv
+from cardinal.system.common import jsonResponse
+from cardinal.system.common import rqAcceptedStates
+from cardinal.system.keyrotation import reencryptSecrets
+from cardinal.system.poller import TelemetryPoller
+from flask import Blueprint
+from flask import request
+from flask_login import login_required
+
+cardinal_system = Blueprint('cardinal_system_bp', __name__)
+@cardinal_system.before_request
+@login_required
+def before_request():
+    pass
+
+# Establish connection to AsyncOpsManager()
+job = AsyncOpsManager()
+
+@cardinal_system.route("/api/v1/system/sql_pool", methods=["GET"])
+def sqlPoolStats():
+    '''
+    /api/v1/system/sql_pool is an endpoint that allows
+    a Cardinal user to view MySQL connection pool statistics
+    for the worker process that served the request.
+    '''
+    return CardinalEnv().sqlPool().info()
+
+@cardinal_system.route("/api/v1/system/queues", methods=["GET"])
+def queueStats():
+    '''
+    /api/v1/system/queues is an endpoint that allows a
+    Cardinal user to view queue depth and average queue wait
+    time for every job priority class.
+    '''
+    return job.metrics()
+
+@cardinal_system.route("/api/v1/system/poller", methods=["GET"])
+def pollerStats():
+    '''
+    /api/v1/system/poller is an endpoint that allows a
+    Cardinal user to view telemetry coverage and the duration
+    and results of the last fleet-wide poll cycle.
+    '''
+    return TelemetryPoller().status()
+
+@cardinal_system.route("/api/v1/system/ops/reencrypt", methods=["POST"])
+def reencrypt():
+    '''
+    /api/v1/system/ops/reencrypt is an endpoint that allows
+    a Cardinal user to re-encrypt every stored secret with the
+    current encryptKey. Rows are rewritten in chunks of
+    encryptChunkSize (or chunk_size) per transaction.
+    '''
+    chunkSize = request.form.get("chunk_size")
+    if chunkSize not in (None, ""):
+        try:
+            chunkSize = int(chunkSize)
+        except ValueError:
+            chunkSize = 0
+        if chunkSize < 1:
+            return jsonResponse(level="ERROR", message="Invalid chunk_size. Please specify a positive integer."), 400
+    else:
+        chunkSize = None
+
+    result = job.run(func=reencryptSecrets, args=dict(chunkSize=chunkSize), priority="background")
+
+    if result._status in rqAcceptedStates:
+        return jsonResponse(level="INFO", message="Re-encrypt secrets job successfully dispatched", reference=result._id), 201
+    else:
+        return jsonResponse(level="ERROR", message="Re-encrypt secrets job failed", reference=result._status), 409
@@ -26,16 +26,21 @@ SOFTWARE.
 
 '''
 
+import time
 from cardinal.system.accesspoints import AccessPoint
 from cardinal.system.accesspoints import AccessPointGroup
 from cardinal.system.accesspoints import Ssid24Ghz
 from cardinal.system.accesspoints import Ssid5Ghz
 from cardinal.system.accesspoints import Ssid24GhzRadius
 from cardinal.system.accesspoints import Ssid5GhzRadius
+from cardinal.system.common import jsonResponse
+from cardinal.system.telemetry import TelemetryStore
+from cardinal.system.telemetry import telemetryResolutions
 
 from flask import Blueprint
 from flask import render_template
 from flask import redirect
+from flask import request
 from flask import session
 from flask import url_for
 from flask_login import login_required
@@ -77,6 +82,48 @@ def cardinalMetrics():
 
     return metricsDict
 
+# Default chart window (in seconds) for each rollup resolution
+telemetryWindows = {"5m": 86400, "1h": 604800, "1d": 31536000}
+
+def telemetrySeries(apId=None):
+    '''
+    Return pre-aggregated telemetry buckets for the resolution (5m,
+    1h or 1d) and window (hours) given in the query string.
+    '''
+    resolution = request.args.get("resolution", "1h")
+    if resolution not in telemetryWindows:
+        return jsonResponse(level="ERROR", message="Unsupported resolution {}. Please choose from the following: {}".format(resolution, \
+            ", ".join(i[0] for i in telemetryResolutions))), 400
+
+    try:
+        window = float(request.args["hours"]) * 3600 if "hours" in request.args else telemetryWindows[resolution]
+    except ValueError:
+        return jsonResponse(level="ERROR", message="hours must be a number"), 400
+
+    buckets = TelemetryStore().series(resolution, time.time() - window, apId=apId)
+    if isinstance(buckets, str):
+        return jsonResponse(level="ERROR", message=buckets), 500
+
+    return dict(resolution=resolution, buckets=buckets)
+
+@cardinal_visuals.route("/api/v1/telemetry", methods=["GET"])
+def fleetTelemetry():
+    '''
+    /api/v1/telemetry is an endpoint that allows a Cardinal
+    user to view client count and bandwidth trends summed
+    across every access point.
+    '''
+    return telemetrySeries()
+
+@cardinal_visuals.route("/api/v1/access_points/<int:id>/telemetry", methods=["GET"])
+def accessPointTelemetry(id):
+    '''
+    /api/v1/access_points/<id>/telemetry is an endpoint that
+    allows a Cardinal user to view client count and bandwidth
+    trends for an access point.
+    '''
+    return telemetrySeries(apId=id)
+
 @cardinal_visuals.route("/total-clients", methods=["GET"])
 def totalClients():
     return render_template("total-clients.html")